@@ -0,0 +1,363 @@
+"""Scaling benchmarks for the Blockschaltbilder boilerplate generator.
+
+Synthetic diagrams of different topologies and sizes are converted
+phase by phase; the run time of each phase is measured and a power law
+`t = c * n^k` is fitted to it. The fitted exponents `k` can be stored as
+a JSON baseline and compared against later runs:
+
+    python benchmarks/bench_scaling.py --save baseline.json
+    python benchmarks/bench_scaling.py --compare baseline.json
+
+The comparison fails (exit status 1) if the fitted complexity of a phase
+has become worse than in the baseline.
+
+"""
+
+
+import argparse
+import datetime
+import json
+import math
+import os
+import platform
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from blockschaltbilder import Blockschaltbild  # noqa: E402
+from blockschaltbilder.boilerplate import _parse_text  # noqa: E402
+
+
+# Number of blocks per sketch line
+_LINE_WIDTH = 50
+
+# Short IDs used for synthetic blocks, cycled through
+_SHORT_IDS = ["P", "I", "PTE", "S", "D", "U"]
+
+
+def _chain_edges(n):
+    """Connect each block to the next one."""
+    return [(i, i + 1, False) for i in range(n - 1)]
+
+
+def _fanout_edges(n):
+    """Connect every fourth block to its three successors."""
+    return [(i, j, False)
+            for i in range(0, n, 4)
+            for j in range(i + 1, min(i + 4, n))]
+
+
+def _mimo_grid_edges(n):
+    """Connect each block to its right and lower neighbours in a grid.
+
+    Horizontal connections are vector-valued, vertical ones are scalar.
+    Most blocks have two outgoing connections and get an auto joint.
+
+    """
+    edges = []
+    for i in range(n):
+        if (i + 1) % _LINE_WIDTH and i + 1 < n:
+            edges.append((i, i + 1, True))
+        if i + _LINE_WIDTH < n:
+            edges.append((i, i + _LINE_WIDTH, False))
+    return edges
+
+
+#: Dict mapping topology names onto functions creating the edges
+TOPOLOGIES = {
+    "chain": _chain_edges,
+    "fanout": _fanout_edges,
+    "mimo-grid": _mimo_grid_edges,
+    }
+
+
+def _block_id(i):
+    """Get the short ID of the i-th synthetic block."""
+    return "{:s}{:d}".format(_SHORT_IDS[i % len(_SHORT_IDS)], i)
+
+
+def generate_bsb_text(topology, n):
+    """Generate the text of a synthetic *.bsb file.
+
+    Blocks are arranged in a grid with `_LINE_WIDTH` blocks per line.
+    All blocks are renamed in the names section.
+
+    Parameters
+    ----------
+    topology : str
+        Topology name, i.e. a key of `TOPOLOGIES`.
+    n : int
+        Number of blocks.
+
+    Returns
+    -------
+    list of str
+        Text lines.
+
+    """
+    ids = [_block_id(i) for i in range(n)]
+    col_width = max(len(b_id) for b_id in ids) + 2
+
+    lines = ["Skizze:"]
+    for start in range(0, n, _LINE_WIDTH):
+        lines.append("".join(b_id.ljust(col_width)
+                             for b_id in ids[start:start + _LINE_WIDTH]))
+    lines.append("")
+
+    lines.append("Verbindungen:")
+    for i, j, is_vector in TOPOLOGIES[topology](n):
+        lines.append("    {:s} {:s} {:s}".format(
+            ids[i], "=" if is_vector else "-", ids[j]))
+    lines.append("")
+
+    lines.append("Namen:")
+    for i, b_id in enumerate(ids):
+        lines.append("    {:s}: block {:d}".format(b_id, i))
+
+    return lines
+
+
+def generate_blockschaltbild(topology, n):
+    """Generate a synthetic Blockschaltbild through the bulk API.
+
+    Parameters
+    ----------
+    topology : str
+        Topology name, i.e. a key of `TOPOLOGIES`.
+    n : int
+        Number of blocks.
+
+    Returns
+    -------
+    Blockschaltbild
+        Block diagram with the same blocks and connections as the text
+        created by `generate_bsb_text`, but without renames.
+
+    """
+    edges = TOPOLOGIES[topology](n)
+    return Blockschaltbild.from_arrays(
+        ["PGlied"]*n,
+        [_block_id(i) for i in range(n)],
+        [(i % _LINE_WIDTH, -(i // _LINE_WIDTH)) for i in range(n)],
+        edges=[(i, j) for i, j, _ in edges],
+        is_vector=[is_vector for _, _, is_vector in edges],
+        )
+
+
+def time_phases(lines):
+    """Convert a text phase by phase and measure the run times.
+
+    Parameters
+    ----------
+    lines : list of str
+        Text lines with the Blockschaltbild specification.
+
+    Returns
+    -------
+    dict
+        Run time of each phase in seconds.
+
+    """
+    times = {}
+
+    def timed(phase, func, *args, **kwargs):
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        times[phase] = time.perf_counter() - start
+        return result
+
+    parsed = timed("parse", _parse_text, lines)
+    bsb = Blockschaltbild()
+    timed("sketch", bsb.import_tokens, sketch=parsed.sketch)
+    timed("connections", bsb.import_tokens, connections=parsed.connections)
+    timed("names", bsb.import_tokens, renames=parsed.renames)
+    timed("auto_joints", bsb.add_auto_joints)
+    timed("overlaps", bsb.find_overlaps)
+    timed("export", bsb.export_to_text)
+    # Export again, routing the connections orthogonally
+    bsb.edge_routing = "orthogonal"
+    timed("routing", bsb.export_to_text)
+    timed("layout", bsb.auto_layout)
+
+    return times
+
+
+def fit_exponent(sizes, times, min_size):
+    """Fit a power law `t = c * n^k` by least squares in log-log space.
+
+    Parameters
+    ----------
+    sizes : list of int
+        Problem sizes.
+    times : list of float
+        Run times.
+    min_size : int
+        Smaller sizes are ignored since timer noise dominates there.
+
+    Returns
+    -------
+    float or None
+        Exponent `k`, None if there are less than two usable points.
+
+    """
+    points = [(math.log(n), math.log(t))
+              for n, t in zip(sizes, times) if n >= min_size and t > 0]
+    if len(points) < 2:
+        return None
+    mean_x = sum(x for x, _ in points)/len(points)
+    mean_y = sum(y for _, y in points)/len(points)
+    var_x = sum((x - mean_x)**2 for x, _ in points)
+    cov_xy = sum((x - mean_x)*(y - mean_y) for x, y in points)
+    return cov_xy/var_x
+
+
+def run_benchmarks(topologies, sizes, repeats, min_size):
+    """Run the benchmarks.
+
+    Parameters
+    ----------
+    topologies : list of str
+        Topology names.
+    sizes : list of int
+        Numbers of blocks.
+    repeats : int
+        Number of repetitions; the minimum run time is taken.
+    min_size : int
+        Minimum size considered for the fit.
+
+    Returns
+    -------
+    dict
+        Results: for each topology and phase the sizes, the times
+        and the fitted exponent.
+
+    """
+    results = {}
+    for topology in topologies:
+        results[topology] = {}
+        for n in sizes:
+            lines = generate_bsb_text(topology, n)
+            best = {}
+            for _ in range(repeats):
+                for phase, t in time_phases(lines).items():
+                    best[phase] = min(t, best.get(phase, math.inf))
+            for phase, t in best.items():
+                entry = results[topology].setdefault(
+                    phase, {"sizes": [], "times": []})
+                entry["sizes"].append(n)
+                entry["times"].append(t)
+            print("{:10s} n = {:6d}: {:s}".format(
+                topology, n,
+                ", ".join("{:s} {:.4f} s".format(p, t)
+                          for p, t in best.items())))
+        for entry in results[topology].values():
+            entry["exponent"] = fit_exponent(
+                entry["sizes"], entry["times"], min_size)
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Compare fitted exponents against a baseline.
+
+    Parameters
+    ----------
+    results : dict
+        Current results.
+    baseline : dict
+        Baseline results.
+    tolerance : float
+        Allowed increase of an exponent.
+
+    Returns
+    -------
+    list of str
+        Descriptions of the regressions.
+
+    """
+    regressions = []
+    for topology, phases in results.items():
+        for phase, entry in phases.items():
+            try:
+                old = baseline[topology][phase]["exponent"]
+            except KeyError:
+                continue
+            new = entry["exponent"]
+            if old is None or new is None:
+                continue
+            status = "ok"
+            if new > old + tolerance:
+                status = "REGRESSION"
+                regressions.append(
+                    "{:s}/{:s}: n^{:.2f} -> n^{:.2f}".format(
+                        topology, phase, old, new))
+            print("{:10s} {:12s} n^{:.2f} -> n^{:.2f}  {:s}".format(
+                topology, phase, old, new, status))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Scaling benchmarks for the boilerplate generator.",
+        )
+    parser.add_argument(
+        "--sizes", type=str, default="10,100,1000,10000",
+        help="comma-separated numbers of blocks (default: %(default)s)",
+        )
+    parser.add_argument(
+        "--topologies", type=str, default=",".join(TOPOLOGIES),
+        help="comma-separated topologies (default: %(default)s)",
+        )
+    parser.add_argument(
+        "--repeats", type=int, default=3,
+        help="repetitions per size; the minimum is taken (default: 3)",
+        )
+    parser.add_argument(
+        "--fit-min-size", type=int, default=1000,
+        help="minimum size considered for the fit (default: 1000)",
+        )
+    parser.add_argument(
+        "--save", type=str, default=None,
+        help="save the results as a JSON baseline",
+        )
+    parser.add_argument(
+        "--compare", type=str, default=None,
+        help="compare the fitted exponents with a JSON baseline",
+        )
+    parser.add_argument(
+        "--tolerance", type=float, default=0.25,
+        help="allowed increase of the exponents (default: 0.25)",
+        )
+    args = parser.parse_args()
+
+    results = run_benchmarks(
+        args.topologies.split(","),
+        [int(n) for n in args.sizes.split(",")],
+        args.repeats,
+        args.fit_min_size,
+        )
+
+    if args.save is not None:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({
+                "meta": {
+                    "date": datetime.datetime.now().isoformat(),
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                    },
+                "results": results,
+                }, f, indent=2)
+
+    if args.compare is not None:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print("Complexity regressions:")
+            for r in regressions:
+                print("  " + r)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
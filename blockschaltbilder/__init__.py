@@ -1,6 +1,14 @@
 """Blockschaltbilder: Simple block diagrams in LaTeX/TikZ."""
 
+from .analysis import *
 from .bsb import *
 from .boilerplate import *
+from .cache import *
+from .layout import *
+from .metrics import *
+from .overlaps import *
+from .routing import *
+from .server import *
+from .watch import *
 
 __version__ = "dev"
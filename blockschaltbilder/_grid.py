@@ -0,0 +1,110 @@
+"""Uniform grid index of boxes for fast overlap queries."""
+
+
+import math
+
+
+# Nothing is exported to the package namespace
+__all__ = []
+
+
+class GridIndex:
+    """Uniform grid of axis-parallel boxes for overlap queries."""
+
+    def __init__(self, boxes):
+        """Create a grid index.
+
+        Parameters
+        ----------
+        boxes : list of tuples or None
+            Boxes as (x_lo, y_lo, x_hi, y_hi)-tuples; None means no box.
+
+        """
+        self.boxes = boxes
+
+        # Cells are twice as large as the typical box, so most boxes
+        # are registered in at most four cells
+        extents = sorted(max(b[2] - b[0], b[3] - b[1])
+                         for b in boxes if b is not None)
+        if extents and extents[len(extents)//2] > 0:
+            self.cell_size = 2*extents[len(extents)//2]
+        else:
+            self.cell_size = 1.0
+
+        # Create an empty dict mapping (column, row)-cells onto box indices
+        self._cells = cells = {}
+        c = self.cell_size
+        floor = math.floor
+        for k, box in enumerate(boxes):
+            if box is None:
+                continue
+            i0, j0 = floor(box[0]/c), floor(box[1]/c)
+            i1, j1 = floor(box[2]/c), floor(box[3]/c)
+            if i0 == i1 and j0 == j1:
+                # Shortcut for the most common case
+                cells.setdefault((i0, j0), []).append(k)
+                continue
+            for i in range(i0, i1 + 1):
+                for j in range(j0, j1 + 1):
+                    cells.setdefault((i, j), []).append(k)
+
+    def query(self, x0, y0, x1, y1):
+        """Find the boxes overlapping a rectangle.
+
+        The rectangle may be degenerate, i.e. an axis-parallel segment
+        or a point. Rectangles merely touching a box do not overlap it.
+
+        Parameters
+        ----------
+        x0, y0, x1, y1 : float
+            Coordinates of opposite corners.
+
+        Returns
+        -------
+        set of int
+            Indices of the overlapped boxes.
+
+        """
+        x0, x1 = min(x0, x1), max(x0, x1)
+        y0, y1 = min(y0, y1), max(y0, y1)
+        c = self.cell_size
+        rows = range(math.floor(y0/c), math.floor(y1/c) + 1)
+        boxes = self.boxes
+        cells = self._cells
+        hits = set()
+        for i in range(math.floor(x0/c), math.floor(x1/c) + 1):
+            for j in rows:
+                for k in cells.get((i, j), ()):
+                    x_lo, y_lo, x_hi, y_hi = boxes[k]
+                    if x_lo < x1 and x0 < x_hi and y_lo < y1 and y0 < y_hi:
+                        hits.add(k)
+        return hits
+
+    def overlapping_pairs(self):
+        """Find all pairs of overlapping boxes.
+
+        Boxes sharing a cell are compared with each other; a pair is only
+        reported by the cell containing the lower left corner of its
+        intersection, so each pair is reported once.
+
+        Returns
+        -------
+        list of tuples
+            (i, j)-pairs of box indices with i < j, in no particular order.
+
+        """
+        c = self.cell_size
+        boxes = self.boxes
+        floor = math.floor
+        pairs = []
+        for (ci, cj), members in self._cells.items():
+            # Box indices are registered in ascending order
+            for a, i in enumerate(members[:-1]):
+                ax0, ay0, ax1, ay1 = boxes[i]
+                for j in members[a + 1:]:
+                    bx0, by0, bx1, by1 = boxes[j]
+                    if (ax0 < bx1 and bx0 < ax1 and ay0 < by1 and by0 < ay1
+                            and floor(max(ax0, bx0)/c) == ci
+                            and floor(max(ay0, by0)/c) == cj):
+                        pairs.append((i, j))
+        return pairs
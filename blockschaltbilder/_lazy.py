@@ -0,0 +1,38 @@
+"""Lazy imports of modules which are slow to import."""
+
+
+import importlib
+
+
+# Nothing is exported to the package namespace
+__all__ = []
+
+
+class LazyModule:
+    """Placeholder for a module which is imported on first attribute access.
+
+    Example::
+
+        np = LazyModule("numpy")
+        np.zeros(3)  # NumPy is imported here
+
+    """
+
+    __slots__ = ("_name", "_module")
+
+    def __init__(self, name):
+        """Create a placeholder.
+
+        Parameters
+        ----------
+        name : str
+            Absolute module name, e.g. 'concurrent.futures'.
+
+        """
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
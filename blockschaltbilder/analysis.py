@@ -0,0 +1,205 @@
+"""Structural analysis of block diagrams.
+
+The connections form a directed graph of the blocks, in which the
+analysis finds
+
+* algebraic loops, i.e. feedback loops without a dynamic element such as
+  an integrator or a dead time: they are the cyclic strongly connected
+  components of the subgraph of the static blocks;
+* isolated blocks without any connections;
+* blocks whose input or output is not connected.
+
+Strongly connected components are found by Tarjan's algorithm and the
+connections of each block are counted in a single pass, so the analysis
+runs in O(V + E) time.
+
+"""
+
+
+from collections import namedtuple
+
+
+# Specify exports
+__all__ = [
+    "Finding",
+    "find_structural_issues",
+    "format_finding",
+    "strongly_connected_components",
+    ]
+
+#: Finding of the structural analysis:
+#: * `kind`: 'algebraic_loop', 'isolated_block', 'unconnected_input'
+#:   or 'unconnected_output'
+#: * `blocks`: list of the blocks concerned, i.e. all blocks of an
+#:   algebraic loop and a single block otherwise
+Finding = namedtuple("Finding", ["kind", "blocks"])
+
+# Descriptions of the kinds of findings, in the order they are reported
+_FINDING_TITLES = {
+    "algebraic_loop": "Algebraic loop",
+    "isolated_block": "Isolated block",
+    "unconnected_input": "Unconnected input",
+    "unconnected_output": "Unconnected output",
+    }
+
+
+def _check_edges(num_nodes, edges):
+    """Check if all edges refer to existing nodes."""
+    if any(not (0 <= v < num_nodes and 0 <= w < num_nodes)
+           for v, w in edges):
+        raise ValueError("Edge refers to a non-existent node!")
+
+
+def strongly_connected_components(num_nodes, edges):
+    """Find the strongly connected components of a directed graph.
+
+    Tarjan's algorithm is run with an explicit stack, so deep graphs
+    do not hit the recursion limit.
+
+    Parameters
+    ----------
+    num_nodes : int
+        Number of nodes; they are identified by 0, 1, ...
+    edges : iterable of pairs of int
+        Directed edges as (from, to)-pairs.
+
+    Returns
+    -------
+    list of lists of int
+        Sorted nodes of each component. Components are listed in reverse
+        topological order, i.e. a component comes before all components
+        with edges into it.
+
+    """
+    edges = list(edges)
+    _check_edges(num_nodes, edges)
+    succ = [[] for _ in range(num_nodes)]
+    for v, w in edges:
+        succ[v].append(w)
+
+    # Visiting order of each node; -1 for unvisited nodes
+    order = [-1]*num_nodes
+    # Smallest visiting order reachable from each node
+    low = [0]*num_nodes
+    on_stack = [False]*num_nodes
+    stack = []
+    components = []
+    counter = 0
+
+    for root in range(num_nodes):
+        if order[root] >= 0:
+            continue
+        order[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack[root] = True
+        # Path of the search as (node, position of the next successor)
+        path = [(root, 0)]
+        while path:
+            v, k = path[-1]
+            if k < len(succ[v]):
+                path[-1] = (v, k + 1)
+                w = succ[v][k]
+                if order[w] < 0:
+                    order[w] = low[w] = counter
+                    counter += 1
+                    stack.append(w)
+                    on_stack[w] = True
+                    path.append((w, 0))
+                elif on_stack[w] and order[w] < low[v]:
+                    low[v] = order[w]
+                continue
+
+            path.pop()
+            if path:
+                u = path[-1][0]
+                if low[v] < low[u]:
+                    low[u] = low[v]
+            if low[v] == order[v]:
+                # `v` is the root of a component; pop it from the stack
+                component = []
+                while True:
+                    w = stack.pop()
+                    on_stack[w] = False
+                    component.append(w)
+                    if w == v:
+                        break
+                component.sort()
+                components.append(component)
+
+    return components
+
+
+def find_structural_issues(num_nodes, edges, dynamic, terminal):
+    """Find algebraic loops and unconnected blocks.
+
+    Parameters
+    ----------
+    num_nodes : int
+        Number of blocks; they are identified by 0, 1, ...
+    edges : iterable of pairs of int
+        Connections as (from, to)-pairs.
+    dynamic : list of bool
+        True for the blocks with dynamics, which break algebraic loops,
+        e.g. integrators and dead times.
+    terminal : list of bool
+        True for the inputs and outputs of the diagram (e.g. coordinates),
+        which are not reported if they are not connected.
+
+    Returns
+    -------
+    list of Finding
+        Algebraic loops, isolated blocks, unconnected inputs and
+        unconnected outputs, in this order; the blocks are given
+        by their indices and the findings of each kind are sorted.
+
+    """
+    edges = list(edges)
+    _check_edges(num_nodes, edges)
+    num_in = [0]*num_nodes
+    num_out = [0]*num_nodes
+    static_edges = []
+    for v, w in edges:
+        num_out[v] += 1
+        num_in[w] += 1
+        if not (dynamic[v] or dynamic[w]):
+            static_edges.append((v, w))
+
+    # A loop without dynamic blocks is a cycle of the static subgraph
+    self_loops = {v for v, w in static_edges if v == w}
+    findings = [
+        Finding("algebraic_loop", component)
+        for component in sorted(
+            strongly_connected_components(num_nodes, static_edges))
+        if len(component) > 1 or component[0] in self_loops
+        ]
+
+    for kind, is_issue in [
+            ("isolated_block", lambda v: not num_in[v] and not num_out[v]),
+            ("unconnected_input", lambda v: not num_in[v] and num_out[v]),
+            ("unconnected_output", lambda v: num_in[v] and not num_out[v]),
+            ]:
+        findings.extend(Finding(kind, [v]) for v in range(num_nodes)
+                        if not terminal[v] and is_issue(v))
+
+    return findings
+
+
+def format_finding(finding):
+    """Describe a finding in a single line.
+
+    Parameters
+    ----------
+    finding : Finding
+        Finding with the names of the blocks,
+        see `Blockschaltbild.check_structure`.
+
+    Returns
+    -------
+    str
+        Description, e.g. "Algebraic loop: 'S1', 'P1'".
+
+    """
+    return "{:s}: {:s}".format(
+        _FINDING_TITLES[finding.kind],
+        ", ".join("'{:s}'".format(name) for name in finding.blocks))
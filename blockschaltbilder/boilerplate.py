@@ -1,125 +1,465 @@
 """Frontend file parser for Blockschaltbilder."""
 
 
-from .bsb import Blockschaltbild
+from .analysis import format_finding
+from .bsb import (
+    Blockschaltbild,
+    SketchTokens,
+    _PREFIX_SEPARATOR,
+    _RE_IMPORT_SKETCH,
+    _SHORT_ID_TO_BLOCK_TYPES,
+    _SketchTokenizer,
+    _parse_connection,
+    _parse_rename,
+    _parse_subsystem,
+    )
+from .cache import ConversionCache
+from . import metrics as _metrics
+from ._lazy import LazyModule
+from collections import namedtuple
 import fnmatch
+import mmap
 import os
 import re
+import signal
+import sys
+import threading
 
 
+# Only needed for parallel conversions
+_futures = LazyModule("concurrent.futures")
+tracemalloc = LazyModule("tracemalloc")
+
 # Specify exports
-__all__ = ["convert_to_tikz"]
+__all__ = [
+    "convert_to_tikz",
+    "convert_stream",
+    "check_files",
+    "ConversionSummary",
+    "CheckSummary",
+    ]
 
-# Define regexen for the detection of file sections
-_PATTERN_SKETCH = r"(?:sketch|skizze)\:$"
-_RE_SKETCH = re.compile(_PATTERN_SKETCH, re.IGNORECASE)
-_PATTERN_CONNECTIONS = r"(?:connections|verbindungen)\:$"
-_RE_CONNECTIONS = re.compile(_PATTERN_CONNECTIONS, re.IGNORECASE)
-_PATTERN_NAMES = r"(?:names|namen)\:$"
-_RE_NAMES = re.compile(_PATTERN_NAMES, re.IGNORECASE)
+# Files of this size (in bytes) and larger are read through mmap
+_MMAP_THRESHOLD = 2**24
 
+#: Summary of a batch conversion: `succeeded` is a list of converted files,
+#: `failed` is a list of (filename, exception) tuples
+ConversionSummary = namedtuple("ConversionSummary", ["succeeded", "failed"])
 
-# We use a state machine to parse the *.bsb files
-class Reader:
-    """State machine for reading *.bsb files."""
+#: Summary of a structural check: `findings` is a dict mapping each checked
+#: file onto its list of Finding tuples, `failed` is a list of
+#: (filename, exception) tuples
+CheckSummary = namedtuple("CheckSummary", ["findings", "failed"])
+
+# Section headers; they are matched case-insensitively against
+# stripped lines, so a simple dict lookup is sufficient
+_SECTION_HEADERS = {
+    "sketch:": "sketch",
+    "skizze:": "sketch",
+    "connections:": "connections",
+    "verbindungen:": "connections",
+    "names:": "names",
+    "namen:": "names",
+    "subsystems:": "subsystems",
+    "subsysteme:": "subsystems",
+    }
+
+# Default conversion settings, see `convert_to_tikz`
+_DEFAULT_SETTINGS = {"edge_routing": "straight", "overlaps": "warn",
+                     "externalize": False}
+
+# Handling of overlapping blocks, see `convert_to_tikz`
+_OVERLAP_MODES = ("ignore", "warn", "fail")
+
+# Maximum number of overlaps listed in a warning or an error
+_MAX_LISTED_OVERLAPS = 10
+
+# Maximum number of parsed subsystems kept in memory, see `_SubsystemLoader`
+_MAX_CACHED_SUBSYSTEMS = 256
+
+#: Tokens of a *.bsb file: `sketch` is a SketchTokens tuple or None if the
+#: file has no sketch, `connections`, `renames` and `subsystems` are lists
+#: of tuples
+ParsedText = namedtuple("ParsedText",
+                        ["sketch", "connections", "renames", "subsystems"])
+
+#: Parsed subsystem: `bsb` is its Blockschaltbild without auto joints,
+#: `renames` are its renaming specifications, which are applied by the
+#: including file, and `files` are the absolute paths to the *.bsb files
+#: of its own subsystems, nested ones included
+_Subsystem = namedtuple("_Subsystem", ["bsb", "renames", "files"])
+
+# Dict mapping absolute paths onto (stamps, _Subsystem)-tuples, shared by
+# all conversions of a process; the stamps are the modification times and
+# sizes of the file and the files of its subsystems, see `_file_stamp`
+_subsystem_cache = {}
 
-    def __init__(self):
-        """Create a new reader state machine."""
-        # Initialise with inactive state
-        self.transit_to(Inactive)
 
-        # Initialise accumulator lists
-        self.sketch = []
-        self.connections = []
-        self.names = []
+def _parse_text(lines):
+    """Tokenize the text of a *.bsb file in a single pass.
 
-    def transit_to(self, new_state):
-        """Transit to new state."""
-        self._state = new_state
+    Each line is looked up in the section headers; all other lines are
+    tokenized right away according to the current section. Lines before
+    the first section header are ignored.
+
+    Parameters
+    ----------
+    lines : iterable of str
+        Text lines with the Blockschaltbild specification.
+
+    Returns
+    -------
+    ParsedText
+        Tokens of the sketch, connections and renaming specifications.
+
+    """
+    sketch = _SketchTokenizer()
+    connections = []
+    renames = []
+    subsystems = []
+    section = None
 
-    def read_line(self, line):
-        """Read one line.
+    for line in lines:
+        # Replace hard tabs with 4 whitespaces; this is relevant for the
+        # sketch, since the block positions are given by the columns
+        line = line.replace("\t", " "*4)
+        # We strip the line only for header matching; the original line is
+        # tokenized in order to preserve indentation.
+        new_section = _SECTION_HEADERS.get(line.strip().lower())
+        if new_section is not None:
+            section = new_section
+        elif section == "sketch":
+            sketch.feed(line)
+        elif section == "connections":
+            c = _parse_connection(line)
+            if c is not None:
+                connections.append(c)
+        elif section == "names":
+            r = _parse_rename(line)
+            if r is not None:
+                renames.append(r)
+        elif section == "subsystems":
+            s = _parse_subsystem(line)
+            if s is not None:
+                subsystems.append(s)
 
-        This method reads one line and decides what to do:
-        Depending on the line contents, it either performs a transition to
-        new state (file section) or stores the line in the appropriate
-        state-dependent accumulator list.
+    return ParsedText(
+        sketch.tokens() if sketch.num_lines else None,
+        connections,
+        renames,
+        subsystems,
+        )
+
+
+def _implicit_sketch(parsed):
+    """Get the blocks of a *.bsb file without a sketch.
+
+    The blocks are those named in the connections and names sections,
+    in the order of their first appearance; blocks of subsystems are
+    not included.
+
+    Parameters
+    ----------
+    parsed : ParsedText
+        Tokens of the file.
+
+    Returns
+    -------
+    SketchTokens
+        Blocks, all of them at the origin.
+
+    """
+    names = [
+        name for name in dict.fromkeys(
+            [name for f, t, _ in parsed.connections for name in (f, t)]
+            + [old_name for old_name, _ in parsed.renames])
+        if _PREFIX_SEPARATOR not in name
+        ]
+    block_types = [
+        _SHORT_ID_TO_BLOCK_TYPES[
+            _RE_IMPORT_SKETCH.match(name).group("b_id").lower()]
+        for name in names
+        ]
+    return SketchTokens(names, block_types, [0]*len(names), [0]*len(names))
+
+
+def _get_sketch(parsed):
+    """Get the sketch of a *.bsb file, implicit or not.
+
+    Parameters
+    ----------
+    parsed : ParsedText
+        Tokens of the file.
+
+    Returns
+    -------
+    SketchTokens
+        Blocks of the sketch or, if there is none, of the other
+        sections, see `_implicit_sketch`.
+
+    """
+    if parsed.sketch is not None:
+        return parsed.sketch
+    sketch = _implicit_sketch(parsed)
+    if not sketch.names and not parsed.subsystems:
+        raise ValueError("The input file must contain a sketch, "
+                         "connections or subsystems")
+    return sketch
+
+
+def _file_stamp(path):
+    """Get the modification time and size of a file.
+
+    Parameters
+    ----------
+    path : str
+        Path to the file.
+
+    Returns
+    -------
+    tuple or None
+        (Modification time in ns, size in bytes) or None if the file
+        does not exist.
+
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+class _SubsystemLoader:
+    """Loader of the subsystems of a conversion.
+
+    Parsed subsystems are kept in memory and shared by all conversions of
+    the process, so each *.bsb file is parsed and laid out only once, no
+    matter how often it is used; it is parsed again when it changes.
+
+    """
+
+    def __init__(self):
+        """Create a loader for a conversion."""
+        #: list of str: Absolute paths to the *.bsb files of all loaded
+        #: subsystems, nested ones included
+        self.files = []
+        #: list of str: Absolute paths to the *.bsb files of all subsystems
+        #: the loader has tried to load, including missing or broken ones
+        self.tried = []
+        # Stack of the files being loaded, to detect recursion
+        self._loading = []
+
+    def load(self, path):
+        """Load a subsystem.
 
         Parameters
         ----------
-        line : str
-            One line of a *.bsb file.
+        path : str
+            Path to the *.bsb file.
+
+        Returns
+        -------
+        _Subsystem
+            Parsed subsystem; it must not be changed.
 
         """
-        # We strip the line only for tag matching; the original line is
-        # stored in accumulator lists in order to preserve indentation.
-        stripped_line = line.strip()
-
-        # Try to match section tags and transit to the corresponding state;
-        # otherwise just chomp this line.
-        if _RE_SKETCH.match(stripped_line) is not None:
-            self.transit_to(Sketch)
-        elif _RE_CONNECTIONS.match(stripped_line) is not None:
-            self.transit_to(Connections)
-        elif _RE_NAMES.match(stripped_line) is not None:
-            self.transit_to(Names)
+        path = os.path.abspath(path)
+        if not fnmatch.fnmatch(path, '*.bsb'):
+            raise ValueError("Subsystem '{:s}' must have a 'bsb' "
+                             "extension".format(path))
+        self.tried.append(path)
+        if path in self._loading:
+            raise ValueError(
+                "Subsystem '{:s}' includes itself".format(path))
+
+        entry = _subsystem_cache.get(path)
+        if entry is not None and all(
+                _file_stamp(p) == stamp for p, stamp in entry[0]):
+            subsystem = entry[1]
         else:
-            self._store(line)
+            stamp = _file_stamp(path)
+            if stamp is None:
+                raise ValueError("Subsystem '{:s}' not found".format(path))
+            self._loading.append(path)
+            try:
+                subsystem = self._parse(path)
+            finally:
+                self._loading.pop()
+            stamps = [(path, stamp)] + [(p, _file_stamp(p))
+                                        for p in subsystem.files]
+            # Forget the oldest subsystems first
+            _subsystem_cache.pop(path, None)
+            while len(_subsystem_cache) >= _MAX_CACHED_SUBSYSTEMS:
+                del _subsystem_cache[next(iter(_subsystem_cache))]
+            _subsystem_cache[path] = (stamps, subsystem)
 
-    def _store(self, line):
-        """Store a line in an appropriate accumulator list.
+        self.files.append(path)
+        self.files.extend(subsystem.files)
+        self.tried.extend(subsystem.files)
+        return subsystem
 
-        Delegates this to the state's static method.
+    def _parse(self, path):
+        """Parse a subsystem, see `load`."""
+        with _metrics.phase("parse"):
+            parsed = _parse_text(_iter_file_lines(path))
+        bsb = Blockschaltbild()
+        # Collect the files of the nested subsystems only
+        outer_files, self.files = self.files, []
+        try:
+            renames = _import_text(bsb, parsed, os.path.dirname(path), self)
+            files = list(dict.fromkeys(self.files))
+        finally:
+            self.files = outer_files
+        return _Subsystem(bsb, renames, files)
 
-        Parameters
-        ----------
-        line : str
-            One line of a *.bsb file.
 
-        """
-        return self._state.store_line(self, line)
+def _import_text(bsb, parsed, directory, loader, layout=True):
+    """Import the blocks, connections and subsystems of a *.bsb file.
+
+    Without a sketch, the blocks of the file are placed automatically,
+    before the subsystems are added at their positions. Names are not
+    imported, so connections may still refer to the blocks of the
+    subsystems by their short IDs.
+
+    Parameters
+    ----------
+    bsb : Blockschaltbild
+        Block diagram the tokens are imported into.
+    parsed : ParsedText
+        Tokens of the file.
+    directory : str or None
+        Directory of relative subsystem paths; '' means the current
+        working directory, None means that relative paths are rejected.
+    loader : _SubsystemLoader
+        Loader of the subsystems.
+    layout : bool, optional
+        If False, the blocks are not placed automatically.
+
+    Returns
+    -------
+    list of tuples
+        Renaming specifications of the file and its subsystems,
+        to be imported last.
+
+    """
+    sketch = _get_sketch(parsed)
+
+    # Connections to the blocks of subsystems are added with them
+    own_connections = []
+    sub_connections = []
+    for c in parsed.connections:
+        if _PREFIX_SEPARATOR in c[0] or _PREFIX_SEPARATOR in c[1]:
+            sub_connections.append(c)
+        else:
+            own_connections.append(c)
 
+    with _metrics.phase("sketch") as ph:
+        bsb.import_tokens(sketch=sketch)
+        ph.set_diagram(bsb)
+    with _metrics.phase("connections") as ph:
+        bsb.import_tokens(connections=own_connections)
+        ph.set_diagram(bsb)
+    if parsed.sketch is None and layout:
+        with _metrics.phase("layout") as ph:
+            bsb.auto_layout()
+            ph.set_diagram(bsb)
 
-# Classes representing reader's states; self-explanatory
-class ReaderState:
-    """Parent class for reader state."""
+    renames = []
+    if parsed.subsystems:
+        with _metrics.phase("subsystems") as ph:
+            for prefix, path, xy in parsed.subsystems:
+                if directory is None and not os.path.isabs(path):
+                    raise ValueError(
+                        "Subsystem '{:s}' must be given by an absolute "
+                        "path".format(path))
+                subsystem = loader.load(os.path.join(directory or "", path))
+                bsb.add_subsystem(subsystem.bsb, prefix, xy)
+                renames.extend(
+                    (prefix + _PREFIX_SEPARATOR + old_name,
+                     prefix + _PREFIX_SEPARATOR + new_name)
+                    for old_name, new_name in subsystem.renames)
+            bsb.import_tokens(connections=sub_connections)
+            ph.set_diagram(bsb)
+    elif sub_connections:
+        bsb.import_tokens(connections=sub_connections)
 
-    @staticmethod
-    def store_line(reader, line):
-        raise NotImplementedError()
+    # The names of the including file take precedence
+    renamed = {old_name for old_name, _ in parsed.renames}
+    return ([r for r in renames if r[0] not in renamed]
+            + parsed.renames)
 
 
-class Inactive(ReaderState):
-    @staticmethod
-    def store_line(reader, line):
-        pass
+def _check_overlaps(bsb, mode, source):
+    """Check a Blockschaltbild for overlapping blocks.
 
+    Parameters
+    ----------
+    bsb : Blockschaltbild
+        Block diagram to be checked.
+    mode : str
+        'ignore', 'warn' (print a warning to stderr) or 'fail'
+        (raise a ValueError) if blocks overlap.
+    source : str
+        Name of the input in warnings, e.g. the filename.
+
+    """
+    if mode not in _OVERLAP_MODES:
+        raise ValueError("Unknown overlap mode '{:s}'".format(mode))
+    if mode == "ignore":
+        return
 
-class Sketch(ReaderState):
-    @staticmethod
-    def store_line(reader, line):
-        reader.sketch.append(line)
+    overlaps = bsb.find_overlaps()
+    if not overlaps:
+        return
+    message = "Overlapping blocks: " + ", ".join(
+        "'{:s}' and '{:s}'".format(a, b)
+        for a, b in overlaps[:_MAX_LISTED_OVERLAPS])
+    if len(overlaps) > _MAX_LISTED_OVERLAPS:
+        message += " and {:d} more".format(
+            len(overlaps) - _MAX_LISTED_OVERLAPS)
+    if mode == "fail":
+        raise ValueError(message)
+    print("Warning in {:s}:".format(source), message, file=sys.stderr)
 
 
-class Connections(ReaderState):
-    @staticmethod
-    def store_line(reader, line):
-        reader.connections.append(line)
+def _merge_settings(settings):
+    """Complete conversion settings with the defaults of missing settings.
 
+    Parameters
+    ----------
+    settings : dict or None
+        Conversion settings, see `_convert_text`.
 
-class Names(ReaderState):
-    @staticmethod
-    def store_line(reader, line):
-        reader.names.append(line)
+    Returns
+    -------
+    dict
+        New dict with all conversion settings.
 
+    """
+    return dict(_DEFAULT_SETTINGS, **(settings or {}))
 
-def _convert_text(lines):
+
+def _convert_text(lines, settings=None, source="<text>", directory="",
+                  loader=None):
     """Create a Blockschaltbild from text.
 
     Parameters
     ----------
-    lines : list of str
+    lines : iterable of str
         Text lines with the Blockschaltbild specification.
+    settings : dict or None, optional
+        Conversion settings: 'edge_routing', 'overlaps' and
+        'externalize', see `convert_to_tikz`; missing settings take
+        their defaults. The output mode 'externalize' is applied by
+        the export, not here.
+    source : str, optional
+        Name of the input in warnings, e.g. the filename.
+    directory : str or None, optional
+        Directory of relative subsystem paths; '' means the current
+        working directory, None means that relative paths are rejected.
+    loader : _SubsystemLoader or None, optional
+        Loader of the subsystems; its `files` tell the subsystem files
+        used by the conversion. None means a new loader.
 
     Returns
     -------
@@ -127,55 +467,252 @@ def _convert_text(lines):
         A block diagram created from text.
 
     """
-    # Set current status to inactive
-    reader = Reader()
+    with _metrics.phase("parse"):
+        parsed = _parse_text(lines)
 
-    # Read the text line by line, replacing hard tabs with 4 whitespaces
-    for l in lines:
-        reader.read_line(l.replace("\t", " "*4))
-
-    # Create an empty block diagram
-    bsb = Blockschaltbild()
-    # Import sketch; note that it is mandatory since it defines the blocks
-    if reader.sketch:
-        bsb.import_sketch(reader.sketch)
-    else:
-        raise ValueError("The input file must contain a sketch")
-    # If the connections are specified, import them
-    if reader.connections:
-        bsb.import_connections(reader.connections)
-    # If new names are specified, rename blocks
-    if reader.names:
-        bsb.import_names(reader.names)
+    # Create a block diagram and import blocks, connections and
+    # subsystems; without a sketch, the blocks are taken from the
+    # other sections and placed automatically
+    settings = _merge_settings(settings)
+    bsb = Blockschaltbild(edge_routing=settings["edge_routing"])
+    if loader is None:
+        loader = _SubsystemLoader()
+    renames = _import_text(bsb, parsed, directory, loader)
+    with _metrics.phase("names") as ph:
+        bsb.import_tokens(renames=renames)
+        ph.set_diagram(bsb)
 
     # Add auto joints instead of blocks with multiple outgoing connections
-    bsb.add_auto_joints()
+    with _metrics.phase("auto_joints") as ph:
+        bsb.add_auto_joints()
+        ph.set_diagram(bsb)
+
+    with _metrics.phase("overlaps") as ph:
+        _check_overlaps(bsb, settings["overlaps"], source)
+        ph.set_diagram(bsb)
 
     return bsb
 
 
-def _convert_single_file(filename):
+def _iter_file_lines(filename):
+    """Read a UTF-8 text file line by line.
+
+    Large files are memory-mapped, so that they are paged in by the
+    operating system instead of being copied into buffers; only the
+    current line is decoded at a time.
+
+    Parameters
+    ----------
+    filename : str
+        Path to the file.
+
+    Yields
+    ------
+    str
+        Line of the file, possibly with a trailing newline.
+
+    """
+    if os.path.getsize(filename) < _MMAP_THRESHOLD:
+        with open(filename, 'r', encoding="utf-8") as f:
+            yield from f
+        return
+
+    with open(filename, 'rb') as f, \
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        for raw_line in iter(mm.readline, b""):
+            # Split at '\r' as well, like in universal newlines mode
+            yield from raw_line.decode("utf-8").splitlines(keepends=True)
+
+
+def convert_stream(in_fileobj, out_fileobj, edge_routing="straight",
+                   overlaps="warn", externalize=False):
+    """Convert a *.bsb text stream into a boilerplate TikZ text stream.
+
+    The input is tokenized line by line, so it is never held in memory
+    as a whole; the output is written section by section.
+
+    Parameters
+    ----------
+    in_fileobj : file-like object
+        Input text stream, e.g. `sys.stdin` or a pipe.
+    out_fileobj : file-like object
+        Output text stream, e.g. `sys.stdout` or a pipe.
+    edge_routing : str, optional
+        Routing of the connections: 'straight' lines or 'orthogonal'
+        paths around the blocks.
+    overlaps : str, optional
+        Handling of overlapping blocks, see `convert_to_tikz`.
+    externalize : bool, optional
+        If True, the picture is named for `\\tikzexternalize`,
+        see `convert_to_tikz`.
+
+    """
+    bsb = _convert_text(
+        in_fileobj, {"edge_routing": edge_routing, "overlaps": overlaps},
+        "<stream>")
+    bsb.export_to_stream(out_fileobj, externalize=externalize)
+
+
+def _convert_single_file(filename, cache=None, settings=None, loader=None):
     """Convert a single .bsb file into a boilerplate .tex file.
 
     Parameters
     ----------
     filename : str
         Path to the file to be converted.
+    cache : ConversionCache or None, optional
+        Cache of converted texts; if given, unchanged files are not
+        converted again and up-to-date .tex files are not rewritten.
+    settings : dict or None, optional
+        Conversion settings, see `_convert_text`.
+    loader : _SubsystemLoader or None, optional
+        Loader of the subsystems; its `tried` files tell which subsystems
+        a failed conversion depends on. None means a new loader.
+
+    Returns
+    -------
+    list of str
+        Absolute paths to the files of the subsystems the output
+        depends on.
 
     """
     # Check file extension
     if not fnmatch.fnmatch(filename, '*.bsb'):
         raise ValueError("The input file must have a 'bsb' extension")
 
-    # Open this file and read all its contents into a list
-    with open(filename, 'r', encoding="utf-8") as f:
-        lines = f.readlines()
+    out_filename = re.sub(r"\.bsb$", ".tex", filename)
+
+    with _metrics.phase("file", filename) as ph:
+        return _convert_file_to_file(filename, out_filename, cache, ph,
+                                     settings, loader)
+
+
+def _get_cached(cache, key, directory):
+    """Look up an output text, checking the subsystems it depends on.
+
+    Parameters
+    ----------
+    cache : ConversionCache
+        Cache of converted texts.
+    key : str
+        Cache key of the input.
+    directory : str
+        Directory of relative subsystem paths, see `_convert_text`.
+
+    Returns
+    -------
+    tex : str or None
+        Cached output text or None if there is no up-to-date entry.
+    dependencies : list of str
+        Paths to the files of the subsystems recorded for the input.
+
+    """
+    # The output of an input with subsystems is stored under a key
+    # covering the files of the subsystems as well; which files these
+    # are depends on the directory of the input
+    dependencies = cache.get_dependencies(
+        cache.directory_key(key, directory))
+    if dependencies:
+        key = cache.dependent_key(key, dependencies)
+        if key is None:
+            return None, dependencies
+    return cache.get(key), dependencies
+
+
+def _put_cached(cache, key, directory, tex, dependencies):
+    """Store an output text, see `_get_cached`.
+
+    Parameters
+    ----------
+    cache : ConversionCache
+        Cache of converted texts.
+    key : str
+        Cache key of the input.
+    directory : str
+        Directory of relative subsystem paths, see `_convert_text`.
+    tex : str
+        Output text.
+    dependencies : list of str
+        Paths to the files of the subsystems, e.g. `_SubsystemLoader.files`.
+
+    """
+    dependencies = list(dict.fromkeys(dependencies))
+    if dependencies:
+        cache.put_dependencies(cache.directory_key(key, directory),
+                               dependencies)
+        key = cache.dependent_key(key, dependencies)
+        if key is None:
+            return
+    cache.put(key, tex)
+
+
+def _convert_file_to_file(filename, out_filename, cache, ph, settings,
+                          loader=None):
+    """Convert a .bsb file into a .tex file; helper of _convert_single_file.
+
+    Parameters
+    ----------
+    filename : str
+        Path to the file to be converted.
+    out_filename : str
+        Path to the output file.
+    cache : ConversionCache or None
+        Cache of converted texts.
+    ph : context manager
+        Metrics phase of the whole file.
+    settings : dict or None
+        Conversion settings, see `_convert_text`.
+    loader : _SubsystemLoader or None, optional
+        Loader of the subsystems; None means a new loader.
+
+    Returns
+    -------
+    list of str
+        Absolute paths to the files of the subsystems, see
+        `_convert_single_file`.
 
-    # Convert them into a Blockschaltbild with automatically placed joints
-    bsb = _convert_text(lines)
+    """
+    # Subsystem paths are relative to the file
+    directory = os.path.dirname(filename)
+    externalize = _merge_settings(settings)["externalize"]
+    if loader is None:
+        loader = _SubsystemLoader()
+    if cache is None:
+        # Convert the file into a Blockschaltbild with automatically
+        # placed joints, reading it line by line
+        bsb = _convert_text(_iter_file_lines(filename), settings, filename,
+                            directory, loader)
+        ph.set_diagram(bsb)
 
-    # Export to a *.tex file
-    bsb.export_to_file(re.sub(r"\.bsb$", ".tex", filename))
+        # Export to a *.tex file
+        with _metrics.phase("export") as export_ph:
+            bsb.export_to_file(out_filename, externalize=externalize)
+            export_ph.set_diagram(bsb)
+        return list(dict.fromkeys(loader.files))
+
+    key = cache.file_key(filename)
+    tex, dependencies = _get_cached(cache, key, directory)
+    if tex is None:
+        bsb = _convert_text(_iter_file_lines(filename), settings, filename,
+                            directory, loader)
+        ph.set_diagram(bsb)
+        with _metrics.phase("export") as export_ph:
+            tex = bsb.export_to_text(externalize=externalize)
+            export_ph.set_diagram(bsb)
+        dependencies = list(dict.fromkeys(loader.files))
+        _put_cached(cache, key, directory, tex, dependencies)
+    else:
+        # Skip the file completely if its output is up to date
+        try:
+            with open(out_filename, 'r', encoding="utf-8") as f:
+                if f.read() == tex:
+                    return dependencies
+        except FileNotFoundError:
+            pass
+
+    with open(out_filename, 'w', encoding="utf-8") as f:
+        f.write(tex)
+    return dependencies
 
 
 def _find_bsb_files(root_directory):
@@ -197,7 +734,204 @@ def _find_bsb_files(root_directory):
             yield os.path.join(root, basename)
 
 
-def convert_to_tikz(paths):
+def _collect_bsb_files(paths):
+    """Collect the *.bsb files to be converted.
+
+    Parameters
+    ----------
+    paths : list of str
+        File or folder specification, see `convert_to_tikz`.
+
+    Returns
+    -------
+    list of str
+        Paths to the files.
+
+    """
+    files = []
+    for p in paths:
+        if os.path.isdir(p):
+            files.extend(_find_bsb_files(p))
+        elif os.path.isfile(p):
+            files.append(p)
+        else:
+            raise ValueError("File or folder '{:s}' not found.".format(p))
+    return files
+
+
+def _call_with_timeout(timeout, func, *args):
+    """Call a function, aborting it after a timeout.
+
+    The timeout is implemented with an interval timer and is therefore
+    only enforced on platforms which support it (i.e. not on Windows)
+    and only in the main thread.
+
+    Parameters
+    ----------
+    timeout : float or None
+        Maximum run time in seconds; None means no timeout.
+    func : callable
+        Function to call.
+    *args
+        Arguments of the function.
+
+    Returns
+    -------
+    object
+        Return value of the function.
+
+    """
+    if (timeout is None
+            or not hasattr(signal, "setitimer")
+            or threading.current_thread() is not threading.main_thread()):
+        return func(*args)
+
+    def on_timeout(signum, frame):
+        raise TimeoutError(
+            "Conversion took longer than {:g} s".format(timeout))
+
+    old_handler = signal.signal(signal.SIGALRM, on_timeout)
+    signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        return func(*args)
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, old_handler)
+
+
+def _convert_single_file_with_timeout(filename, timeout, cache=None,
+                                      settings=None, loader=None):
+    """Convert a single .bsb file, aborting it after a timeout.
+
+    Parameters
+    ----------
+    filename : str
+        Path to the file to be converted.
+    timeout : float or None
+        Maximum conversion time in seconds; None means no timeout.
+    cache : ConversionCache or None, optional
+        Cache of converted texts.
+    settings : dict or None, optional
+        Conversion settings, see `_convert_text`.
+    loader : _SubsystemLoader or None, optional
+        Loader of the subsystems, see `_convert_single_file`.
+
+    Returns
+    -------
+    list of str
+        Absolute paths to the files of the subsystems, see
+        `_convert_single_file`.
+
+    """
+    return _call_with_timeout(timeout, _convert_single_file, filename,
+                              cache, settings, loader)
+
+
+def _try_to_convert_single_file(filename, timeout=None, cache=None,
+                                settings=None):
+    """Convert a single .bsb file, returning an exception instead of raising.
+
+    Parameters
+    ----------
+    filename : str
+        Path to the file to be converted.
+    timeout : float or None, optional
+        Maximum conversion time in seconds; None means no timeout.
+    cache : ConversionCache or None, optional
+        Cache of converted texts.
+    settings : dict or None, optional
+        Conversion settings, see `_convert_text`.
+
+    Returns
+    -------
+    Exception or None
+        ValueError, TypeError or TimeoutError if the conversion has failed,
+        None otherwise.
+
+    """
+    try:
+        _convert_single_file_with_timeout(filename, timeout, cache, settings)
+    except (ValueError, TypeError, TimeoutError) as e:
+        return e
+    return None
+
+
+def _run_in_worker(func, args, collect, trace_memory):
+    """Call a function in a worker process, collecting metrics.
+
+    Parameters
+    ----------
+    func : callable
+        Function to call, e.g. `_try_to_convert_single_file`.
+    args : tuple
+        Arguments of the function.
+    collect : bool
+        If True, metrics are collected and returned.
+    trace_memory : bool
+        If True, peak memory is traced.
+
+    Returns
+    -------
+    result : object
+        Return value of the function.
+    records : list of PhaseMetrics
+        Collected metrics; they have to be passed on to the
+        collectors of the main process.
+
+    """
+    if not collect:
+        return func(*args), []
+    with _metrics.collect_metrics(trace_memory=trace_memory) as records:
+        result = func(*args)
+    return result, records
+
+
+def _map_in_parallel(func, files, jobs, *args):
+    """Call a function for each file in a process pool, largest first.
+
+    Parameters
+    ----------
+    func : callable
+        Function taking a path and `args`, e.g.
+        `_try_to_convert_single_file`; it must not raise.
+    files : list of str
+        Paths to the files.
+    jobs : int
+        Number of worker processes.
+    *args
+        Further arguments of the function.
+
+    Returns
+    -------
+    list
+        Return value of the function for each file.
+
+    """
+    collect = _metrics.is_collecting()
+    trace_memory = tracemalloc.is_tracing()
+
+    # Schedule the largest files first to balance the workers' load
+    order = sorted(range(len(files)),
+                   key=lambda i: os.path.getsize(files[i]),
+                   reverse=True)
+    results = [None]*len(files)
+    with _futures.ProcessPoolExecutor(max_workers=jobs) as ex:
+        futures = {
+            i: ex.submit(_run_in_worker, func, (files[i],) + args,
+                         collect, trace_memory)
+            for i in order
+            }
+        for i, future in futures.items():
+            results[i], records = future.result()
+            for r in records:
+                _metrics.emit(r)
+
+    return results
+
+
+def convert_to_tikz(paths, jobs=1, timeout=None, cache_dir=None,
+                    cache_size=64*2**20, edge_routing="straight",
+                    overlaps="warn", externalize=False):
     """Convert *.bsb file(s) into boilerplate TikZ file(s).
 
     Parameters
@@ -207,18 +941,207 @@ def convert_to_tikz(paths):
         If a 'path' element is a file, only it is converted;
         if it is a folder, all '*.bsb' files in it and its subfolders
         will be converted.
+    jobs : int, optional
+        Number of worker processes; if greater than one, files are
+        converted in parallel, largest first. Zero or None means
+        one worker per CPU.
+    timeout : float or None, optional
+        Maximum conversion time per file in seconds;
+        None means no timeout.
+    cache_dir : str or None, optional
+        Directory of a persistent cache of converted files;
+        None means no cache. Unchanged files are skipped.
+    cache_size : int, optional
+        Maximum size of the cache in bytes.
+    edge_routing : str, optional
+        Routing of the connections: 'straight' lines or 'orthogonal'
+        paths around the blocks.
+    overlaps : str, optional
+        Handling of overlapping blocks and coordinates: 'ignore',
+        'warn' (print a warning) or 'fail' (the conversion fails).
+        Files taken from the cache are not checked again.
+    externalize : bool, optional
+        If True, each picture is named for `\\tikzexternalize` after a
+        digest of its contents, so that it is only compiled again
+        if it changes; see `Blockschaltbild.export_to_stream`.
+
+    Returns
+    -------
+    ConversionSummary
+        Lists of converted files and of failed files with their errors.
+        Errors (including timeouts) are also printed to stderr, one line
+        per failed file; they are not raised, even for files named
+        explicitly.
 
     """
-    for p in paths:
-        if os.path.isdir(p):
-            for file in _find_bsb_files(p):
-                try:
-                    _convert_single_file(file)
-                except ValueError as e:
-                    print("ValueError in {:s}:".format(file), e)
-                except TypeError as e:
-                    print("TypeError in {:s}:".format(file), e)
-        elif os.path.isfile(p):
-            _convert_single_file(p)
+    # Collect all files first; fail early if a path does not exist
+    files = _collect_bsb_files(paths)
+
+    if not jobs:
+        jobs = os.cpu_count() or 1
+
+    settings = {"edge_routing": edge_routing, "overlaps": overlaps,
+                "externalize": externalize}
+    if cache_dir is None:
+        cache = None
+    else:
+        cache = ConversionCache(cache_dir, cache_size, settings)
+
+    with _metrics.phase("run"):
+        if jobs == 1 or len(files) < 2:
+            errors = [_try_to_convert_single_file(f, timeout, cache, settings)
+                      for f in files]
         else:
-            raise ValueError("File or folder '{:s}' not found.".format(p))
+            errors = _map_in_parallel(_try_to_convert_single_file, files,
+                                      jobs, timeout, cache, settings)
+
+        if cache is not None:
+            cache.evict()
+
+    summary = ConversionSummary(succeeded=[], failed=[])
+    for file, e in zip(files, errors):
+        if e is None:
+            summary.succeeded.append(file)
+        else:
+            print("{:s} in {:s}:".format(type(e).__name__, file), e,
+                  file=sys.stderr)
+            summary.failed.append((file, e))
+
+    return summary
+
+
+def _check_text(lines, directory=""):
+    """Check the structure of a Blockschaltbild given as text.
+
+    Blocks are neither placed automatically nor joined by auto joints,
+    since neither changes the structure; subsystems are included.
+
+    Parameters
+    ----------
+    lines : iterable of str
+        Text lines with the Blockschaltbild specification.
+    directory : str, optional
+        Directory of relative subsystem paths; '' means the current
+        working directory.
+
+    Returns
+    -------
+    list of Finding
+        Findings, see `Blockschaltbild.check_structure`.
+
+    """
+    with _metrics.phase("parse"):
+        parsed = _parse_text(lines)
+
+    bsb = Blockschaltbild()
+    renames = _import_text(bsb, parsed, directory, _SubsystemLoader(),
+                           layout=False)
+    with _metrics.phase("names") as ph:
+        bsb.import_tokens(renames=renames)
+        ph.set_diagram(bsb)
+
+    with _metrics.phase("check") as ph:
+        findings = bsb.check_structure()
+        ph.set_diagram(bsb)
+    return findings
+
+
+def _check_single_file(filename):
+    """Check the structure of a single .bsb file.
+
+    Parameters
+    ----------
+    filename : str
+        Path to the file to be checked.
+
+    Returns
+    -------
+    list of Finding
+        Findings, see `Blockschaltbild.check_structure`.
+
+    """
+    # Check file extension
+    if not fnmatch.fnmatch(filename, '*.bsb'):
+        raise ValueError("The input file must have a 'bsb' extension")
+
+    with _metrics.phase("file", filename):
+        return _check_text(_iter_file_lines(filename),
+                           os.path.dirname(filename))
+
+
+def _try_to_check_single_file(filename, timeout=None):
+    """Check a single .bsb file, returning an exception instead of raising.
+
+    Parameters
+    ----------
+    filename : str
+        Path to the file to be checked.
+    timeout : float or None, optional
+        Maximum run time in seconds; None means no timeout.
+
+    Returns
+    -------
+    findings : list of Finding or None
+        Findings, see `Blockschaltbild.check_structure`;
+        None if the check has failed.
+    error : Exception or None
+        ValueError, TypeError or TimeoutError if the check has failed,
+        None otherwise.
+
+    """
+    try:
+        return _call_with_timeout(timeout, _check_single_file, filename), None
+    except (ValueError, TypeError, TimeoutError) as e:
+        return None, e
+
+
+def check_files(paths, jobs=1, timeout=None):
+    """Check the structure of *.bsb file(s) without converting them.
+
+    Each file is checked for algebraic loops and unconnected blocks, see
+    `Blockschaltbild.check_structure`; the findings are printed to
+    stdout, one per line, errors to stderr. No output files are written.
+
+    Parameters
+    ----------
+    paths : list of str
+        File or folder specification, see `convert_to_tikz`.
+    jobs : int, optional
+        Number of worker processes; if greater than one, files are
+        checked in parallel, largest first. Zero or None means
+        one worker per CPU.
+    timeout : float or None, optional
+        Maximum run time per file in seconds; None means no timeout.
+
+    Returns
+    -------
+    CheckSummary
+        Findings of the checked files and the failed files with
+        their errors.
+
+    """
+    # Collect all files first; fail early if a path does not exist
+    files = _collect_bsb_files(paths)
+
+    if not jobs:
+        jobs = os.cpu_count() or 1
+
+    with _metrics.phase("run"):
+        if jobs == 1 or len(files) < 2:
+            results = [_try_to_check_single_file(f, timeout) for f in files]
+        else:
+            results = _map_in_parallel(_try_to_check_single_file, files,
+                                       jobs, timeout)
+
+    summary = CheckSummary(findings={}, failed=[])
+    for file, (findings, e) in zip(files, results):
+        if e is None:
+            summary.findings[file] = findings
+            for finding in findings:
+                print("{:s}:".format(file), format_finding(finding))
+        else:
+            print("{:s} in {:s}:".format(type(e).__name__, file), e,
+                  file=sys.stderr)
+            summary.failed.append((file, e))
+
+    return summary
@@ -1,14 +1,52 @@
 """Block diagram class."""
 
 
+from ._lazy import LazyModule
+from .analysis import Finding, find_structural_issues
+from .layout import layered_layout
+from .overlaps import find_overlaps
+from .routing import route_orthogonal
 from abc import ABCMeta, abstractmethod
-import numpy as np
+from collections import namedtuple
+import hashlib
+import io
+import itertools
+import json
 import re
+import struct
 
 
 # Export only the Blockschaltbild class
 __all__ = ["Blockschaltbild"]
 
+
+# Importing NumPy takes longer than converting a small diagram,
+# so it is imported only when the array backend is used
+np = LazyModule("numpy")
+
+# Backends storing the blocks of a Blockschaltbild: lists ('python'),
+# NumPy arrays ('numpy') or lists switching to arrays for large
+# Blockschaltbilder ('auto')
+_BACKENDS = ("auto", "python", "numpy")
+
+# Number of blocks from which on the automatic backend uses arrays
+_NUMPY_MIN_BLOCKS = 2000
+
+# Routing of the connections: straight lines or orthogonal paths
+# around the blocks, see `routing.route_orthogonal`
+_EDGE_ROUTINGS = ("straight", "orthogonal")
+
+# TeX units of block sizes, in cm
+_CM_PER_UNIT = {
+    "cm": 1.0,
+    "mm": 0.1,
+    "in": 2.54,
+    "pt": 2.54/72.27,
+    "bp": 2.54/72,
+    "pc": 12*2.54/72.27,
+    }
+_RE_LENGTH = re.compile(r"^\s*([-+]?(?:\d+\.?\d*|\.\d+))\s*([a-z]+)\s*$")
+
 # Constant IDs for scalar-typed and vector-typed connections
 # Please do not modify these!
 # And in case you do, these must be unique, positive, int numbers;
@@ -34,6 +72,21 @@ _BLOCKS_NUM_PARS = {
     "Saettigung": 2,
     }
 
+# Block types in the order of their type codes; further block types
+# get their codes when they are added to a Blockschaltbild
+_BLOCK_TYPES = tuple(_BLOCKS_NUM_PARS)
+_COORDINATE_CODE = _BLOCK_TYPES.index("coordinate")
+_JOINT_CODE = _BLOCK_TYPES.index("Verzweigung")
+# Connections leave and enter the blocks of all other block types
+# horizontally when they are routed orthogonally
+_ROUND_CODES = (_COORDINATE_CODE, _JOINT_CODE,
+                _BLOCK_TYPES.index("Summationsstelle"))
+
+# Block types with dynamics, which break algebraic loops; general
+# transfer functions may have a direct feedthrough, so they do not
+_DYNAMIC_BLOCK_TYPES = frozenset(
+    ["IGlied", "PTEinsGlied", "PTZweiGlied", "TZGlied"])
+
 # Const dict for 'translation' of short IDs into the full-fledged block types
 # Required for import from ASCII graphics-like sketches
 _SHORT_ID_TO_BLOCK_TYPES = {
@@ -52,8 +105,52 @@ _SHORT_ID_TO_BLOCK_TYPES = {
     "sat": "Saettigung",
     }
 
+
+def _trie_pattern(words):
+    """Create a regex pattern matching any of the words, ordered as a trie.
+
+    Common prefixes are matched only once, e.g. ['p', 'pte', 'ptz']
+    results in 'p(?:t(?:e|z))?'. This avoids backtracking through
+    alternatives sharing a prefix.
+
+    Parameters
+    ----------
+    words : iterable of str
+        Words to be matched.
+
+    Returns
+    -------
+    str
+        Regex pattern without an enclosing group.
+
+    """
+    # Build a trie of nested dicts; an empty key marks the end of a word
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def node_pattern(node):
+        alternatives = [re.escape(char) + node_pattern(child)
+                        for char, child in sorted(node.items()) if char]
+        if not alternatives:
+            return ""
+        if len(alternatives) == 1 and "" not in node:
+            return alternatives[0]
+        pattern = "(?:" + "|".join(alternatives) + ")"
+        # The rest is optional if a word ends at this node
+        if "" in node:
+            pattern += "?"
+        return pattern
+
+    return "|".join(re.escape(char) + node_pattern(child)
+                    for char, child in sorted(trie.items()))
+
+
 # Prepare OR-ed short IDs to be used later in regexen
-_ALL_SHORT_IDS = "|".join(_SHORT_ID_TO_BLOCK_TYPES.keys())
+_ALL_SHORT_IDS = _trie_pattern(_SHORT_ID_TO_BLOCK_TYPES.keys())
 
 # Pattern and regex for matching blocks in sketches
 _PATTERN_IMPORT_SKETCH = r"""
@@ -63,9 +160,22 @@ _PATTERN_IMPORT_SKETCH = r"""
 _RE_IMPORT_SKETCH = re.compile(_PATTERN_IMPORT_SKETCH,
                                re.VERBOSE | re.IGNORECASE)
 
+# Separator of the name prefixes of subsystems and the block names,
+# e.g. 'R1_P1' is block 'P1' of subsystem 'R1'
+_PREFIX_SEPARATOR = "_"
+
+# Pattern and regex for matching name prefixes of subsystems
+_PATTERN_PREFIX = r"[a-z][a-z0-9]*"
+_RE_PREFIX = re.compile(_PATTERN_PREFIX + "$", re.IGNORECASE)
+
+# Pattern of the (nested) name prefixes of blocks in subsystems
+_PATTERN_PREFIXES = r"(?:{prefix:s}{sep:s})*".format(
+    prefix=_PATTERN_PREFIX, sep=_PREFIX_SEPARATOR)
+
 # Pattern and regex for matching connections specifications
 _PATTERN_IMPORT_CONNECTION = r"""
-(?P<from_id>{all_short_ids:s}) # Capture the short ID of the 'from'-block...
+(?P<from_prefix>{prefixes:s})  # Capture the prefixes of subsystems,
+(?P<from_id>{all_short_ids:s}) # the short ID of the 'from'-block...
 (?P<from_num>\d+)              # and at least one digit or more.
                                #
 \s*?                           # Here can be some whitespaces.
@@ -75,15 +185,17 @@ _PATTERN_IMPORT_CONNECTION = r"""
                                #
 \s*?                           # Here can be some whitespaces.
                                #
-(?P<to_id>{all_short_ids:s})   # Capture the short ID of the 'to'-block...
+(?P<to_prefix>{prefixes:s})    # Capture the prefixes of subsystems,
+(?P<to_id>{all_short_ids:s})   # the short ID of the 'to'-block...
 (?P<to_num>\d+)                # and at least one digit or more.
-""".format(all_short_ids=_ALL_SHORT_IDS)
+""".format(all_short_ids=_ALL_SHORT_IDS, prefixes=_PATTERN_PREFIXES)
 _RE_IMPORT_CONNECTION = re.compile(_PATTERN_IMPORT_CONNECTION,
                                    re.VERBOSE | re.IGNORECASE)
 
 # Pattern and regex for matching renaming specifications
 _PATTERN_IMPORT_RENAME = r"""
-(?P<old_id>{all_short_ids:s}) # Capture the short ID of the block to be renamed
+(?P<old_prefix>{prefixes:s})  # Capture the prefixes of subsystems,
+(?P<old_id>{all_short_ids:s}) # the short ID of the block to be renamed
 (?P<old_num>\d+)              # and at least one digit or more.
                               #
 \s*?                          # Here can be some whitespaces.
@@ -91,10 +203,213 @@ _PATTERN_IMPORT_RENAME = r"""
 \:                            # Capture a literal colon.
                               #
 (?P<new_name>.*)$             # Capture the rest of the line.
-""".format(all_short_ids=_ALL_SHORT_IDS)
+""".format(all_short_ids=_ALL_SHORT_IDS, prefixes=_PATTERN_PREFIXES)
 _RE_IMPORT_RENAME = re.compile(_PATTERN_IMPORT_RENAME,
                                re.VERBOSE | re.IGNORECASE)
 
+# Pattern and regex for matching subsystem specifications
+_PATTERN_IMPORT_SUBSYSTEM = r"""
+^(?P<prefix>{prefix:s})          # Capture the name prefix...
+\s*\:\s*                         # and a literal colon.
+(?P<path>.+?\.bsb)               # Capture the path to the *.bsb file.
+(?:\s+at\s+                      # Optionally, capture the position
+\(?\s*(?P<x>{number:s})          # as (x, y)-coordinates,
+\s*,\s*(?P<y>{number:s})\s*\)?   # with or without parentheses.
+)?\s*$
+""".format(prefix=_PATTERN_PREFIX,
+           number=r"[-+]?(?:\d+\.?\d*|\.\d+)(?:e[-+]?\d+)?")
+_RE_IMPORT_SUBSYSTEM = re.compile(_PATTERN_IMPORT_SUBSYSTEM,
+                                  re.VERBOSE | re.IGNORECASE)
+
+# Regex for special characters to be removed from new block names
+_RE_SPECIAL_CHARS = re.compile(r"[~!@#$%^&*()/\\,.;']")
+
+# Magic bytes and version of the binary format of saved Blockschaltbilder;
+# increase the version if the format changes
+_BINARY_MAGIC = b"BSBBIN\x00\x00"
+_BINARY_FORMAT_VERSION = 1
+# Binary prefix: magic bytes, format version and length of the JSON header
+_BINARY_PREFIX = struct.Struct("<8sII")
+# Alignment of the arrays in the binary format, in bytes
+_BINARY_ALIGNMENT = 64
+
+# Tags of the export sections, in the order of the export
+_SECTIONS = ("coordinates", "blocks", "connections")
+
+# Number of lines joined into a single write of a streaming export
+_LINES_PER_CHUNK = 1024
+
+# Prefix of the names of externalized pictures, see `export_to_stream`;
+# the rest of the name is a digest of the exported sections
+_EXTERNAL_PREFIX = "bsb-"
+_RE_EXTERNAL_NAME = re.compile(
+    r"\\tikzsetnextfilename\{" + _EXTERNAL_PREFIX + r"[0-9a-f]*\}\n")
+
+#: Changes of a Blockschaltbild since the last export, as lists in the
+#: order of the block indices: names of the added, removed and changed
+#: blocks and (from, to)-pairs of block names of the added, removed and
+#: changed connections
+Changes = namedtuple("Changes", [
+    "added_blocks",
+    "removed_blocks",
+    "changed_blocks",
+    "added_connections",
+    "removed_connections",
+    "changed_connections",
+    ])
+
+#: Blocks found in a sketch, as parallel lists: names, block types,
+#: columns (in chars) and rows (in lines, counted upwards from the bottom)
+SketchTokens = namedtuple("SketchTokens",
+                          ["names", "block_types", "cols", "rows"])
+
+
+class _SketchTokenizer:
+    """Tokenizer for ASCII graphics-like sketches, fed line by line."""
+
+    def __init__(self):
+        """Create a new tokenizer."""
+        #: int: Number of lines fed so far
+        self.num_lines = 0
+        # Number of the last non-empty line
+        self._last_non_empty = -1
+        # Accumulators of the tokens; rows are counted downwards here
+        self._names = []
+        self._block_types = []
+        self._cols = []
+        self._rows = []
+
+    def feed(self, line):
+        """Tokenize the next line of the sketch.
+
+        Parameters
+        ----------
+        line : str
+            Sketch line.
+
+        """
+        line_number = self.num_lines
+        self.num_lines += 1
+
+        if not line.strip():
+            return
+        self._last_non_empty = line_number
+
+        # Get everything that matches to the block short ID pattern
+        for m in _RE_IMPORT_SKETCH.finditer(line):
+            b_id = m.group("b_id")
+            # The block name is simply its short ID plus its number
+            self._names.append(b_id + m.group("b_num"))
+            # Get the block type from our conversion dictionary
+            self._block_types.append(_SHORT_ID_TO_BLOCK_TYPES[b_id.lower()])
+            # The column is the mean of the match beginning and end positions
+            start, end = m.span()
+            self._cols.append((start + end)/2)
+            self._rows.append(line_number)
+
+    def tokens(self):
+        """Get the tokens of all lines fed so far.
+
+        Returns
+        -------
+        SketchTokens
+            Blocks found in the sketch. Rows are counted upwards from
+            the last non-empty line, i.e. empty lines at the bottom
+            of the sketch are ignored. Blocks are ordered line by line
+            from the bottom to the top and from left to right.
+
+        """
+        rows = [self._last_non_empty - row for row in self._rows]
+        # Tokens are accumulated from the top to the bottom;
+        # a stable sort by the rows keeps the left-to-right order
+        order = sorted(range(len(rows)), key=rows.__getitem__)
+        return SketchTokens(
+            [self._names[i] for i in order],
+            [self._block_types[i] for i in order],
+            [self._cols[i] for i in order],
+            [rows[i] for i in order],
+            )
+
+
+def _parse_connection(line):
+    """Parse a connection specification.
+
+    Parameters
+    ----------
+    line : str
+        Line with a connection specification.
+
+    Returns
+    -------
+    tuple or None
+        (Name of the 'from'-block, name of the 'to'-block, True if
+        the connection is vector-valued) or None if the line contains
+        no connection specification.
+
+    """
+    # Try to match the connection pattern once
+    m = _RE_IMPORT_CONNECTION.search(line)
+    if m is None:
+        return None
+    return (
+        m.group("from_prefix") + m.group("from_id") + m.group("from_num"),
+        m.group("to_prefix") + m.group("to_id") + m.group("to_num"),
+        # Distinguish between scalar and vector connections
+        m.group("line_type") == "=",
+        )
+
+
+def _parse_rename(line):
+    """Parse a renaming specification.
+
+    Parameters
+    ----------
+    line : str
+        Line with a renaming specification.
+
+    Returns
+    -------
+    tuple or None
+        (Old block name, new block name) or None if the line
+        contains no renaming specification.
+
+    """
+    # Try to match the rename pattern once
+    m = _RE_IMPORT_RENAME.search(line.strip())
+    if m is None:
+        return None
+    # Remove some special characters from the new block name and
+    # strip the whitespaces
+    new_name = _RE_SPECIAL_CHARS.sub(" ", m.group("new_name")).strip()
+    return (m.group("old_prefix") + m.group("old_id") + m.group("old_num"),
+            new_name)
+
+
+def _parse_subsystem(line):
+    """Parse a subsystem specification.
+
+    Parameters
+    ----------
+    line : str
+        Line with a subsystem specification, e.g. 'R1: regler.bsb at 6, 3'.
+
+    Returns
+    -------
+    tuple or None
+        (Name prefix, path to the *.bsb file, (x, y)-position of the
+        subsystem) or None if the line contains no subsystem specification.
+        The position defaults to (0, 0).
+
+    """
+    m = _RE_IMPORT_SUBSYSTEM.match(line.strip())
+    if m is None:
+        return None
+    if m.group("x") is None:
+        xy = (0.0, 0.0)
+    else:
+        xy = (float(m.group("x")), float(m.group("y")))
+    return m.group("prefix"), m.group("path"), xy
+
 
 def _write_a_tikz_coordinate(name, xy, num_fmt):
     """Write a TikZ coordinate definition.
@@ -125,9 +440,440 @@ def _write_a_tikz_coordinate(name, xy, num_fmt):
     return tex_str
 
 
+def _format_numbers(values, num_fmt):
+    """Format an array of floats in bulk.
+
+    Each distinct value is formatted only once; values are compared by
+    their bit patterns, so e.g. 0.0 and -0.0 are formatted separately.
+
+    Parameters
+    ----------
+    values : numpy.ndarray
+        Float array.
+    num_fmt : str
+        Specification of the numbers format, e.g. '.4f'.
+
+    Returns
+    -------
+    list of str
+        Formatted numbers in the order of the flattened array.
+
+    """
+    bits = np.ascontiguousarray(values, dtype=float).ravel().view(np.int64)
+    unique_bits, inverse = np.unique(bits, return_inverse=True)
+    formatted = np.array(
+        [format(v, num_fmt) for v in unique_bits.view(float).tolist()]
+        + [""], dtype=object)[:-1]
+    return formatted[inverse.ravel()].tolist()
+
+
+def _parse_length(size):
+    """Convert a TeX length into cm.
+
+    Parameters
+    ----------
+    size : str or None
+        Length with a unit, e.g. '1 cm' or '2 pt'.
+
+    Returns
+    -------
+    float
+        Length in cm; zero if it is None or cannot be converted,
+        e.g. if it is given by a macro.
+
+    """
+    m = _RE_LENGTH.match(size or "")
+    if m is None or m.group(2) not in _CM_PER_UNIT:
+        return 0.0
+    return float(m.group(1))*_CM_PER_UNIT[m.group(2)]
+
+
+def _format_waypoint(value):
+    """Format a coordinate of a waypoint of a connection, in cm."""
+    # Fixed-point notation, since TikZ does not understand exponents
+    return "{:.4f}".format(value).rstrip("0").rstrip(".")
+
+
+def _encode_strings(strings):
+    """Encode strings as a string table.
+
+    Parameters
+    ----------
+    strings : list of str
+        Strings to encode.
+
+    Returns
+    -------
+    offsets : numpy.ndarray
+        Int array with N + 1 character offsets into the joined strings.
+    blob : numpy.ndarray
+        Byte array with the joined strings encoded as UTF-8.
+
+    """
+    offsets = np.zeros(len(strings) + 1, dtype="<i8")
+    np.cumsum(np.fromiter(map(len, strings), dtype=np.int64,
+                          count=len(strings)), out=offsets[1:])
+    blob = np.frombuffer("".join(strings).encode("utf-8"), dtype=np.uint8)
+    return offsets, blob
+
+
+def _decode_strings(offsets, blob):
+    """Decode a string table created by `_encode_strings`.
+
+    Parameters
+    ----------
+    offsets : numpy.ndarray
+        Int array with N + 1 character offsets into the joined strings.
+    blob : numpy.ndarray
+        Byte array with the joined strings encoded as UTF-8.
+
+    Returns
+    -------
+    list of str
+        Decoded strings.
+
+    """
+    text = blob.tobytes().decode("utf-8")
+    offsets = offsets.tolist()
+    return [text[a:b] for a, b in zip(offsets[:-1], offsets[1:])]
+
+
+def _write_a_latex_definition(block_type, name, size, pars):
+    """Write a LaTeX block definition.
+
+    Parameters
+    ----------
+    block_type : str
+        Block type specification.
+    name : str
+        Block name.
+    size : str
+        Block size (including units!).
+    pars : list or tuple
+        Additional parameters for the block.
+
+    Returns
+    -------
+    str
+        LaTeX command with the block definition.
+
+    """
+    tex_str = "\\"
+    # Write block type
+    tex_str += block_type
+    # Write block node name
+    tex_str += "{" + name + "}"
+    # Write block coordinate's node
+    tex_str += "{" + name + "--coord}"
+    # Write block size
+    tex_str += "{" + size + "}"
+    # Write parameters only if there are any
+    if pars:
+        tex_str += "{" + "}{".join(pars) + "}"
+    # Return LaTeX str
+    return tex_str
+
+
+def _iter_chunks(lines):
+    """Join lines with newline chars, a bounded number of lines at a time.
+
+    Parameters
+    ----------
+    lines : iterable of str
+        Lines without newline chars.
+
+    Yields
+    ------
+    str
+        Consecutive parts of the lines joined with newline chars;
+        all parts but the first start with a newline char.
+
+    """
+    lines = iter(lines)
+    separator = ""
+    while True:
+        chunk = list(itertools.islice(lines, _LINES_PER_CHUNK))
+        if not chunk:
+            return
+        yield separator + "\n".join(chunk)
+        separator = "\n"
+
+
+def _write_tikz_section(fileobj, tag, lines, digest=None):
+    """Write a section of a TikZ file enclosed in marker comments.
+
+    Parameters
+    ----------
+    fileobj : file-like object
+        Target text stream.
+    tag : str
+        Section tag used in the marker comments, e.g. 'blocks'.
+    lines : iterable of str
+        Section lines without newline chars.
+        An empty section results in an empty line.
+    digest : hash object or None, optional
+        If given, it is updated with the section lines joined with
+        newline chars, see `_digest`.
+
+    """
+    opening, closing = _section_markers(tag)
+    fileobj.write(opening)
+    for chunk in _iter_chunks(lines):
+        fileobj.write(chunk)
+        if digest is not None:
+            digest.update(chunk.encode("utf-8"))
+    fileobj.write(closing + "\n\n")
+
+
+def _section_markers(tag):
+    """Get the marker comments enclosing a section of a TikZ file.
+
+    Parameters
+    ----------
+    tag : str
+        Section tag, e.g. 'blocks'.
+
+    Returns
+    -------
+    opening : str
+        Opening marker including the following newline char.
+    closing : str
+        Closing marker including the enclosing newline chars.
+
+    """
+    return "% <" + tag + ">\n", "\n% </" + tag + ">\n"
+
+
+def _split_tikz_sections(text):
+    """Split an exported TikZ text into its sections and the text between.
+
+    Parameters
+    ----------
+    text : str
+        Exported TikZ text.
+
+    Returns
+    -------
+    tuple or None
+        (List of the texts before, between and after the sections,
+        dict mapping section tags onto section texts) or None if the
+        text does not contain all sections.
+
+    """
+    between = []
+    sections = {}
+    pos = 0
+    for tag in _SECTIONS:
+        opening, closing = _section_markers(tag)
+        start = text.find(opening, pos)
+        if start < 0:
+            return None
+        end = text.find(closing, start + len(opening))
+        if end < 0:
+            return None
+        between.append(text[pos:start])
+        sections[tag] = text[start + len(opening):end]
+        pos = end + len(closing)
+    between.append(text[pos:])
+    return between, sections
+
+
+def _edge_keys(from_idx, to_idx):
+    """Combine (from, to)-pairs of block indices into int64 keys.
+
+    Parameters
+    ----------
+    from_idx : numpy.ndarray
+        Indices of the 'from'-blocks.
+    to_idx : numpy.ndarray
+        Indices of the 'to'-blocks.
+
+    Returns
+    -------
+    numpy.ndarray
+        Int64 array with one key per pair.
+
+    """
+    return (np.asarray(from_idx, dtype=np.int64) << 32) | to_idx
+
+
+def _new_digest():
+    """Create a hash object for the digests of exported sections."""
+    return hashlib.blake2b(digest_size=16)
+
+
+def _digest(text):
+    """Get a digest of a text, used to recognise exported sections."""
+    digest = _new_digest()
+    digest.update(text.encode("utf-8"))
+    return digest.digest()
+
+
+def _digest_lines(lines):
+    """Get the digest of lines joined with newline chars, see `_digest`."""
+    digest = _new_digest()
+    for chunk in _iter_chunks(lines):
+        digest.update(chunk.encode("utf-8"))
+    return digest.digest()
+
+
+def _external_name_line(digests):
+    """Get the line naming an externalized picture after its contents.
+
+    Parameters
+    ----------
+    digests : dict
+        Dict mapping section tags onto the digests of the exported
+        section texts, see `_digest`.
+
+    Returns
+    -------
+    str
+        `\\tikzsetnextfilename` command including the following newline
+        char; equal sections always result in the same name.
+
+    """
+    digest = _new_digest()
+    for tag in _SECTIONS:
+        digest.update(tag.encode("utf-8") + b"\0" + digests[tag])
+    name = _EXTERNAL_PREFIX + digest.hexdigest()
+    return "\\tikzsetnextfilename{" + name + "}\n"
+
+
+def _replace_external_name_line(text, line):
+    """Replace the externalized name in the text before a picture.
+
+    Parameters
+    ----------
+    text : str
+        Text before the sections of an exported TikZ file.
+    line : str
+        New line naming the picture, see `_external_name_line`;
+        '' removes the name.
+
+    Returns
+    -------
+    str
+        Text with the new name. If there was no name, it is placed
+        before the opening tag of the picture.
+
+    """
+    match = _RE_EXTERNAL_NAME.search(text)
+    if match is not None:
+        return text[:match.start()] + line + text[match.end():]
+    pos = max(text.rfind("\\begin{tikzpicture}"), 0)
+    return text[:pos] + line + text[pos:]
+
+
+class _InternTable:
+    """Table of distinct values, each identified by a small int code."""
+
+    __slots__ = ("values", "_codes")
+
+    def __init__(self, values=()):
+        """Create a new table.
+
+        Parameters
+        ----------
+        values : iterable, optional
+            Initial values; they get the codes 0, 1, ...
+
+        """
+        #: list: Values in the order of their codes
+        self.values = []
+        # Dict mapping values onto codes
+        self._codes = {}
+        for value in values:
+            self.code(value)
+
+    def code(self, value):
+        """Get the code of a value, adding the value if it is new.
+
+        Parameters
+        ----------
+        value : hashable
+            Value to look up.
+
+        Returns
+        -------
+        int
+            Code of the value.
+
+        """
+        c = self._codes.get(value)
+        if c is None:
+            c = len(self.values)
+            self._codes[value] = c
+            self.values.append(value)
+        return c
+
+
+class _ChangeJournal:
+    """Journal of the changes of a Blockschaltbild since the last export.
+
+    Blocks are identified by their indices, connections by
+    (from, to)-pairs of block indices. An entity which is added and
+    removed again is forgotten; a connection which is removed and added
+    again is changed.
+
+    """
+
+    __slots__ = ("added_blocks", "removed_blocks", "changed_blocks",
+                 "added_edges", "removed_edges", "changed_edges",
+                 "restyled")
+
+    def __init__(self):
+        """Create an empty journal."""
+        self.added_blocks = set()
+        self.removed_blocks = set()
+        self.changed_blocks = set()
+        self.added_edges = set()
+        self.removed_edges = set()
+        self.changed_edges = set()
+        #: bool: True if the connection styles have changed
+        self.restyled = False
+
+    def add_blocks(self, indices):
+        """Record added blocks."""
+        self.added_blocks.update(indices)
+
+    def change_blocks(self, indices):
+        """Record changed blocks."""
+        self.changed_blocks.update(indices)
+        self.changed_blocks -= self.added_blocks
+
+    def remove_block(self, idx):
+        """Record a removed block."""
+        if idx in self.added_blocks:
+            self.added_blocks.remove(idx)
+        else:
+            self.changed_blocks.discard(idx)
+            self.removed_blocks.add(idx)
+
+    def add_edges(self, edges):
+        """Record added connections."""
+        for e in edges:
+            if e in self.removed_edges:
+                self.removed_edges.remove(e)
+                self.changed_edges.add(e)
+            else:
+                self.added_edges.add(e)
+
+    def remove_edges(self, edges):
+        """Record removed connections."""
+        for e in edges:
+            if e in self.added_edges:
+                self.added_edges.remove(e)
+            else:
+                self.changed_edges.discard(e)
+                self.removed_edges.add(e)
+
+
 class AbstractBlock(metaclass=ABCMeta):
     """Class for an abstract block."""
 
+    __slots__ = ()
+
     @abstractmethod
     def get_tikz_coordinate(self, num_fmt):
         pass
@@ -140,6 +886,8 @@ class AbstractBlock(metaclass=ABCMeta):
 class Block(AbstractBlock):
     """Blockschaltbild block class."""
 
+    __slots__ = ("block_type", "name", "xy", "size", "pars")
+
     def __init__(self, block_type, name, xy, size, pars=None):
         """Create a new block.
 
@@ -200,25 +948,15 @@ class Block(AbstractBlock):
             LaTeX command with the block definition.
 
         """
-        tex_str = "\\"
-        # Write block type
-        tex_str += self.block_type
-        # Write block node name
-        tex_str += "{" + self.name + "}"
-        # Write block coordinate's node
-        tex_str += "{" + self.name + "--coord}"
-        # Write block size
-        tex_str += "{" + self.size + "}"
-        # Write parameters only if there are any
-        if self.pars:
-            tex_str += "{" + "}{".join(self.pars) + "}"
-        # Return LaTeX str
-        return tex_str
+        return _write_a_latex_definition(self.block_type, self.name,
+                                         self.size, self.pars)
 
 
 class BlockschaltbildCoordinate(AbstractBlock):
     """Blockschaltbild coordinate class."""
 
+    __slots__ = ("name", "block_type", "xy")
+
     def __init__(self, name, xy):
         """Create a new coordinate.
 
@@ -265,27 +1003,106 @@ class BlockschaltbildCoordinate(AbstractBlock):
         return None
 
 
-class Blockschaltbild:
-    """Class for block diagrams."""
+class _BlockViewMixin:
+    """Attributes of a block stored in the arrays of a Blockschaltbild.
 
-    def __init__(self,
-                 x_scale=0.5,
-                 y_scale=1.5,
-                 block_sizes=None,
-                 scalar_style=None,
-                 vector_style=None,
-                 arrow_style=None
-                 ):
-        """Create a Blockschaltbild object.
+    Reading an attribute reads the arrays, assigning an attribute
+    updates the arrays through the Blockschaltbild.
+
+    """
+
+    __slots__ = ()
+
+    def __init__(self, bsb, idx):
+        """Create a view of a block.
 
         Parameters
         ----------
-        x_scale : float, optional
-            Default x-axis scale in cm.
-        y_scale : float, optional
-            Default y-axis scale in cm.
-            It should be larger than the x-scale (2x .. 3x).
-        block_sizes : dict, optional
+        bsb : Blockschaltbild
+            Block diagram storing the block.
+        idx : int
+            Block index.
+
+        """
+        object.__setattr__(self, "_bsb", bsb)
+        object.__setattr__(self, "_idx", idx)
+
+    def __setattr__(self, attr, value):
+        if attr not in self._VIEW_ATTRS:
+            raise AttributeError(
+                "'{:s}' object has no attribute '{:s}'".format(
+                    type(self).__name__, attr))
+        self._bsb._set_block_attr(self._idx, attr, value)
+
+    def __repr__(self):
+        return "<{:s} '{:s}' of {!r}>".format(
+            type(self).__name__, self.name, self._bsb)
+
+    @property
+    def name(self):
+        """str: Block name."""
+        return self._bsb._names[self._idx]
+
+    @property
+    def block_type(self):
+        """str: Block type specification."""
+        return self._bsb._types.values[self._bsb._type_codes[self._idx]]
+
+    @property
+    def xy(self):
+        """tuple of floats: Block (x, y)-coordinates."""
+        return tuple(map(float, self._bsb._xy[self._idx]))
+
+
+class _BlockView(_BlockViewMixin, Block):
+    """View of a block stored in a Blockschaltbild."""
+
+    __slots__ = ("_bsb", "_idx")
+
+    _VIEW_ATTRS = frozenset(Block.__slots__)
+
+    @property
+    def size(self):
+        """str: Block size (including units!)."""
+        return self._bsb._sizes.values[self._bsb._size_codes[self._idx]]
+
+    @property
+    def pars(self):
+        """list or tuple: Additional parameters for the block."""
+        return self._bsb._get_pars(self._idx)
+
+
+class _CoordinateView(_BlockViewMixin, BlockschaltbildCoordinate):
+    """View of a coordinate stored in a Blockschaltbild."""
+
+    __slots__ = ("_bsb", "_idx")
+
+    _VIEW_ATTRS = frozenset(BlockschaltbildCoordinate.__slots__)
+
+
+class Blockschaltbild:
+    """Class for block diagrams."""
+
+    def __init__(self,
+                 x_scale=0.5,
+                 y_scale=1.5,
+                 block_sizes=None,
+                 scalar_style=None,
+                 vector_style=None,
+                 arrow_style=None,
+                 backend="auto",
+                 edge_routing="straight",
+                 ):
+        """Create a Blockschaltbild object.
+
+        Parameters
+        ----------
+        x_scale : float, optional
+            Default x-axis scale in cm.
+        y_scale : float, optional
+            Default y-axis scale in cm.
+            It should be larger than the x-scale (2x .. 3x).
+        block_sizes : dict, optional
             Default block sizes.
         scalar_style : str, optional
             Style of scalar-valued connections.
@@ -293,17 +1110,79 @@ class Blockschaltbild:
             Style of vector-valued connections.
         arrow_style : str, optional
             Style of the arrow tips.
+        backend : str, optional
+            Storage of the blocks: 'python' (lists), 'numpy' (arrays)
+            or 'auto', i.e. lists for small and medium Blockschaltbilder
+            and arrays from `_NUMPY_MIN_BLOCKS` blocks on. Lists avoid
+            importing NumPy, arrays are faster for large Blockschaltbilder.
+        edge_routing : str, optional
+            Routing of the connections: 'straight' lines or 'orthogonal'
+            paths around the blocks.
 
         """
+        if backend not in _BACKENDS:
+            raise ValueError("Unknown backend '{:s}'!".format(backend))
+        if edge_routing not in _EDGE_ROUTINGS:
+            raise ValueError(
+                "Unknown edge routing '{:s}'!".format(edge_routing))
+
         # Store scale information
         self.x_scale = x_scale
         self.y_scale = y_scale
 
-        # Create an empty list for blocks and coordinates
-        self._blocks = []
-
-        # Create an empty adjacency matrix
-        self._adj_mat = np.zeros((0, 0), dtype=np.int)
+        # Blocks and coordinates are stored as a struct of arrays indexed
+        # by block indices. Indices are never reused, so they remain valid
+        # after deletions and preserve insertion order. The arrays are
+        # lists or, with the array backend, NumPy arrays growing
+        # geometrically; only the first `self._next_idx` rows are used.
+        # * `self._xy`: (x, y)-coordinates, list of (x, y)-tuples
+        #   or float array of shape (N, 2)
+        # * `self._type_codes`: codes of the block types in `self._types`
+        # * `self._size_codes`: codes of the block sizes in `self._sizes`
+        # * `self._alive`: False for deleted blocks
+        self._xy = []
+        self._type_codes = []
+        self._size_codes = []
+        self._alive = []
+        # True if the arrays are NumPy arrays
+        self._numpy = False
+        # True if the arrays are switched to NumPy arrays automatically
+        self._auto_backend = backend == "auto"
+        # Block names, indexed by block indices
+        self._names = []
+        # Interned block types and sizes, shared by all blocks
+        self._types = _InternTable(_BLOCK_TYPES)
+        self._sizes = _InternTable()
+        # Dict mapping block indices onto parameters; blocks with the
+        # default parameters of their block type have no entry
+        self._pars = {}
+        # Index to be assigned to the next block
+        self._next_idx = 0
+        # Create an empty dict mapping block names onto block indices
+        self._name_to_idx = {}
+
+        # Create an empty sparse adjacency structure (dict of dicts);
+        # `self._adj[idx_from][idx_to]` is the type of the connection.
+        # Every block has an entry, which is empty if there are
+        # no outgoing connections.
+        self._adj = {}
+
+        # Array of block indices in the left-to-right order of the export;
+        # None means it has to be recomputed
+        self._order = None
+        # Sorted connection arrays, see `_get_sorted_edges()`;
+        # None means they have to be recomputed
+        self._edge_order = None
+
+        # Journal of the changes since the last export and a snapshot
+        # of the last export, which are used to patch exported files;
+        # both are only kept if changes are tracked, see `track_changes()`,
+        # and None before the first export afterwards
+        self._tracking = False
+        self._journal = None
+        self._exported = None
+
+        self._edge_routing = edge_routing
 
         # Create a default block sizes dict if none is given
         if block_sizes is None:
@@ -346,10 +1225,122 @@ class Blockschaltbild:
         # Initialise a counter for automatically placed joints
         self._auto_joints_counter = 0
 
+        if backend == "numpy":
+            self._use_numpy()
+
+    @property
+    def scalar_style(self):
+        """str: Style of scalar-valued connections."""
+        return self._scalar_style
+
+    @scalar_style.setter
+    def scalar_style(self, value):
+        self._scalar_style = value
+        self._invalidate("connections")
+        if self._journal is not None:
+            self._journal.restyled = True
+
+    @property
+    def vector_style(self):
+        """str: Style of vector-valued connections."""
+        return self._vector_style
+
+    @vector_style.setter
+    def vector_style(self, value):
+        self._vector_style = value
+        self._invalidate("connections")
+        if self._journal is not None:
+            self._journal.restyled = True
+
+    @property
+    def arrow_style(self):
+        """str: Style of the arrow tips."""
+        return self._arrow_style
+
+    @arrow_style.setter
+    def arrow_style(self, value):
+        self._arrow_style = value
+        self._invalidate("connections")
+        if self._journal is not None:
+            self._journal.restyled = True
+
+    @property
+    def edge_routing(self):
+        """str: Routing of the connections, 'straight' or 'orthogonal'."""
+        return self._edge_routing
+
+    @edge_routing.setter
+    def edge_routing(self, value):
+        if value not in _EDGE_ROUTINGS:
+            raise ValueError("Unknown edge routing '{:s}'!".format(value))
+        self._edge_routing = value
+        self._invalidate("connections")
+        if self._journal is not None:
+            self._journal.restyled = True
+
+    @classmethod
+    def from_arrays(cls, block_types, names, xys, edges=None, is_vector=False,
+                    sizes=None, pars=None, **kwargs):
+        """Create a Blockschaltbild from arrays of blocks and connections.
+
+        Parameters
+        ----------
+        block_types : sequence of str
+            Block type specifications.
+        names : sequence of str
+            Block names.
+        xys : sequence of pairs of floats or array_like, shape (N, 2)
+            Blocks (x, y)-coordinates.
+        edges : sequence of pairs of int or array_like, shape (E, 2), optional
+            Connections specified by the positions of the 'from'- and
+            'to'-blocks in `names`.
+        is_vector : bool or sequence of bool, optional
+            True if a connection is vector-valued, False if scalar.
+            A single bool applies to all connections.
+        sizes : sequence of str or None, optional
+            Block sizes (including units!).
+        pars : sequence of (list or tuple or None), optional
+            Additional parameters for the blocks.
+        **kwargs
+            Keyword arguments for the Blockschaltbild constructor.
+
+        Returns
+        -------
+        Blockschaltbild
+            A new block diagram.
+
+        """
+        bsb = cls(**kwargs)
+        bsb.add_blocks(block_types, names, xys, sizes, pars)
+
+        if edges is not None:
+            if hasattr(edges, "tolist"):
+                edges = edges.tolist()
+            if any(len(e) != 2 for e in edges):
+                raise ValueError("Connections must be pairs of positions!")
+            if any(not 0 <= p < bsb.num_blocks for e in edges for p in e):
+                raise ValueError("Connection refers to a non-existent block!")
+            # The new Blockschaltbild is empty, so block positions
+            # in the arrays and block indices coincide
+            from_idx, to_idx = zip(*edges) if edges else ((), ())
+            bsb._add_connections_by_idx(from_idx, to_idx, is_vector)
+
+        return bsb
+
     @property
     def num_blocks(self):
         """int: Number of blocks in the Blockschaltbild."""
-        return len(self._blocks)
+        return len(self._name_to_idx)
+
+    @property
+    def num_connections(self):
+        """int: Number of connections in the Blockschaltbild."""
+        return sum(map(len, self._adj.values()))
+
+    @property
+    def num_auto_joints(self):
+        """int: Number of automatically placed joints so far."""
+        return self._auto_joints_counter
 
     def _does_this_block_exist(self, block_name):
         """Check if a block exists.
@@ -365,7 +1356,7 @@ class Blockschaltbild:
             True if the block with name 'block_name' exists.
 
         """
-        return any(b.name == block_name for b in self._blocks)
+        return block_name in self._name_to_idx
 
     def _get_block_idx_by_name(self, block_name):
         """Search for a block, return its index or raise an exception if not found.
@@ -381,29 +1372,402 @@ class Blockschaltbild:
             Block index.
 
         """
-        idx = next(
-            (i for i, b in enumerate(self._blocks) if b.name == block_name),
-            None,
-            )
+        try:
+            return self._name_to_idx[block_name]
+        except KeyError:
+            raise ValueError(
+                "Block '{:s}' not found!".format(block_name)) from None
 
-        if idx is None:
-            raise ValueError("Block '{:s}' not found!".format(block_name))
+    def _invalidate(self, *sections):
+        """Drop cached data of the given export sections.
 
-        return idx
+        Parameters
+        ----------
+        *sections : str
+            Section tags, i.e. 'coordinates', 'blocks' or 'connections'.
+
+        """
+        # Orthogonal routes depend on the positions and sizes of all blocks
+        if self._edge_routing != "straight" and (
+                "coordinates" in sections or "blocks" in sections):
+            sections += ("connections",)
+        # Changes of the block order or of the connections
+        # affect the order of the connections
+        if "coordinates" in sections or "connections" in sections:
+            self._edge_order = None
+
+    def _set_block_attr(self, idx, attr, value):
+        """Change a block attribute and update internal structures.
 
-    def _get_sorted_blocks(self):
-        """Get a list of sorted blocks.
+        Deleted blocks can still be changed through their views; only
+        their own data is updated then.
+
+        Parameters
+        ----------
+        idx : int
+            Block index.
+        attr : str
+            Name of the attribute to be changed.
+        value : object
+            New value of the attribute.
+
+        """
+        alive = self._alive[idx]
+
+        if attr == "name":
+            old_name = self._names[idx]
+            if value == old_name:
+                return
+            if alive:
+                if self._does_this_block_exist(value):
+                    raise ValueError(
+                        "Block '{:s}' already exists!".format(value))
+                del self._name_to_idx[old_name]
+                self._name_to_idx[value] = idx
+            self._names[idx] = value
+        elif attr == "xy":
+            self._xy[idx] = self._as_xys([value])[0]
+            # The block may move in the left-to-right order
+            self._order = None
+        elif attr == "block_type":
+            # Keep the current parameters, even if they are the defaults
+            self._pars[idx] = self._get_pars(idx)
+            self._type_codes[idx] = self._types.code(value)
+            # Coordinates have no size; use the default size instead
+            if self._sizes.values[self._size_codes[idx]] is None:
+                self._size_codes[idx] = self._sizes.code(
+                    self.block_sizes.get(value))
+        elif attr == "size":
+            self._size_codes[idx] = self._sizes.code(value)
+        else:
+            self._pars[idx] = value
+
+        if alive:
+            if self._journal is not None:
+                self._journal.change_blocks((idx,))
+            if attr in ("size", "pars"):
+                self._invalidate("blocks")
+            else:
+                # The block type also determines the coordinate names
+                # and if the incoming connections have arrow tips
+                self._invalidate("coordinates", "blocks", "connections")
+
+    def _get_pars(self, idx):
+        """Get the parameters of a block.
+
+        Parameters
+        ----------
+        idx : int
+            Block index.
+
+        Returns
+        -------
+        list or tuple
+            Additional parameters for the block.
+
+        """
+        pars = self._pars.get(idx)
+        if pars is None:
+            pars = self._get_default_pars(
+                self._types.values[self._type_codes[idx]])
+        return pars
+
+    @staticmethod
+    def _get_default_pars(block_type):
+        """Get the default parameters of a block type.
+
+        Parameters
+        ----------
+        block_type : str
+            Block type specification.
+
+        Returns
+        -------
+        list of str
+            Empty parameters, one for each parameter of the block type.
+
+        """
+        return ["" for _ in range(_BLOCKS_NUM_PARS.get(block_type, 0))]
+
+    def _as_xys(self, xys, num=None):
+        """Convert block coordinates for the arrays of the backend.
+
+        Parameters
+        ----------
+        xys : sequence of pairs of floats or array_like, shape (N, 2)
+            Blocks (x, y)-coordinates.
+        num : int or None, optional
+            Expected number of blocks; None means any.
+
+        Returns
+        -------
+        list of tuples or numpy.ndarray
+            List of (x, y)-tuples of floats or float array of shape (N, 2).
+
+        """
+        if self._numpy:
+            return self._as_xy_array(xys, num)
+        return self._as_xy_list(xys, num)
+
+    @staticmethod
+    def _as_xy_list(xys, num=None):
+        """Convert block coordinates into a list of (x, y)-tuples.
+
+        Parameters
+        ----------
+        xys : sequence of pairs of floats or array_like, shape (N, 2)
+            Blocks (x, y)-coordinates.
+        num : int or None, optional
+            Expected number of blocks; None means any.
+
+        Returns
+        -------
+        list of tuples
+            List of (x, y)-tuples of floats.
+
+        """
+        if hasattr(xys, "tolist"):
+            xys = xys.tolist()
+        try:
+            xys = [(float(x), float(y)) for x, y in xys]
+        except (TypeError, ValueError):
+            raise ValueError("Block coordinates must be (x, y)-pairs!") \
+                from None
+        if num is not None and len(xys) != num:
+            raise ValueError("All block specifications must have "
+                             "the same length!")
+        return xys
+
+    @staticmethod
+    def _as_xy_array(xys, num=None):
+        """Convert block coordinates into a float array of shape (N, 2).
+
+        Parameters
+        ----------
+        xys : sequence of pairs of floats or array_like, shape (N, 2)
+            Blocks (x, y)-coordinates.
+        num : int or None, optional
+            Expected number of blocks; None means any.
+
+        Returns
+        -------
+        numpy.ndarray
+            Float array of shape (N, 2).
+
+        """
+        try:
+            xys = np.array(xys, dtype=float)
+        except (TypeError, ValueError):
+            raise ValueError("Block coordinates must be (x, y)-pairs!") \
+                from None
+        if xys.size == 0:
+            xys = xys.reshape(0, 2)
+        if xys.ndim != 2 or xys.shape[1] != 2:
+            raise ValueError("Block coordinates must be (x, y)-pairs!")
+        if num is not None and len(xys) != num:
+            raise ValueError("All block specifications must have "
+                             "the same length!")
+        return xys
+
+    def _use_numpy(self):
+        """Switch to the array backend, converting the block lists."""
+        if self._numpy:
+            return
+        self._xy = np.array(self._xy, dtype=float).reshape(-1, 2)
+        self._type_codes = np.array(self._type_codes, dtype=np.int32)
+        self._size_codes = np.array(self._size_codes, dtype=np.int32)
+        self._alive = np.array(self._alive, dtype=bool)
+        self._numpy = True
+        # The cached orders are lists
+        self._order = None
+        self._edge_order = None
+
+    def _reserve(self, num_new):
+        """Grow the block arrays to hold additional blocks.
+
+        Only used by the array backend.
+
+        Parameters
+        ----------
+        num_new : int
+            Number of blocks to be added.
+
+        """
+        needed = self._next_idx + num_new
+        capacity = len(self._alive)
+        if needed <= capacity:
+            return
+        # Grow geometrically, so adding blocks one by one is cheap
+        capacity = max(needed, 2*capacity, 16)
+        for attr in ("_xy", "_type_codes", "_size_codes", "_alive"):
+            old = getattr(self, attr)
+            new = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, attr, new)
+
+    def _append_blocks(self, names, xys, type_codes, size_codes, pars):
+        """Append validated blocks to the block arrays.
+
+        Parameters
+        ----------
+        names : sequence of str
+            Block names; they must not exist yet.
+        xys : list of tuples or numpy.ndarray
+            Blocks (x, y)-coordinates, as returned by `_as_xys()`.
+        type_codes : sequence of int
+            Codes of the block types.
+        size_codes : sequence of int
+            Codes of the block sizes.
+        pars : sequence of (list or tuple or None)
+            Additional parameters for the blocks; None means default
+            parameters.
+
+        """
+        num_new = len(names)
+        start = self._next_idx
+        stop = start + num_new
+        if self._auto_backend and stop >= _NUMPY_MIN_BLOCKS:
+            self._use_numpy()
+
+        if self._numpy:
+            self._reserve(num_new)
+            self._xy[start:stop] = xys
+            self._type_codes[start:stop] = type_codes
+            self._size_codes[start:stop] = size_codes
+            self._alive[start:stop] = True
+        else:
+            self._xy.extend(xys)
+            self._type_codes.extend(type_codes)
+            self._size_codes.extend(size_codes)
+            self._alive.extend([True]*num_new)
+        self._next_idx = stop
+        self._names.extend(names)
+        self._pars.update((idx, p) for idx, p in zip(range(start, stop), pars)
+                          if p is not None)
+        self._name_to_idx.update(zip(names, range(start, stop)))
+        # Add the new blocks with empty sets of outgoing connections
+        self._adj.update((idx, {}) for idx in range(start, stop))
+
+        self._order = None
+        self._invalidate("coordinates", "blocks")
+        if self._journal is not None:
+            self._journal.add_blocks(range(start, stop))
+
+    def _get_sorted_indices(self):
+        """Get the indices of the blocks, sorted from left to right.
 
         Blocks (and coordinates) are sorted by the x-position
         in ascending order, i.e. from left to right.
+        Blocks with equal x-positions are kept in the order of insertion.
+
+        Returns
+        -------
+        list or numpy.ndarray
+            Sorted block indices; an array with the array backend.
+
+        """
+        if self._order is None:
+            # A stable sort keeps blocks with equal x-positions in the order
+            # of their indices, i.e. in the order of insertion
+            if self._numpy:
+                alive = np.flatnonzero(self._alive[:self._next_idx])
+                self._order = alive[
+                    np.argsort(self._xy[alive, 0], kind="stable")]
+            else:
+                xy = self._xy
+                self._order = sorted(
+                    itertools.compress(range(self._next_idx), self._alive),
+                    key=lambda idx: xy[idx][0])
+        return self._order
+
+    def _get_sorted_edges(self):
+        """Get all connections as arrays, sorted from left to right.
+
+        Connections are sorted by the x-coordinate of the 'from'-block,
+        i.e. from left to right; connections of the same 'from'-block are
+        sorted by the index of the 'to'-block, i.e. by insertion order.
+
+        Returns
+        -------
+        from_idx : list or numpy.ndarray
+            Indices of the 'from'-blocks.
+        to_idx : list or numpy.ndarray
+            Indices of the 'to'-blocks.
+        edge_types : list or numpy.ndarray
+            Connection types.
+            All three are arrays with the array backend.
+
+        """
+        if self._edge_order is not None:
+            return self._edge_order
+
+        if not self._numpy:
+            adj = self._adj
+            edges = [(f, t, edge_type)
+                     for f in self._get_sorted_indices()
+                     for t, edge_type in sorted(adj[f].items())]
+            self._edge_order = tuple(map(list, zip(*edges))) or ([], [], [])
+            return self._edge_order
+
+        # Extract the edges from the adjacency structure;
+        # keys and values of a dict are iterated in the same order
+        adj = self._adj
+        num_edges_per_block = np.fromiter(map(len, adj.values()),
+                                          dtype=np.intp, count=len(adj))
+        num_edges = int(num_edges_per_block.sum())
+        from_idx = np.repeat(
+            np.fromiter(adj.keys(), dtype=np.intp, count=len(adj)),
+            num_edges_per_block)
+        to_idx = np.fromiter(
+            itertools.chain.from_iterable(adj.values()),
+            dtype=np.intp, count=num_edges)
+        edge_types = np.fromiter(
+            itertools.chain.from_iterable(map(dict.values, adj.values())),
+            dtype=np.intp, count=num_edges)
+
+        # Sort by the position of the 'from'-block in the left-to-right
+        # order first and by the index of the 'to'-block second
+        rank = np.empty(self._next_idx, dtype=np.intp)
+        order = self._get_sorted_indices()
+        rank[order] = np.arange(len(order))
+        perm = np.lexsort((to_idx, rank[from_idx]))
+        self._edge_order = from_idx[perm], to_idx[perm], edge_types[perm]
+        return self._edge_order
+
+    def _get_edge_styles(self, to_idx, edge_types):
+        """Get the TikZ styles of connections.
+
+        Parameters
+        ----------
+        to_idx : list or numpy.ndarray
+            Indices of the 'to'-blocks.
+        edge_types : list or numpy.ndarray
+            Connection types.
 
         Returns
         -------
-        list of Block or BlockschaltbildCoordinate
-            List of sorted blocks.
+        list of str
+            TikZ style specifications.
 
         """
-        return sorted(self._blocks, key=lambda b: b.xy[0])
+        # Precompute style strings for all edge types, indexed by
+        # 2*(edge type is vector) + (connection goes to a joint)
+        styles = []
+        for line_style in (self.scalar_style, self.vector_style):
+            # Add an arrow tip only if we're not going to a joint
+            styles.append(line_style + ", " + self.arrow_style)
+            styles.append(line_style)
+
+        if not self._numpy:
+            type_codes = self._type_codes
+            return [styles[2*(edge_type == _VECTOR_EDGE)
+                           + (type_codes[idx] == _JOINT_CODE)]
+                    for idx, edge_type in zip(to_idx, edge_types)]
+
+        styles = np.array(styles + [""], dtype=object)[:-1]
+        style_codes = (2*(edge_types == _VECTOR_EDGE)
+                       + (self._type_codes[to_idx] == _JOINT_CODE))
+        return styles[style_codes].tolist()
 
     def _get_sorted_connections_list(self):
         """Get a sorted list of connections.
@@ -421,37 +1785,27 @@ class Blockschaltbild:
             * String with the TikZ style specification
 
         """
-        # Get edges, i.e. non-zero entries of the adjacency matrix
-        # However, 'np.nonzero' returns a tuple of lists;
-        # we want a list of tuples:
-        edges = list(zip(*np.nonzero(self._adj_mat)))
-        # Sort the edges by the x-coordinate of the 'from'-block
-        edges.sort(key=lambda idx: self._blocks[idx[0]].xy[0])
-
-        # Create an empty list of connections
-        connections = []
+        from_idx, to_idx, edge_types = self._get_sorted_edges()
+        return list(zip(self._take_names(from_idx), self._take_names(to_idx),
+                        self._get_edge_styles(to_idx, edge_types)))
 
-        for idx_from, idx_to in edges:
-            style_str = ""
+    def _take_names(self, indices):
+        """Get the names of blocks.
 
-            # Decide which line style to use
-            if self._adj_mat[idx_from, idx_to] == _SCALAR_EDGE:
-                style_str += self.scalar_style
-            elif self._adj_mat[idx_from, idx_to] == _VECTOR_EDGE:
-                style_str += self.vector_style
-
-            # Add an arrow tip if we're not going to a joint
-            if self._blocks[idx_to].block_type != "Verzweigung":
-                style_str += ", " + self.arrow_style
+        Parameters
+        ----------
+        indices : list or numpy.ndarray
+            Block indices.
 
-            # Create and append a connection
-            connections.append((
-                self._blocks[idx_from].name,
-                self._blocks[idx_to].name,
-                style_str,
-                ))
+        Returns
+        -------
+        list of str
+            Block names.
 
-        return connections
+        """
+        if self._numpy:
+            indices = indices.tolist()
+        return list(map(self._names.__getitem__, indices))
 
     def add_block(self, block_type, name, xy, size=None, pars=None):
         """Add a block or a coordinate.
@@ -473,34 +1827,86 @@ class Blockschaltbild:
         # Raise an exception if a block with this name already exists
         if self._does_this_block_exist(name):
             raise ValueError("Block '{:s}' already exists!".format(name))
+        if block_type not in _BLOCKS_NUM_PARS:
+            raise ValueError("Unknown block type(s): {:s}".format(block_type))
 
-        # Create default values for block size and parameters if none are given
+        # Create a default block size if none is given; default parameters
+        # are not stored
         if size is None:
             size = self.block_sizes[block_type]
-        if pars is None:
-            pars = ["" for _ in range(_BLOCKS_NUM_PARS[block_type])]
 
-        # Call a Block or a BlockschaltbildCoordinate constructor
-        # depending on 'block_type'
-        if block_type == "coordinate":
-            b = BlockschaltbildCoordinate(name, xy)
-        else:
-            b = Block(block_type, name, xy, size, pars)
+        self._append_blocks([name], self._as_xys([xy]),
+                            [self._types.code(block_type)],
+                            [self._sizes.code(size)], [pars])
 
-        # Add the new block to the list
-        self._blocks.append(b)
+    def add_blocks(self, block_types, names, xys, sizes=None, pars=None):
+        """Add multiple blocks or coordinates at once.
 
-        # Extend the adjacency matrix with a row and a column
-        # Do not use 'np.pad' here! It does not function for empty matrices.
-        temp_mat = self._adj_mat
-        new_num_blocks = self.num_blocks
-        self._adj_mat = np.zeros((new_num_blocks, new_num_blocks),
-                                 dtype=np.int)
-        self._adj_mat[:-1, :-1] = temp_mat
+        The whole batch is validated before any block is added, i.e.
+        either all blocks are added or none of them.
+
+        Parameters
+        ----------
+        block_types : sequence of str
+            Block type specifications.
+        names : sequence of str
+            Block names.
+        xys : sequence of pairs of floats or array_like, shape (N, 2)
+            Blocks (x, y)-coordinates.
+        sizes : sequence of str or None, optional
+            Block sizes (including units!); None entries or None
+            for the whole argument mean default sizes.
+        pars : sequence of (list or tuple or None), optional
+            Additional parameters for the blocks; None entries or None
+            for the whole argument mean default parameters.
+
+        """
+        # Convert NumPy arrays into lists of Python objects;
+        # coordinates are converted for the backend
+        block_types, names, sizes, pars = (
+            e.tolist() if hasattr(e, "tolist") else e
+            for e in (block_types, names, sizes, pars)
+            )
+
+        num_new = len(names)
+        if sizes is None:
+            sizes = [None]*num_new
+        if pars is None:
+            pars = [None]*num_new
+
+        # Validate the batch
+        if any(len(e) != num_new for e in (block_types, sizes, pars)):
+            raise ValueError("All block specifications must have "
+                             "the same length!")
+        xys = self._as_xys(xys, num_new)
+        unknown_types = set(block_types).difference(_BLOCKS_NUM_PARS)
+        if unknown_types:
+            raise ValueError("Unknown block type(s): {:s}".format(
+                ", ".join(sorted(unknown_types))))
+        new_names = set()
+        for name in names:
+            if name in new_names or self._does_this_block_exist(name):
+                raise ValueError("Block '{:s}' already exists!".format(name))
+            new_names.add(name)
+
+        # Fill in default sizes and intern block types and sizes;
+        # default parameters are derived from the block types
+        block_sizes = self.block_sizes
+        size_codes = [
+            self._sizes.code(block_sizes[t] if s is None else s)
+            for t, s in zip(block_types, sizes)
+            ]
+        type_codes = [self._types.code(t) for t in block_types]
+
+        self._append_blocks(names, xys, type_codes, size_codes, pars)
 
     def get_block(self, block_name):
         """Get a handle to a block.
 
+        Attribute assignments through the handle are tracked by the
+        Blockschaltbild. Note that in-place changes of mutable attributes,
+        e.g. `pars.append(...)`, are not; assign a new value instead.
+
         Parameters
         ----------
         block_name: str
@@ -509,10 +1915,97 @@ class Blockschaltbild:
         Returns
         -------
         Block or BlockschaltbildCoordinate
-            Block or coordinate object.
+            View of the block or coordinate; its attributes are stored
+            in the Blockschaltbild.
+
+        """
+        idx = self._get_block_idx_by_name(block_name)
+        if self._type_codes[idx] == _COORDINATE_CODE:
+            return _CoordinateView(self, idx)
+        return _BlockView(self, idx)
+
+    def translate(self, dx, dy):
+        """Move all blocks.
+
+        Parameters
+        ----------
+        dx : float
+            Shift along the x-axis.
+        dy : float
+            Shift along the y-axis.
+
+        """
+        if self._numpy:
+            self._xy[:self._next_idx] += (dx, dy)
+        else:
+            self._xy = [(x + dx, y + dy) for x, y in self._xy]
+        self._on_all_blocks_moved()
+
+    def scale(self, sx, sy=None):
+        """Scale the coordinates of all blocks.
+
+        Parameters
+        ----------
+        sx : float
+            Scale factor of the x-coordinates.
+        sy : float or None, optional
+            Scale factor of the y-coordinates; None means `sx`.
+
+        """
+        if sy is None:
+            sy = sx
+        if self._numpy:
+            self._xy[:self._next_idx] *= (sx, sy)
+        else:
+            self._xy = [(x*sx, y*sy) for x, y in self._xy]
+        self._on_all_blocks_moved()
+
+    def auto_layout(self, x_spacing=None, y_spacing=None, sweeps=4):
+        """Place all blocks automatically in layers along the signal flow.
+
+        The current positions are ignored; see `layered_layout` for the
+        placement. Blocks connected to each other are placed in columns
+        from left to right, unconnected parts of the diagram are stacked
+        from top to bottom.
+
+        Parameters
+        ----------
+        x_spacing : float or None, optional
+            Distance between the layers in cm; None means
+            6 times the x-axis scale, i.e. 6 sketch columns.
+        y_spacing : float or None, optional
+            Distance between the rows in cm; None means
+            the y-axis scale, i.e. 1 sketch line.
+        sweeps : int, optional
+            Number of sweeps ordering the blocks within their layers.
 
         """
-        return self._blocks[self._get_block_idx_by_name(block_name)]
+        if x_spacing is None:
+            x_spacing = 6*self.x_scale
+        if y_spacing is None:
+            y_spacing = self.y_scale
+
+        # Number the blocks consecutively in the order of insertion
+        indices = sorted(self._name_to_idx.values())
+        node_of = {idx: k for k, idx in enumerate(indices)}
+        edges = [(node_of[f], node_of[t])
+                 for f, succ in self._adj.items() for t in succ]
+        grid = layered_layout(len(indices), edges, sweeps)
+
+        xys = [(x_spacing*x, y_spacing*y) for x, y in grid]
+        if self._numpy:
+            self._xy[indices] = self._as_xy_array(xys)
+        else:
+            for idx, xy in zip(indices, xys):
+                self._xy[idx] = xy
+        self._on_all_blocks_moved()
+
+    def _on_all_blocks_moved(self):
+        """Update internal structures after all blocks have been moved."""
+        self._order = None
+        self._invalidate("coordinates", "blocks", "connections")
+        if self._journal is not None:
+            self._journal.change_blocks(self._name_to_idx.values())
 
     def delete_block(self, block_name):
         """Delete a block.
@@ -525,12 +2018,22 @@ class Blockschaltbild:
         """
         idx_to_delete = self._get_block_idx_by_name(block_name)
 
-        # Delete the block from the list
-        del self._blocks[idx_to_delete]
+        # Mark the block as deleted; its data is kept for existing views
+        self._alive[idx_to_delete] = False
+        del self._name_to_idx[block_name]
+        self._order = None
+        self._invalidate("coordinates", "blocks", "connections")
 
-        # Delete the corresponding row and column from the adjacency matrix
-        self._adj_mat = np.delete(self._adj_mat, idx_to_delete, 0)
-        self._adj_mat = np.delete(self._adj_mat, idx_to_delete, 1)
+        # Delete its outgoing and incoming connections
+        succ_deleted = self._adj.pop(idx_to_delete)
+        pred_deleted = [idx for idx, succ in self._adj.items()
+                        if succ.pop(idx_to_delete, None) is not None]
+
+        if self._journal is not None:
+            self._journal.remove_block(idx_to_delete)
+            self._journal.remove_edges(
+                [(idx_to_delete, idx) for idx in succ_deleted]
+                + [(idx, idx_to_delete) for idx in pred_deleted])
 
     def rename_block(self, old_name, new_name):
         """Rename a block.
@@ -549,7 +2052,7 @@ class Blockschaltbild:
 
         idx_to_rename = self._get_block_idx_by_name(old_name)
 
-        self._blocks[idx_to_rename].name = new_name
+        self._set_block_attr(idx_to_rename, "name", new_name)
 
     def add_connection(self, from_block_name, to_block_name, is_vector=False):
         """Add a connection between two blocks.
@@ -569,21 +2072,86 @@ class Blockschaltbild:
         to_idx = self._get_block_idx_by_name(to_block_name)
 
         # Check if this connection already exists
-        if self._adj_mat[from_idx, to_idx] != 0:
+        if to_idx in self._adj[from_idx]:
             msg = "Blocks "
-            msg += "'" + self._blocks[from_idx].name + "'"
+            msg += "'" + self._names[from_idx] + "'"
             msg += " and "
-            msg += "'" + self._blocks[to_idx].name + "'"
+            msg += "'" + self._names[to_idx] + "'"
             msg += " are already connected!"
             raise ValueError(msg)
 
-        # Add an entry into the adjacency matrix
+        # Add an entry into the adjacency structure
         if is_vector:
             edge_type = _VECTOR_EDGE
         else:
             edge_type = _SCALAR_EDGE
 
-        self._adj_mat[from_idx, to_idx] = edge_type
+        self._adj[from_idx][to_idx] = edge_type
+        self._invalidate("connections")
+        if self._journal is not None:
+            self._journal.add_edges([(from_idx, to_idx)])
+
+    def add_connections(self, from_block_names, to_block_names,
+                        is_vector=False):
+        """Add multiple connections at once.
+
+        The whole batch is validated before any connection is added, i.e.
+        either all connections are added or none of them.
+
+        Parameters
+        ----------
+        from_block_names : sequence of str
+            Names of the 'from'-blocks.
+        to_block_names : sequence of str
+            Names of the 'to'-blocks.
+        is_vector : bool or sequence of bool, optional
+            True if a connection is vector-valued, False if scalar.
+            A single bool applies to all connections.
+
+        """
+        from_idx = [self._get_block_idx_by_name(n) for n in from_block_names]
+        to_idx = [self._get_block_idx_by_name(n) for n in to_block_names]
+        self._add_connections_by_idx(from_idx, to_idx, is_vector)
+
+    def _add_connections_by_idx(self, from_idx, to_idx, is_vector):
+        """Validate and add multiple connections between block indices.
+
+        Parameters
+        ----------
+        from_idx : sequence of int
+            Indices of the 'from'-blocks.
+        to_idx : sequence of int
+            Indices of the 'to'-blocks.
+        is_vector : bool or sequence of bool
+            True if a connection is vector-valued, False if scalar.
+
+        """
+        if hasattr(is_vector, "tolist"):
+            is_vector = is_vector.tolist()
+        if isinstance(is_vector, bool):
+            is_vector = [is_vector]*len(from_idx)
+
+        if not len(from_idx) == len(to_idx) == len(is_vector):
+            raise ValueError("All connection specifications must have "
+                             "the same length!")
+
+        # Check for connections which already exist or occur twice
+        new_edges = set()
+        for edge in zip(from_idx, to_idx):
+            if edge in new_edges or edge[1] in self._adj[edge[0]]:
+                msg = "Blocks "
+                msg += "'" + self._names[edge[0]] + "'"
+                msg += " and "
+                msg += "'" + self._names[edge[1]] + "'"
+                msg += " are already connected!"
+                raise ValueError(msg)
+            new_edges.add(edge)
+
+        for f, t, vec in zip(from_idx, to_idx, is_vector):
+            self._adj[f][t] = _VECTOR_EDGE if vec else _SCALAR_EDGE
+        self._invalidate("connections")
+        if self._journal is not None:
+            self._journal.add_edges(new_edges)
 
     def delete_connection(self, from_block_name, to_block_name):
         """Delete a connection between two blocks.
@@ -601,14 +2169,17 @@ class Blockschaltbild:
         to_idx = self._get_block_idx_by_name(to_block_name)
 
         # Check if this connection exists
-        if self._adj_mat[from_idx, to_idx] == 0:
+        if to_idx not in self._adj[from_idx]:
             msg = "No connection between blocks "
-            msg += "'" + self._blocks[from_idx].name + "'"
+            msg += "'" + self._names[from_idx] + "'"
             msg += " and "
-            msg += "'" + self._blocks[to_idx].name + "'"
+            msg += "'" + self._names[to_idx] + "'"
             raise ValueError(msg)
 
-        self._adj_mat[from_idx, to_idx] = 0
+        del self._adj[from_idx][to_idx]
+        self._invalidate("connections")
+        if self._journal is not None:
+            self._journal.remove_edges([(from_idx, to_idx)])
 
     def add_auto_joints(self):
         """Add joints automatically.
@@ -617,172 +2188,734 @@ class Blockschaltbild:
         and has multiple connections going out of it.
 
         """
-        def add_a_single_joint(old_idx, joint_name, xy):
-            """Add a single default joint to the Blockschaltbild.
-
-            Parameters
-            ----------
-            old_idx: int
-                Index of the block with multiple outgoing connections.
-            joint_name: str
-                Name of the new joint.
-            xy: list or tuple of floats
-                (x, y)-coordinates of the new joint.
-
-            """
-            # Use default joint size
-            self.add_block(
-                "Verzweigung",
-                joint_name,
-                xy,
-                self.block_sizes["Verzweigung"],
-                )
-            # The last row corresponds to the new joint;
-            # copy the old row (= old outgoing connections) to the joint
-            self._adj_mat[-1, :] = self._adj_mat[old_idx, :]
-            # Remove all outgoing connections from the old block
-            self._adj_mat[old_idx, :] = 0
+        # Make a list of indices corresponding to non-joint blocks
+        # with multiple outgoing connections. New joints never have to be
+        # considered, since they are joints themselves, so a single pass
+        # over the adjacency structure is sufficient.
+        type_codes = self._type_codes
+        if self._numpy:
+            type_codes = type_codes.tolist()
+        idx_relevant = [
+            idx for idx, succ in self._adj.items()
+            if len(succ) > 1 and type_codes[idx] != _JOINT_CODE
+            ]
+
+        # Return if there is nothing to do
+        if not idx_relevant:
+            return
+
+        # Create names for the auto joints; they are numbered in the order of
+        # the block indices, i.e. in the order the blocks have been added,
+        # since `add_blocks` creates the keys of `self._adj` in this order.
+        # Thus, equal inputs always result in equal names.
+        num_joints = len(idx_relevant)
+        ajnt_names = [
+            "ajnt{:d}".format(self._auto_joints_counter + k)
+            for k in range(1, num_joints + 1)
+            ]
+        # Place each joint near its 'from'-block, shifted by 20% to the right
+        if self._numpy:
+            ajnt_xys = self._xy[idx_relevant] * (1.2, 1.0)
+        else:
+            ajnt_xys = [(1.2*x, y)
+                        for x, y in map(self._xy.__getitem__, idx_relevant)]
+
+        # Add all joints to the Blockschaltbild at once;
+        # they get consecutive indices starting with the next free one
+        first_ajnt_idx = self._next_idx
+        self.add_blocks(["Verzweigung"]*num_joints, ajnt_names, ajnt_xys)
+        self._auto_joints_counter += num_joints
+
+        journal = self._journal
+        for ajnt_idx, old_idx in enumerate(idx_relevant, first_ajnt_idx):
+            # Move the old outgoing connections to the joint
+            self._adj[ajnt_idx] = self._adj[old_idx]
             # Add a single scalar connection to the freshly created joint
             # I don't want to implement fancy smart scalar/vector
             # detection here
-            self._adj_mat[old_idx, -1] = _SCALAR_EDGE
+            self._adj[old_idx] = {ajnt_idx: _SCALAR_EDGE}
+            if journal is not None:
+                journal.remove_edges([(old_idx, idx)
+                                      for idx in self._adj[ajnt_idx]])
+                journal.add_edges([(ajnt_idx, idx)
+                                   for idx in self._adj[ajnt_idx]])
+                journal.add_edges([(old_idx, ajnt_idx)])
+        self._invalidate("connections")
+
+    def add_subsystem(self, subsystem, prefix, xy=(0, 0)):
+        """Add all blocks and connections of another Blockschaltbild.
+
+        The blocks of the subsystem keep their types, sizes and parameters;
+        their names get the prefix, e.g. block 'P1' of subsystem 'R1'
+        becomes 'R1_P1', and their coordinates are shifted by `xy`.
+        The subsystem is not changed, so it can be added many times.
+        Adding a subsystem with N blocks and M connections takes
+        O(N + M) time.
 
-        # Return if the Blockschaltbild has no blocks
-        if self.num_blocks == 0:
-            return
+        Parameters
+        ----------
+        subsystem : Blockschaltbild
+            Block diagram to be added.
+        prefix : str
+            Name prefix of the subsystem: a letter followed by letters
+            and digits.
+        xy : list or tuple of floats, optional
+            Position of the subsystem, i.e. the shift of its coordinates.
 
-        # Now we have to go through the adjacency matrix and
-        # add an auto joint for each row with multiple outgoing connections.
-        #
-        # The problem is, The adjacency matrix grows with each operations.
-        # Hence, we will use an infinite while loop. In each iteration,
-        # we check if there are rows with multiple outgoing connections.
-        # If yes, a joint is added instead of the _first_ row and the iteration
-        # is repeated. If no, we break out of the while loop.
-        while True:
-            # First, for each row check if it has multiple outgoing connections
-            has_multiple_connections = \
-                np.sum(self._adj_mat >= _SCALAR_EDGE, axis=1) > 1
-            # Second, for each row check if it corresponds to a non-joint block
-            is_not_a_joint = \
-                [b.block_type != "Verzweigung" for b in self._blocks]
-            # Now make an element-wise AND of these two lists
-            # The second operand (plain list) will be converted to an
-            # `np.array` automatically
-            is_relevant = has_multiple_connections & is_not_a_joint
-            # Make a list of indices corresponding to non-joint blocks
-            # with multiple outgoing connections
-            idx_relevant = \
-                [idx for idx, cond in enumerate(is_relevant) if cond]
-
-            # If the list is not empty, ...
-            if idx_relevant:
-                # Increase the counter of automatic joints
-                self._auto_joints_counter += 1
-                # Create a name for the auto joint
-                ajnt_name = "ajnt{:d}".format(self._auto_joints_counter)
-                # Place it near the 'from'-block, shifted by 20% to the right
-                from_block = self._blocks[idx_relevant[0]]
-                ajnt_xy = (1.2 * from_block.xy[0], from_block.xy[1])
-                # Add this joint to the Blockschaltbild
-                add_a_single_joint(idx_relevant[0], ajnt_name, ajnt_xy)
-            else:
-                # If the list is empty, we're done, break the loop
-                break
+        """
+        if not _RE_PREFIX.match(prefix):
+            raise ValueError(
+                "Invalid subsystem prefix '{:s}'!".format(prefix))
+
+        # Blocks of the subsystem in the order of insertion
+        indices = sorted(subsystem._name_to_idx.values())
+        n = subsystem._next_idx
+        dx, dy = xy
+        if subsystem._numpy:
+            xys = (subsystem._xy[indices] + (dx, dy)).tolist()
+            type_codes = subsystem._type_codes[:n].tolist()
+            size_codes = subsystem._size_codes[:n].tolist()
+        else:
+            xys = [(x + dx, y + dy)
+                   for x, y in map(subsystem._xy.__getitem__, indices)]
+            type_codes = subsystem._type_codes
+            size_codes = subsystem._size_codes
+        types = subsystem._types.values
+        sizes = subsystem._sizes.values
+        names = subsystem._names
+        pars = subsystem._pars
+
+        first_idx = self._next_idx
+        self.add_blocks(
+            [types[type_codes[idx]] for idx in indices],
+            [prefix + _PREFIX_SEPARATOR + names[idx] for idx in indices],
+            xys,
+            [sizes[size_codes[idx]] for idx in indices],
+            [None if pars.get(idx) is None else list(pars[idx])
+             for idx in indices],
+            )
+
+        # The added blocks have consecutive indices
+        new_idx = {idx: first_idx + k for k, idx in enumerate(indices)}
+        from_idx, to_idx, is_vector = [], [], []
+        for f, succ in subsystem._adj.items():
+            for t, edge_type in succ.items():
+                from_idx.append(new_idx[f])
+                to_idx.append(new_idx[t])
+                is_vector.append(edge_type == _VECTOR_EDGE)
+        self._add_connections_by_idx(from_idx, to_idx, is_vector)
+
+    def import_tokens(self, sketch=None, connections=None, renames=None):
+        """Import parsed blocks, connections and names in bulk.
+
+        Parameters
+        ----------
+        sketch : SketchTokens or None, optional
+            Blocks found in a sketch.
+        connections : list of tuples or None, optional
+            Connections specified by 3-tuples: name of the 'from'-block,
+            name of the 'to'-block, True if the connection is vector-valued.
+        renames : list of tuples or None, optional
+            Renaming specifications: (old block name, new block name).
+
+        """
+        if sketch is not None:
+            # Scale columns and rows to get the block coordinates;
+            # 'size' and 'pars' are handled by the 'add_blocks()' method
+            xys = [(self.x_scale*col, self.y_scale*row)
+                   for col, row in zip(sketch.cols, sketch.rows)]
+            self.add_blocks(sketch.block_types, sketch.names, xys)
+
+        if connections:
+            from_names, to_names, is_vector = zip(*connections)
+            self.add_connections(from_names, to_names, list(is_vector))
+
+        if renames:
+            for old_name, new_name in renames:
+                self.rename_block(old_name, new_name)
 
     def import_sketch(self, sketch):
         """Import blocks from an ASCII graphics-like sketch.
 
         Parameters
         ----------
-        sketch : list of str
+        sketch : iterable of str
             ASCII graphics-like sketch, line by line.
 
         """
-        # Delete all empty lines at the bottom of the sketch
-        while len(sketch) > 0 and not sketch[-1].strip():
-            sketch.pop()
-        # Reverse the list; we shall process the sketch lines upwards
-        sketch.reverse()
-        # Delete all empty lines at the top of the sketch
-        while len(sketch) > 0 and not sketch[-1].strip():
-            sketch.pop()
-
-        # Loop through lines
-        # We need the line number in order to get the y-coordinate of the block
-        for line_number, line in enumerate(sketch):
-            # The y-coordinate is the same for the whole line
-            y = line_number*self.y_scale
-
-            # Get everything that matches to the block short ID pattern
-            for m in _RE_IMPORT_SKETCH.finditer(line):
-                # The x-coordinate is the mean of the match
-                # beginning and end positions
-                x = self.x_scale*np.mean(m.span())
-                # The block name is simply its short ID plus its number
-                block_name = m.group("b_id") + m.group("b_num")
-                # Get the block type from our conversion dictionary
-                block_type = _SHORT_ID_TO_BLOCK_TYPES[m.group(1).lower()]
-                # Add the block to the Blockschaltbild
-                # 'size' and 'pars' are handled by the 'add_block()' method
-                self.add_block(block_type, block_name, (x, y))
+        tokenizer = _SketchTokenizer()
+        for line in sketch:
+            tokenizer.feed(line)
+        self.import_tokens(sketch=tokenizer.tokens())
 
     def import_connections(self, connections):
         """Import connections between blocks.
 
         Parameters
         ----------
-        connections : list of str
+        connections : iterable of str
             Lines with connection specifications.
 
         """
-        # Iterate through lines
-        for line in connections:
-            # Try to match the connection pattern once
-            m = _RE_IMPORT_CONNECTION.search(line)
-            if m is not None:
-                # If found something, get the names of the
-                # 'from'- and 'to'-blocks
-                b_from = m.group("from_id") + m.group("from_num")
-                b_to = m.group("to_id") + m.group("to_num")
-                # Distinguish between scalar and vector connections
-                vector = bool(m.group("line_type") == "=")
-                # Add the connection to our block diagram object
-                self.add_connection(b_from, b_to, vector)
+        self.import_tokens(connections=[
+            c for c in map(_parse_connection, connections) if c is not None])
 
     def import_names(self, new_names):
         """Import meaningful names of blocks instead of short IDs.
 
         Parameters
         ----------
-        new_names : list of str
+        new_names : iterable of str
             Lines with renaming specifications.
 
         """
-        # Iterate through lines
-        for line in new_names:
-            # Try to match the rename pattern once
-            m = _RE_IMPORT_RENAME.search(line.strip())
-            if m is not None:
-                # If found something, get the name of the block to be renamed
-                old_name = m.group("old_id") + m.group("old_num")
-                # Remove some special characters from the new block name and
-                # strip the whitespaces
-                new_name = re.sub(
-                    r"[~!@#$%^&*()/\\,.;']",
-                    " ",
-                    m.group("new_name"),
-                    ).strip()
-                # Rename the block
-                self.rename_block(old_name, new_name)
+        self.import_tokens(renames=[
+            r for r in map(_parse_rename, new_names) if r is not None])
+
+    def _iter_tikz_coordinates(self, num_fmt, indices=None):
+        """Get TikZ coordinate definitions of all blocks, left to right.
+
+        Parameters
+        ----------
+        num_fmt : str
+            Specification of the numbers format, e.g. '.4f'.
+        indices : list or numpy.ndarray or None, optional
+            Indices of the blocks to be exported, in this order;
+            None means all blocks from left to right.
+
+        Returns
+        -------
+        iterator of str
+            TikZ coordinate definitions.
 
-    def export_to_text(self, num_fmt="g"):
+        """
+        if indices is None:
+            indices = self._get_sorted_indices()
+        names = self._take_names(indices)
+        # Coordinates are named after blocks with a "--coord" suffix
+        if self._numpy:
+            suffixes = np.where(
+                self._type_codes[indices] == _COORDINATE_CODE,
+                "", "--coord").tolist()
+            numbers = _format_numbers(self._xy[indices], num_fmt)
+            xs, ys = numbers[0::2], numbers[1::2]
+        else:
+            type_codes = self._type_codes
+            suffixes = ["" if type_codes[idx] == _COORDINATE_CODE
+                        else "--coord" for idx in indices]
+            xy = self._xy
+            xs = [format(xy[idx][0], num_fmt) for idx in indices]
+            ys = [format(xy[idx][1], num_fmt) for idx in indices]
+        return map("\\coordinate ({:s}{:s}) at ({:s}, {:s});".format,
+                   names, suffixes, xs, ys)
+
+    def _iter_latex_definitions(self, indices=None):
+        """Get LaTeX definitions of all blocks, left to right.
+
+        Coordinates have no LaTeX definitions and are skipped.
+
+        Parameters
+        ----------
+        indices : list or numpy.ndarray or None, optional
+            Indices of the blocks to be exported, in this order;
+            None means all blocks from left to right.
+
+        Returns
+        -------
+        iterator of str
+            LaTeX commands with the block definitions.
+
+        """
+        if indices is None:
+            indices = self._get_sorted_indices()
+        names = self._take_names(indices)
+        if self._numpy:
+            is_block = self._type_codes[indices] != _COORDINATE_CODE
+            indices = indices[is_block]
+            names = list(itertools.compress(names, is_block.tolist()))
+            type_codes = self._type_codes[indices].tolist()
+            size_codes = self._size_codes[indices].tolist()
+            indices = indices.tolist()
+        else:
+            all_type_codes = self._type_codes
+            is_block = [all_type_codes[idx] != _COORDINATE_CODE
+                        for idx in indices]
+            indices = list(itertools.compress(indices, is_block))
+            names = list(itertools.compress(names, is_block))
+            type_codes = list(map(all_type_codes.__getitem__, indices))
+            size_codes = list(map(self._size_codes.__getitem__, indices))
+
+        # Precompute the parameters of each block type; only blocks with
+        # other parameters have to be handled one by one
+        types = self._types.values
+        default_pars = [
+            "".join("{" + p + "}" for p in self._get_default_pars(t))
+            for t in types
+            ]
+        pars = [default_pars[c] for c in type_codes]
+        for k, idx in enumerate(indices):
+            if idx in self._pars:
+                pars[k] = "".join("{" + p + "}" for p in self._pars[idx])
+
+        sizes = self._sizes.values
+        return map("\\{:s}{{{:s}}}{{{:s}--coord}}{{{:s}}}{:s}".format,
+                   [types[c] for c in type_codes], names, names,
+                   [sizes[c] for c in size_codes], pars)
+
+    def _iter_tikz_connections(self, edges=None):
+        """Get TikZ commands drawing all connections, left to right.
+
+        Parameters
+        ----------
+        edges : tuple of (list or numpy.ndarray) or None, optional
+            Connections to be exported, in this order, as returned by
+            `_get_sorted_edges()`; None means all connections.
+
+        Returns
+        -------
+        iterator of str
+            TikZ draw commands.
+
+        """
+        if edges is None:
+            edges = self._get_sorted_edges()
+        from_idx, to_idx, edge_types = edges
+        if self._edge_routing == "orthogonal":
+            paths = self._get_orthogonal_paths(from_idx, to_idx)
+        else:
+            paths = map("({:s}) -- ({:s})".format,
+                        self._take_names(from_idx), self._take_names(to_idx))
+        return map("\\draw[{:s}] {:s};".format,
+                   self._get_edge_styles(to_idx, edge_types), paths)
+
+    def _get_block_geometry(self):
+        """Get the centres and sizes of all blocks.
+
+        Blocks are squares of their size; coordinates and blocks whose
+        sizes cannot be converted into cm (e.g. macros) are points.
+
+        Returns
+        -------
+        centres : list of tuples
+            (x, y)-coordinates of the blocks, indexed by block indices.
+        sizes : list of tuples
+            (width, height) of the blocks in cm, indexed by block indices;
+            (0, 0) for points.
+
+        """
+        n = self._next_idx
+        if self._numpy:
+            centres = self._xy[:n].tolist()
+            size_codes = self._size_codes[:n].tolist()
+        else:
+            centres, size_codes = self._xy, self._size_codes
+        lengths = [_parse_length(size) for size in self._sizes.values]
+        return centres, [(lengths[c], lengths[c]) for c in size_codes]
+
+    def find_overlaps(self):
+        """Find overlapping blocks and coordinates.
+
+        Blocks overlap if their squares (see `block_sizes`) do; blocks
+        merely touching each other do not overlap. Coordinates overlap
+        the blocks they lie in and other coordinates at the same position.
+        Joints lying in a block they are connected from are not reported,
+        since they branch off right behind it, e.g. the auto joints of
+        blocks near x = 0 (see `add_auto_joints`). Sizes which cannot be
+        converted into cm (e.g. macros) are ignored.
+
+        Returns
+        -------
+        list of tuples
+            (name, name)-pairs of overlapping blocks and coordinates,
+            in the order the blocks have been added.
+
+        """
+        centres, sizes = self._get_block_geometry()
+        indices = sorted(self._name_to_idx.values())
+        pairs = find_overlaps([centres[idx] for idx in indices],
+                              [sizes[idx] for idx in indices])
+
+        type_codes, adj = self._type_codes, self._adj
+
+        def is_branch(from_idx, to_idx):
+            return (type_codes[to_idx] == _JOINT_CODE
+                    and to_idx in adj[from_idx])
+
+        names = self._names
+        return [(names[indices[i]], names[indices[j]]) for i, j in pairs
+                if not (is_branch(indices[i], indices[j])
+                        or is_branch(indices[j], indices[i]))]
+
+    def check_structure(self):
+        """Find algebraic loops and unconnected blocks.
+
+        An algebraic loop is a feedback loop without a dynamic block
+        (integrator, PT1, PT2 or dead time); general transfer functions
+        may have a direct feedthrough and do not break loops. Blocks
+        without any connections are isolated; blocks with only outgoing or
+        only incoming connections have an unconnected input or output.
+        Coordinates are the inputs and outputs of the diagram, so they are
+        never reported as unconnected. See `find_structural_issues`.
+
+        Returns
+        -------
+        list of Finding
+            Findings with the names of the blocks concerned.
+
+        """
+        # Number the blocks consecutively in the order of insertion
+        indices = sorted(self._name_to_idx.values())
+        node_of = {idx: k for k, idx in enumerate(indices)}
+        edges = [(node_of[f], node_of[t])
+                 for f, succ in self._adj.items() for t in succ]
+        if self._numpy:
+            type_codes = self._type_codes[:self._next_idx].tolist()
+        else:
+            type_codes = self._type_codes
+        types = self._types.values
+        findings = find_structural_issues(
+            len(indices), edges,
+            [types[type_codes[idx]] in _DYNAMIC_BLOCK_TYPES
+             for idx in indices],
+            [type_codes[idx] == _COORDINATE_CODE for idx in indices])
+
+        names = self._names
+        return [Finding(f.kind, [names[indices[k]] for k in f.blocks])
+                for f in findings]
+
+    def _get_orthogonal_paths(self, from_idx, to_idx):
+        """Route connections orthogonally around the blocks.
+
+        The blocks are obstacles of the size given by their size
+        specifications; see `routing.route_orthogonal` for the routes.
+
+        Parameters
+        ----------
+        from_idx : list or numpy.ndarray
+            Indices of the 'from'-blocks.
+        to_idx : list or numpy.ndarray
+            Indices of the 'to'-blocks.
+
+        Returns
+        -------
+        list of str
+            TikZ paths, e.g. '(a) -| (b)'.
+
+        """
+        centres, sizes = self._get_block_geometry()
+        type_codes = self._type_codes
+        if self._numpy:
+            type_codes = type_codes[:self._next_idx].tolist()
+            from_idx, to_idx = from_idx.tolist(), to_idx.tolist()
+
+        # Deleted blocks are points, too, so they are no obstacles
+        alive = self._alive
+        sizes = [size if is_alive else (0.0, 0.0)
+                 for size, is_alive in zip(sizes, alive)]
+        horizontal = [code not in _ROUND_CODES for code in type_codes]
+        routes = route_orthogonal(centres, sizes, zip(from_idx, to_idx),
+                                  horizontal)
+
+        names = self._names
+        paths = []
+        for f, t, (shape, m) in zip(from_idx, to_idx, routes):
+            if shape == "-|-":
+                # Horizontally to the channel, then '|-' to the target
+                path = "({:s}) -- ({:s}, {:s}) |- ({:s})".format(
+                    names[f], _format_waypoint(m),
+                    _format_waypoint(centres[f][1]), names[t])
+            elif shape == "|-|":
+                path = "({:s}) -- ({:s}, {:s}) -| ({:s})".format(
+                    names[f], _format_waypoint(centres[f][0]),
+                    _format_waypoint(m), names[t])
+            else:
+                path = "({:s}) {:s} ({:s})".format(names[f], shape, names[t])
+            paths.append(path)
+        return paths
+
+    def _get_section_keys(self, section):
+        """Get the keys of the lines of an export section.
+
+        Parameters
+        ----------
+        section : str
+            Section tag, i.e. 'coordinates', 'blocks' or 'connections'.
+
+        Returns
+        -------
+        list or numpy.ndarray
+            Block indices for the coordinates and blocks sections,
+            keys of the (from, to)-pairs of block indices computed by
+            `_edge_keys()` for the connections section.
+            An array with the array backend.
+
+        """
+        if section == "connections":
+            from_idx, to_idx, _ = self._get_sorted_edges()
+            if not self._numpy:
+                return [(f << 32) | t for f, t in zip(from_idx, to_idx)]
+            return _edge_keys(from_idx, to_idx)
+        indices = self._get_sorted_indices()
+        if section == "blocks":
+            if not self._numpy:
+                type_codes = self._type_codes
+                return [idx for idx in indices
+                        if type_codes[idx] != _COORDINATE_CODE]
+            indices = indices[self._type_codes[indices] != _COORDINATE_CODE]
+        return indices
+
+    def _iter_section(self, section, num_fmt):
+        """Get the lines of an export section.
+
+        The lines are formatted for a bounded number of blocks or
+        connections at a time, so only the sorted order is kept for the
+        whole section. Orthogonal routes are computed all at once.
+
+        Parameters
+        ----------
+        section : str
+            Section tag, i.e. 'coordinates', 'blocks' or 'connections'.
+        num_fmt : str
+            Specification of the numbers format, e.g. '.4f'.
+            Only the coordinates section depends on it.
+
+        Yields
+        ------
+        str
+            Section lines without newline chars.
+
+        """
+        if section == "connections":
+            edges = self._get_sorted_edges()
+            if self._edge_routing != "straight":
+                yield from self._iter_tikz_connections(edges)
+                return
+            for start in range(0, len(edges[0]), _LINES_PER_CHUNK):
+                yield from self._iter_tikz_connections(tuple(
+                    e[start:start + _LINES_PER_CHUNK] for e in edges))
+            return
+
+        indices = self._get_sorted_indices()
+        for start in range(0, len(indices), _LINES_PER_CHUNK):
+            chunk = indices[start:start + _LINES_PER_CHUNK]
+            if section == "coordinates":
+                yield from self._iter_tikz_coordinates(num_fmt, chunk)
+            else:
+                yield from self._iter_latex_definitions(chunk)
+
+    def _patch_section(self, section, old_text, num_fmt):
+        """Get the text of an export section by patching its last export.
+
+        Only lines of changed blocks and connections are exported again;
+        all other lines are taken from the old text.
+
+        Parameters
+        ----------
+        section : str
+            Section tag, i.e. 'coordinates', 'blocks' or 'connections'.
+        old_text : str
+            Section text as written by the last export.
+        num_fmt : str
+            Specification of the numbers format, e.g. '.4f'.
+
+        Returns
+        -------
+        str
+            Section lines joined with newline chars.
+
+        """
+        exported = self._exported
+        if (exported is None
+                or (section == "coordinates"
+                    and exported["num_fmt"] != num_fmt)
+                or _digest(old_text) != exported["digests"][section]
+                or (section == "connections"
+                    and (self._journal.restyled
+                         or self._edge_routing != "straight"))):
+            # The old text cannot be reused; orthogonal routes are not
+            # patched, since moving a block may change any of them
+            return "\n".join(self._iter_section(section, num_fmt))
+
+        # Find the lines which have to be exported again; this is done
+        # with temporary arrays, whatever the backend
+        journal = self._journal
+        changed_blocks = np.fromiter(
+            journal.added_blocks | journal.changed_blocks, dtype=np.intp)
+        keys = np.asarray(self._get_section_keys(section), dtype=np.int64)
+        if section == "connections":
+            from_idx, to_idx, edge_types = (
+                np.asarray(e, dtype=np.intp) for e in self._get_sorted_edges())
+            changed_edges = np.array(
+                list(journal.added_edges | journal.changed_edges),
+                dtype=np.int64).reshape(-1, 2)
+            is_dirty = (np.isin(from_idx, changed_blocks)
+                        | np.isin(to_idx, changed_blocks)
+                        | np.isin(keys, _edge_keys(changed_edges[:, 0],
+                                                   changed_edges[:, 1])))
+        else:
+            is_dirty = np.isin(keys, changed_blocks)
+
+        # The keys have been recorded as lists by the list backend
+        old_keys = np.asarray(exported["keys"][section], dtype=np.int64)
+        old_lines = old_text.split("\n") if old_text else []
+        if np.array_equal(keys, old_keys):
+            # Unchanged order; lines can be replaced in place
+            lines = old_lines
+            missing = np.flatnonzero(is_dirty)
+        else:
+            # Look up the old lines of the remaining blocks or connections
+            old_lines = dict(zip(old_keys.tolist(), old_lines))
+            lines = [None if dirty else old_lines.get(key)
+                     for key, dirty in zip(keys.tolist(), is_dirty.tolist())]
+            missing = np.array(
+                [k for k, line in enumerate(lines) if line is None],
+                dtype=np.intp)
+
+        if len(missing):
+            def take(a):
+                # The list backend expects lists of Python ints
+                a = a[missing]
+                return a if self._numpy else a.tolist()
+
+            if section == "connections":
+                new_lines = self._iter_tikz_connections(
+                    (take(from_idx), take(to_idx), take(edge_types)))
+            elif section == "coordinates":
+                new_lines = self._iter_tikz_coordinates(num_fmt, take(keys))
+            else:
+                new_lines = self._iter_latex_definitions(take(keys))
+            for k, line in zip(missing.tolist(), new_lines):
+                lines[k] = line
+
+        return "\n".join(lines)
+
+    def _record_export(self, num_fmt, digests):
+        """Take a snapshot of an export and start a new change journal.
+
+        Parameters
+        ----------
+        num_fmt : str
+            Specification of the numbers format, e.g. '.4f'.
+        digests : dict
+            Dict mapping section tags onto the digests of the exported
+            section texts, see `_digest`.
+
+        """
+        self._exported = {
+            "num_fmt": num_fmt,
+            "digests": digests,
+            "keys": {tag: self._get_section_keys(tag) for tag in digests},
+            }
+        self._journal = _ChangeJournal()
+
+    def track_changes(self):
+        """Track the changes of the Blockschaltbild between exports.
+
+        Tracking starts with the next export; afterwards, every export
+        keeps a snapshot of its sections and starts a new journal of
+        changes, see `get_changes`. Patching a file with `export_to_file`
+        turns tracking on automatically.
+
+        """
+        self._tracking = True
+
+    def get_changes(self):
+        """Get the changes since the last export.
+
+        Changes are only recorded if they are tracked, see
+        `track_changes`. Before the first export afterwards,
+        all blocks and connections are added.
+        Connections which have been removed and added again are changed.
+        Blocks which are moved, renamed or otherwise modified are changed;
+        the connections of changed blocks are not listed, though.
+
+        Returns
+        -------
+        Changes
+            Added, removed and changed blocks and connections.
+
+        """
+        names = self._names
+        journal = self._journal
+        if journal is None:
+            journal = _ChangeJournal()
+            journal.add_blocks(self._name_to_idx.values())
+            journal.add_edges((f, t) for f, succ in self._adj.items()
+                              for t in succ)
+
+        def block_names(indices):
+            return [names[idx] for idx in sorted(indices)]
+
+        def edge_names(edges):
+            return [(names[f], names[t]) for f, t in sorted(edges)]
+
+        return Changes(
+            block_names(journal.added_blocks),
+            block_names(journal.removed_blocks),
+            block_names(journal.changed_blocks),
+            edge_names(journal.added_edges),
+            edge_names(journal.removed_edges),
+            edge_names(journal.changed_edges),
+            )
+
+    def export_to_stream(self, fileobj, num_fmt="g", externalize=False):
+        """Export the Blockschaltbild to a text stream.
+
+        The output is written incrementally, a bounded number of lines
+        at a time, so the whole text is never held in memory at once.
+        Only the order of the blocks and connections is kept until the
+        Blockschaltbild is modified, and a snapshot of the export if
+        changes are tracked, see `track_changes`.
+
+        Parameters
+        ----------
+        fileobj : file-like object
+            Target text stream, e.g. an open file or `sys.stdout`.
+        num_fmt : str, optional
+            Specification of the numbers format, e.g. '.4f'.
+        externalize : bool, optional
+            If True, the picture is preceded by `\\tikzsetnextfilename`
+            for `\\tikzexternalize`, naming it 'bsb-' and a digest of the
+            exported sections. The name only changes if the exported
+            picture does, so it is only compiled again in this case.
+
+        """
+        digests = {}
+        if externalize:
+            # The name depends on all sections, so their digests are
+            # computed in a first pass without writing anything
+            digests = {
+                section: _digest_lines(self._iter_section(section, num_fmt))
+                for section in _SECTIONS
+                }
+            fileobj.write(_external_name_line(digests))
+        # Place the opening tag
+        fileobj.write("\\begin{tikzpicture}\n\n\n")
+        # Export coordinates, block definitions and connections; the
+        # digests are only needed for tracking the changes
+        for section in _SECTIONS:
+            digest = None
+            if self._tracking and not externalize:
+                digest = _new_digest()
+            _write_tikz_section(fileobj, section,
+                                self._iter_section(section, num_fmt), digest)
+            if digest is not None:
+                digests[section] = digest.digest()
+        # Place the closing tag
+        fileobj.write("\\end{tikzpicture}\n")
+        if self._tracking:
+            self._record_export(num_fmt, digests)
+
+    def export_to_text(self, num_fmt="g", externalize=False):
         """Export the Blockschaltbild to a text (str with linebreaks).
 
         Parameters
         ----------
         num_fmt : str, optional
             Specification of the numbers format, e.g. '.4f'.
+        externalize : bool, optional
+            If True, the picture is named for `\\tikzexternalize`,
+            see `export_to_stream`.
 
         Returns
         -------
@@ -790,35 +2923,189 @@ class Blockschaltbild:
             Text with the exported Blockschaltbild.
 
         """
-        coordinates = "\n".join(b.get_tikz_coordinate(num_fmt)
-                                for b in self._get_sorted_blocks())
+        with io.StringIO() as f:
+            self.export_to_stream(f, num_fmt, externalize)
+            return f.getvalue()
 
-        # Get all block definitions, i.e. including coordinates (`None`)
-        all_blocks = \
-            (b.get_latex_definition() for b in self._get_sorted_blocks())
-        # Leave only real block definitions
-        blocks = "\n".join(filter(lambda e: e is not None, all_blocks))
+    def save(self, path):
+        """Save the Blockschaltbild in a compact binary format.
 
-        connections = "\n".join(
-            "\\draw[{:s}] ({:s}) -- ({:s});".format(st, fb, tb)
-            for fb, tb, st in self._get_sorted_connections_list()
-            )
+        The file contains a JSON header with the settings, followed by
+        the block and connection arrays and string tables; no Python
+        objects are pickled. It can be loaded with `load()`.
+
+        Parameters
+        ----------
+        path : str
+            Target filename; relative or absolute path.
 
-        return "\n".join([
-            "\\begin{tikzpicture}\n\n",  # place the opening tag
-            "% <coordinates>",  # export coordinates
-            coordinates,
-            "% </coordinates>\n\n",
-            "% <blocks>",  # export block definitions
-            blocks,
-            "% </blocks>\n\n",
-            "% <connections>",  # export connections
-            connections,
-            "% </connections>\n\n",
-            "\\end{tikzpicture}\n",  # place the closing tag
-            ])
-
-    def export_to_file(self, filename, num_fmt="g"):
+        """
+        n = self._next_idx
+        names_offsets, names_blob = _encode_strings(self._names)
+
+        # Store the connections in compressed sparse row format,
+        # i.e. the connections of block `idx` are the entries
+        # `edge_indptr[idx]:edge_indptr[idx + 1]`
+        num_edges = np.zeros(n, dtype=np.int64)
+        num_edges[list(self._adj)] = [
+            len(succ) for succ in self._adj.values()]
+        edge_indptr = np.zeros(n + 1, dtype="<i8")
+        np.cumsum(num_edges, out=edge_indptr[1:])
+        edge_to = np.fromiter(
+            itertools.chain.from_iterable(self._adj.values()),
+            dtype="<i8", count=int(edge_indptr[-1]))
+        edge_types = np.fromiter(
+            itertools.chain.from_iterable(
+                map(dict.values, self._adj.values())),
+            dtype="<i1", count=int(edge_indptr[-1]))
+
+        # Store the parameters the same way, for blocks with parameters
+        pars_idx = np.array(sorted(self._pars), dtype="<i8")
+        pars = [list(self._pars[idx]) for idx in pars_idx.tolist()]
+        pars_indptr = np.zeros(len(pars) + 1, dtype="<i8")
+        np.cumsum([len(p) for p in pars], out=pars_indptr[1:])
+        pars_offsets, pars_blob = _encode_strings(
+            list(itertools.chain.from_iterable(pars)))
+
+        arrays = {
+            "xy": np.asarray(self._xy[:n], dtype="<f8").reshape(n, 2),
+            "type_codes": np.asarray(self._type_codes[:n], dtype="<i4"),
+            "size_codes": np.asarray(self._size_codes[:n], dtype="<i4"),
+            "alive": np.asarray(self._alive[:n], dtype=bool),
+            "names_offsets": names_offsets,
+            "names_blob": names_blob,
+            "edge_indptr": edge_indptr,
+            "edge_to": edge_to,
+            "edge_types": edge_types,
+            "pars_idx": pars_idx,
+            "pars_indptr": pars_indptr,
+            "pars_offsets": pars_offsets,
+            "pars_blob": pars_blob,
+            }
+
+        # Compute the aligned array offsets relative to the data section
+        header = {
+            "settings": {
+                "x_scale": self.x_scale,
+                "y_scale": self.y_scale,
+                "block_sizes": self.block_sizes,
+                "scalar_style": self.scalar_style,
+                "vector_style": self.vector_style,
+                "arrow_style": self.arrow_style,
+                "edge_routing": self.edge_routing,
+                },
+            "auto_joints_counter": self._auto_joints_counter,
+            "types": self._types.values,
+            "sizes": self._sizes.values,
+            "arrays": {},
+            }
+        offset = 0
+        for key, arr in arrays.items():
+            header["arrays"][key] = {
+                "dtype": arr.dtype.str,
+                "shape": list(arr.shape),
+                "offset": offset,
+                }
+            offset += -(-arr.nbytes // _BINARY_ALIGNMENT) * _BINARY_ALIGNMENT
+        header = json.dumps(header).encode("utf-8")
+
+        with open(path, "wb") as f:
+            f.write(_BINARY_PREFIX.pack(
+                _BINARY_MAGIC, _BINARY_FORMAT_VERSION, len(header)))
+            f.write(header)
+            # Align the beginning of the data section
+            f.write(b"\x00" * (-f.tell() % _BINARY_ALIGNMENT))
+            for arr in arrays.values():
+                f.write(np.ascontiguousarray(arr).tobytes())
+                f.write(b"\x00" * (-arr.nbytes % _BINARY_ALIGNMENT))
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """Load a Blockschaltbild saved with `save()`.
+
+        Parameters
+        ----------
+        path : str
+            Source filename; relative or absolute path.
+        mmap : bool, optional
+            If True, the block arrays are memory-mapped copy-on-write,
+            i.e. they are read lazily and changes are never written back.
+            The file must not be modified while the Blockschaltbild is
+            in use then.
+
+        Returns
+        -------
+        Blockschaltbild
+            The loaded block diagram.
+
+        """
+        if mmap:
+            buf = np.memmap(path, dtype=np.uint8, mode="c")
+        else:
+            buf = np.fromfile(path, dtype=np.uint8)
+
+        if len(buf) < _BINARY_PREFIX.size:
+            raise ValueError("'{:s}' is not a saved Blockschaltbild!".format(
+                path))
+        magic, version, header_len = _BINARY_PREFIX.unpack(
+            buf[:_BINARY_PREFIX.size].tobytes())
+        if magic != _BINARY_MAGIC:
+            raise ValueError("'{:s}' is not a saved Blockschaltbild!".format(
+                path))
+        if version != _BINARY_FORMAT_VERSION:
+            raise ValueError(
+                "Unsupported format version {:d} of '{:s}'!".format(
+                    version, path))
+        header_end = _BINARY_PREFIX.size + header_len
+        header = json.loads(
+            buf[_BINARY_PREFIX.size:header_end].tobytes().decode("utf-8"))
+        data_start = header_end + (-header_end % _BINARY_ALIGNMENT)
+
+        # Create array views of the buffer
+        arrays = {
+            key: np.ndarray(tuple(spec["shape"]), dtype=spec["dtype"],
+                            buffer=buf, offset=data_start + spec["offset"])
+            for key, spec in header["arrays"].items()
+            }
+
+        bsb = cls(backend="numpy", **header["settings"])
+        bsb._auto_joints_counter = header["auto_joints_counter"]
+        bsb._types = _InternTable(header["types"])
+        bsb._sizes = _InternTable(header["sizes"])
+
+        bsb._xy = arrays["xy"]
+        bsb._type_codes = arrays["type_codes"]
+        bsb._size_codes = arrays["size_codes"]
+        bsb._alive = arrays["alive"]
+        bsb._next_idx = len(bsb._alive)
+
+        bsb._names = _decode_strings(arrays["names_offsets"],
+                                     arrays["names_blob"])
+        alive_idx = np.flatnonzero(bsb._alive).tolist()
+        bsb._name_to_idx = {bsb._names[idx]: idx for idx in alive_idx}
+
+        # Create the adjacency dicts right from the stored slices
+        indptr = arrays["edge_indptr"].tolist()
+        edge_to = arrays["edge_to"].tolist()
+        edge_types = arrays["edge_types"].tolist()
+        bsb._adj = {
+            idx: dict(zip(edge_to[indptr[idx]:indptr[idx + 1]],
+                          edge_types[indptr[idx]:indptr[idx + 1]]))
+            for idx in alive_idx
+            }
+
+        pars_strings = _decode_strings(arrays["pars_offsets"],
+                                       arrays["pars_blob"])
+        pars_indptr = arrays["pars_indptr"].tolist()
+        bsb._pars = {
+            idx: pars_strings[pars_indptr[k]:pars_indptr[k + 1]]
+            for k, idx in enumerate(arrays["pars_idx"].tolist())
+            }
+
+        return bsb
+
+    def export_to_file(self, filename, num_fmt="g", patch=False,
+                       externalize=False):
         """Export the Blockschaltbild to a TikZ file.
 
         Parameters
@@ -828,7 +3115,72 @@ class Blockschaltbild:
 
         num_fmt : str, optional
             Specification of the numbers format, e.g. '.4f'.
+        patch : bool, optional
+            If True, the file is expected to contain the last export of
+            this Blockschaltbild. Only the lines of blocks and connections
+            which have changed since then are exported again, and the file
+            is only rewritten if its contents change. Text outside of the
+            section markers is kept, apart from the name of an
+            externalized picture. If the file does not exist or does not
+            contain the last export, it is exported completely.
+        externalize : bool, optional
+            If True, the picture is named for `\\tikzexternalize`,
+            see `export_to_stream`.
 
         """
+        if patch:
+            self._patch_file(filename, num_fmt, externalize)
+            return
+
         with open(filename, 'w', encoding="utf-8") as f:
-            f.write(self.export_to_text(num_fmt))
+            self.export_to_stream(f, num_fmt, externalize)
+
+    def _patch_file(self, filename, num_fmt, externalize=False):
+        """Patch a TikZ file containing the last export, see `export_to_file`.
+
+        Parameters
+        ----------
+        filename : str
+            Target filename; relative or absolute path.
+        num_fmt : str
+            Specification of the numbers format, e.g. '.4f'.
+        externalize : bool, optional
+            If True, the picture is named for `\\tikzexternalize`.
+
+        """
+        # The next patch needs a snapshot of this export
+        self._tracking = True
+        try:
+            with open(filename, "r", encoding="utf-8") as f:
+                old_text = f.read()
+        except FileNotFoundError:
+            old_text = ""
+        parts = _split_tikz_sections(old_text)
+
+        if parts is None:
+            # There are no sections to be patched
+            with open(filename, 'w', encoding="utf-8") as f:
+                self.export_to_stream(f, num_fmt, externalize)
+            return
+
+        between, old_texts = parts
+        texts = {tag: self._patch_section(tag, old_texts[tag], num_fmt)
+                 for tag in _SECTIONS}
+        digests = {tag: _digest(text) for tag, text in texts.items()}
+        # The name of an externalized picture follows its contents
+        between[0] = _replace_external_name_line(
+            between[0], _external_name_line(digests) if externalize else "")
+        with io.StringIO() as f:
+            for tag, text in zip(_SECTIONS, between):
+                opening, closing = _section_markers(tag)
+                f.write(text)
+                f.write(opening)
+                f.write(texts[tag])
+                f.write(closing)
+            f.write(between[-1])
+            new_text = f.getvalue()
+
+        if new_text != old_text:
+            with open(filename, 'w', encoding="utf-8") as f:
+                f.write(new_text)
+        self._record_export(num_fmt, digests)
@@ -0,0 +1,304 @@
+"""Persistent cache for converted *.bsb files."""
+
+
+from ._lazy import LazyModule
+import functools
+import hashlib
+import json
+import os
+
+
+# Only needed to store entries, not to look them up
+tempfile = LazyModule("tempfile")
+
+# Specify exports
+__all__ = ["ConversionCache"]
+
+# Version of the cache layout; increase it if the entry format changes
+_CACHE_FORMAT_VERSION = 1
+
+# Suffix of cache entries; temporary files do not have it
+_ENTRY_SUFFIX = ".tex"
+
+# Suffix of the lists of files the entries depend on, e.g. subsystems
+_DEPENDENCIES_SUFFIX = ".deps"
+
+
+@functools.lru_cache(maxsize=None)
+def _converter_stamp():
+    """Get a version stamp of the converter.
+
+    The stamp is a hash of the cache format version and of the package
+    sources, so that any change of the converter invalidates the cache.
+
+    Returns
+    -------
+    str
+        Hex digest of the stamp.
+
+    """
+    h = hashlib.sha256()
+    h.update(str(_CACHE_FORMAT_VERSION).encode())
+    package_dir = os.path.dirname(os.path.abspath(__file__))
+    for basename in sorted(os.listdir(package_dir)):
+        if basename.endswith(".py"):
+            with open(os.path.join(package_dir, basename), "rb") as f:
+                h.update(basename.encode())
+                h.update(f.read())
+    return h.hexdigest()
+
+
+class ConversionCache:
+    """On-disk cache mapping *.bsb contents onto exported TikZ texts.
+
+    Entries are stored as single files named after the hash of the input
+    text, the converter version and the conversion settings. They are
+    written atomically, so several processes can share one cache.
+    The cache size is bounded; least recently used entries are evicted.
+
+    Outputs which also depend on other files, i.e. on subsystems, are
+    stored under a key covering these files as well; the list of files
+    is stored under the key of the input and its directory, since
+    relative paths of equal inputs may refer to different files, see
+    `directory_key` and `get_dependencies`.
+
+    """
+
+    def __init__(self, cache_dir, max_size=64*2**20, settings=None):
+        """Create a cache handle.
+
+        Parameters
+        ----------
+        cache_dir : str
+            Cache directory; it is created if it does not exist.
+        max_size : int, optional
+            Maximum total size of the cache entries in bytes.
+        settings : dict or None, optional
+            Conversion settings; entries are only valid for equal settings.
+
+        """
+        #: str: Cache directory
+        self.cache_dir = cache_dir
+        #: int: Maximum total size of the cache entries in bytes
+        self.max_size = max_size
+        #: dict: Conversion settings
+        self.settings = {} if settings is None else settings
+
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def key(self, text):
+        """Compute the cache key of an input text.
+
+        Parameters
+        ----------
+        text : str
+            Contents of a *.bsb file.
+
+        Returns
+        -------
+        str
+            Cache key.
+
+        """
+        h = self._new_hash()
+        h.update(text.encode("utf-8"))
+        return h.hexdigest()
+
+    def file_key(self, filename):
+        """Compute the cache key of an input file.
+
+        The file is hashed in binary chunks, so it is never held
+        in memory as a whole.
+
+        Parameters
+        ----------
+        filename : str
+            Path to a *.bsb file.
+
+        Returns
+        -------
+        str
+            Cache key.
+
+        """
+        h = self._new_hash()
+        with open(filename, "rb") as f:
+            for chunk in iter(lambda: f.read(2**16), b""):
+                h.update(chunk)
+        return h.hexdigest()
+
+    def directory_key(self, key, directory):
+        """Compute the cache key of an input located in a directory.
+
+        Parameters
+        ----------
+        key : str
+            Cache key of the input.
+        directory : str
+            Directory relative paths of the input are resolved against;
+            '' means the current working directory.
+
+        Returns
+        -------
+        str
+            Cache key.
+
+        """
+        h = self._new_hash()
+        h.update(key.encode())
+        h.update(os.path.realpath(directory).encode())
+        return h.hexdigest()
+
+    def dependent_key(self, key, filenames):
+        """Compute the cache key of an input depending on other files.
+
+        Parameters
+        ----------
+        key : str
+            Cache key of the input.
+        filenames : list of str
+            Paths to the files the output depends on.
+
+        Returns
+        -------
+        str or None
+            Cache key or None if one of the files does not exist.
+
+        """
+        h = self._new_hash()
+        h.update(key.encode())
+        for filename in filenames:
+            try:
+                h.update(self.file_key(filename).encode())
+            except OSError:
+                return None
+        return h.hexdigest()
+
+    def get_dependencies(self, key):
+        """Get the files the output of an input depends on.
+
+        Parameters
+        ----------
+        key : str
+            Cache key of the input.
+
+        Returns
+        -------
+        list of str
+            Paths to the files, see `put_dependencies`; empty if there
+            are none or if they are unknown.
+
+        """
+        path = os.path.join(self.cache_dir, key + _DEPENDENCIES_SUFFIX)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                filenames = json.load(f)
+            os.utime(path)
+        except (FileNotFoundError, ValueError):
+            return []
+        return filenames
+
+    def put_dependencies(self, key, filenames):
+        """Store the files the output of an input depends on.
+
+        The output itself has to be stored under the key returned by
+        `dependent_key`.
+
+        Parameters
+        ----------
+        key : str
+            Cache key of the input.
+        filenames : list of str
+            Paths to the files.
+
+        """
+        self._write(key + _DEPENDENCIES_SUFFIX, json.dumps(filenames))
+
+    def _new_hash(self):
+        """Create a hash object seeded with the stamp and the settings."""
+        h = hashlib.sha256()
+        h.update(_converter_stamp().encode())
+        h.update(repr(sorted(self.settings.items())).encode())
+        return h
+
+    def _entry_path(self, key):
+        """Get the path to the entry file for a key."""
+        return os.path.join(self.cache_dir, key + _ENTRY_SUFFIX)
+
+    def get(self, key):
+        """Get a cached output text.
+
+        Parameters
+        ----------
+        key : str
+            Cache key.
+
+        Returns
+        -------
+        str or None
+            Cached output text or None if there is no such entry.
+
+        """
+        path = self._entry_path(key)
+        try:
+            with open(path, "r", encoding="utf-8", newline="") as f:
+                text = f.read()
+            # Mark the entry as recently used
+            os.utime(path)
+        except FileNotFoundError:
+            # The entry does not exist or has just been evicted
+            return None
+        return text
+
+    def put(self, key, text):
+        """Store an output text.
+
+        Parameters
+        ----------
+        key : str
+            Cache key.
+        text : str
+            Output text.
+
+        """
+        self._write(key + _ENTRY_SUFFIX, text)
+
+    def _write(self, basename, text):
+        """Write a file of the cache atomically."""
+        # Write to a temporary file first and then move it into place;
+        # this is atomic, so other processes never see partial entries
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with open(fd, "w", encoding="utf-8", newline="") as f:
+                f.write(text)
+            os.replace(tmp_path, os.path.join(self.cache_dir, basename))
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    def evict(self):
+        """Remove least recently used entries until the size bound holds."""
+        entries = []
+        total_size = 0
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                if not entry.name.endswith(
+                        (_ENTRY_SUFFIX, _DEPENDENCIES_SUFFIX)):
+                    continue
+                try:
+                    st = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, entry.path))
+                total_size += st.st_size
+
+        entries.sort()
+        for _, size, path in entries:
+            if total_size <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                # Another process has been faster
+                pass
+            total_size -= size
@@ -0,0 +1,252 @@
+"""Per-phase run metrics of conversions."""
+
+
+from ._lazy import LazyModule
+from collections import namedtuple
+import contextlib
+import time
+
+
+# Memory is only traced while metrics are collected
+tracemalloc = LazyModule("tracemalloc")
+
+# Specify exports
+__all__ = ["PhaseMetrics", "collect_metrics", "format_metrics_table"]
+
+#: Metrics of a single conversion phase:
+#: * `phase`: phase name, e.g. 'parse' or 'export'
+#: * `file`: converted file or None
+#: * `wall_time`: wall time in seconds
+#: * `peak_memory`: peak traced memory in bytes, relative to the memory
+#:   in use at the beginning of the phase; None if memory is not traced
+#: * `num_blocks`, `num_connections`, `num_auto_joints`: sizes of the block
+#:   diagram at the end of the phase; None if there is no block diagram
+PhaseMetrics = namedtuple("PhaseMetrics", [
+    "phase",
+    "file",
+    "wall_time",
+    "peak_memory",
+    "num_blocks",
+    "num_connections",
+    "num_auto_joints",
+    ])
+
+# Active collectors; callables taking a PhaseMetrics tuple
+_collectors = []
+
+# Stack of the currently running phases
+_phase_stack = []
+
+
+class _NullPhase:
+    """Phase placeholder used if no metrics are collected; does nothing."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def set_diagram(self, bsb):
+        pass
+
+
+_NULL_PHASE = _NullPhase()
+
+
+class _Phase:
+    """Context manager measuring a single phase."""
+
+    def __init__(self, name, file):
+        """Create a new phase.
+
+        Parameters
+        ----------
+        name : str
+            Phase name.
+        file : str or None
+            Converted file; None means the file of the enclosing phase.
+
+        """
+        self.name = name
+        self.file = file
+        self._bsb = None
+        self._start_time = None
+        self._start_memory = None
+        self._peak_memory = None
+
+    def set_diagram(self, bsb):
+        """Set the block diagram whose sizes are reported."""
+        self._bsb = bsb
+
+    def __enter__(self):
+        parent = _phase_stack[-1] if _phase_stack else None
+        if self.file is None and parent is not None:
+            self.file = parent.file
+
+        if tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            # Save the parent's peak before resetting it
+            if parent is not None and parent._peak_memory is not None:
+                parent._peak_memory = max(parent._peak_memory, peak)
+            if hasattr(tracemalloc, "reset_peak"):
+                tracemalloc.reset_peak()
+            self._start_memory = current
+            self._peak_memory = current
+
+        _phase_stack.append(self)
+        self._start_time = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        wall_time = time.perf_counter() - self._start_time
+        _phase_stack.pop()
+        parent = _phase_stack[-1] if _phase_stack else None
+
+        peak_memory = None
+        if self._peak_memory is not None and tracemalloc.is_tracing():
+            peak = max(self._peak_memory, tracemalloc.get_traced_memory()[1])
+            if parent is not None and parent._peak_memory is not None:
+                parent._peak_memory = max(parent._peak_memory, peak)
+            peak_memory = peak - self._start_memory
+
+        bsb = self._bsb
+        emit(PhaseMetrics(
+            phase=self.name,
+            file=self.file,
+            wall_time=wall_time,
+            peak_memory=peak_memory,
+            num_blocks=None if bsb is None else bsb.num_blocks,
+            num_connections=None if bsb is None else bsb.num_connections,
+            num_auto_joints=None if bsb is None else bsb.num_auto_joints,
+            ))
+        return False
+
+
+def is_collecting():
+    """Check if metrics are being collected.
+
+    Returns
+    -------
+    bool
+        True if there is at least one active collector.
+
+    """
+    return bool(_collectors)
+
+
+def phase(name, file=None):
+    """Measure a phase; used as a context manager.
+
+    If no metrics are collected, a shared placeholder is returned,
+    so the instrumentation costs almost nothing.
+
+    Parameters
+    ----------
+    name : str
+        Phase name.
+    file : str or None, optional
+        Converted file; None means the file of the enclosing phase.
+
+    Returns
+    -------
+    context manager
+        Phase object; its `set_diagram(bsb)` method sets the block diagram
+        whose sizes are reported.
+
+    """
+    if not _collectors:
+        return _NULL_PHASE
+    return _Phase(name, file)
+
+
+def emit(metrics):
+    """Pass metrics to all active collectors.
+
+    Parameters
+    ----------
+    metrics : PhaseMetrics
+        Metrics of a phase.
+
+    """
+    for collector in list(_collectors):
+        collector(metrics)
+
+
+@contextlib.contextmanager
+def collect_metrics(callback=None, trace_memory=True):
+    """Collect metrics of all conversion phases within a `with` block.
+
+    Example::
+
+        with collect_metrics() as metrics:
+            convert_to_tikz(["."])
+        slowest = max(metrics, key=lambda m: m.wall_time)
+
+    Parameters
+    ----------
+    callback : callable or None, optional
+        Function called with a PhaseMetrics tuple after each phase.
+    trace_memory : bool, optional
+        If True, peak memory is traced with `tracemalloc`.
+        Note that tracing slows the conversion down considerably.
+
+    Yields
+    ------
+    list of PhaseMetrics
+        List which is filled with the metrics of the phases.
+
+    """
+    records = []
+
+    def collector(metrics):
+        records.append(metrics)
+        if callback is not None:
+            callback(metrics)
+
+    started_tracing = trace_memory and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+
+    _collectors.append(collector)
+    try:
+        yield records
+    finally:
+        _collectors.remove(collector)
+        if started_tracing:
+            tracemalloc.stop()
+
+
+def format_metrics_table(records):
+    """Summarize metrics per phase as a text table.
+
+    Parameters
+    ----------
+    records : list of PhaseMetrics
+        Collected metrics.
+
+    Returns
+    -------
+    str
+        Table with the number of runs, the total and maximum wall time
+        and the maximum peak memory of each phase, in order of appearance.
+
+    """
+    # Aggregate the records of each phase
+    summary = {}
+    for r in records:
+        count, total, longest, peak = summary.get(r.phase, (0, 0.0, 0.0, None))
+        if r.peak_memory is not None:
+            peak = r.peak_memory if peak is None else max(peak, r.peak_memory)
+        summary[r.phase] = (
+            count + 1, total + r.wall_time, max(longest, r.wall_time), peak)
+
+    lines = ["{:12s} {:>6s} {:>10s} {:>10s} {:>10s}".format(
+        "phase", "runs", "total [s]", "max [s]", "peak [KiB]")]
+    for name, (count, total, longest, peak) in summary.items():
+        lines.append("{:12s} {:6d} {:10.4f} {:10.4f} {:>10s}".format(
+            name, count, total, longest,
+            "-" if peak is None else "{:.1f}".format(peak/1024)))
+    return "\n".join(lines)
@@ -0,0 +1,59 @@
+"""Detection of overlapping blocks and coordinates.
+
+Blocks are boxes, coordinates are points. The boxes are kept in a
+uniform grid, so each box is only compared with the boxes near it;
+finding all overlaps takes O(N + K) time for N boxes with K overlaps
+(plus sorting the overlaps), as long as the boxes are not much larger
+than their typical distance.
+
+"""
+
+
+from ._grid import GridIndex
+
+
+# Specify exports
+__all__ = ["find_overlaps"]
+
+
+def find_overlaps(centres, sizes):
+    """Find overlapping boxes and points.
+
+    Boxes overlap if their interiors do; boxes merely touching each other
+    do not overlap. Points overlap the boxes they lie in and other points
+    at the same position.
+
+    Parameters
+    ----------
+    centres : list of pairs of float
+        (x, y)-coordinates of the centres of the boxes.
+    sizes : list of pairs of float
+        (width, height) of the boxes; boxes with zero width or height
+        are points.
+
+    Returns
+    -------
+    list of tuples
+        Overlapping (i, j)-pairs of box indices with i < j, sorted.
+
+    """
+    if len(sizes) != len(centres):
+        raise ValueError("Each box must have a centre and a size!")
+
+    boxes = [
+        (x, y, x, y) if not (w > 0 and h > 0) else
+        (x - w/2, y - h/2, x + w/2, y + h/2)
+        for (x, y), (w, h) in zip(centres, sizes)
+        ]
+    pairs = GridIndex(boxes).overlapping_pairs()
+
+    # Points never overlap each other in the grid index;
+    # create a dict mapping positions onto the points there
+    points = {}
+    for k, box in enumerate(boxes):
+        if box[0] == box[2]:
+            others = points.setdefault(box[:2], [])
+            pairs.extend((j, k) for j in others)
+            others.append(k)
+    pairs.sort()
+    return pairs
@@ -0,0 +1,256 @@
+"""Orthogonal routing of connections around blocks.
+
+Each connection is routed on its own, trying a few orthogonal shapes in
+the order of preference:
+
+* ``--``: a straight line, if both ends are aligned;
+* ``-|`` and ``|-``: one bend;
+* ``-|-`` and ``|-|``: two bends around a vertical or horizontal
+  channel, whose position is searched for starting at the midpoint
+  and moving past the blocks in the way.
+
+The first shape which does not cross any block is taken; if there is
+none, the one crossing the fewest blocks is taken. Connections of blocks
+lying on top of other blocks cannot avoid them anyway; they get the
+first shape without searching.
+
+Blocks are kept in a uniform grid, so checking a segment only looks at
+the blocks near it. Routing a connection therefore takes constant time
+for the usual short connections, independently of the size of the
+diagram.
+
+"""
+
+
+from ._grid import GridIndex
+from heapq import heappop, heappush
+
+
+# Specify exports
+__all__ = ["route_orthogonal"]
+
+# Shapes of the routes, see the module documentation
+_STRAIGHT = "--"
+_HV = "-|"
+_VH = "|-"
+_HVH = "-|-"
+_VHV = "|-|"
+
+# Preference of the shapes, indexed by
+# 2*(leave horizontally) + (enter horizontally)
+_SHAPE_ORDERS = (
+    (_HV, _VH, _HVH, _VHV),
+    (_VH, _HVH, _HV, _VHV),
+    (_HV, _HVH, _VH, _VHV),
+    (_HVH, _HV, _VH, _VHV),
+    )
+
+
+class _Router:
+    """Router of the connections between the boxes of a grid index."""
+
+    def __init__(self, index, centres, max_tries):
+        self.index = index
+        self.centres = centres
+        self.max_tries = max_tries
+        # Dict mapping nodes onto True if they lie inside another box
+        self._buried = {}
+
+    def _is_buried(self, v):
+        """Check if the centre of node `v` lies inside another box."""
+        buried = self._buried.get(v)
+        if buried is None:
+            x, y = self.centres[v]
+            buried = bool(self.index.query(x, y, x, y) - {v})
+            self._buried[v] = buried
+        return buried
+
+    def _crossings(self, segments, v, w):
+        """Find the boxes crossed by a route from node `v` to node `w`.
+
+        The first segment may cross `v`'s own box and the last one
+        `w`'s box, since they start and end at the centres of the nodes.
+
+        """
+        last = len(segments) - 1
+        hits = set()
+        for k, segment in enumerate(segments):
+            seg_hits = self.index.query(*segment)
+            if k == 0:
+                seg_hits.discard(v)
+            if k == last:
+                seg_hits.discard(w)
+            hits |= seg_hits
+        return hits
+
+    def _segments(self, shape, v, w, m=None):
+        """Get the segments of a route as (x0, y0, x1, y1)-tuples."""
+        (ax, ay), (bx, by) = self.centres[v], self.centres[w]
+        if shape == _STRAIGHT:
+            return [(ax, ay, bx, by)]
+        if shape == _HV:
+            return [(ax, ay, bx, ay), (bx, ay, bx, by)]
+        if shape == _VH:
+            return [(ax, ay, ax, by), (ax, by, bx, by)]
+        if shape == _HVH:
+            return [(ax, ay, m, ay), (m, ay, m, by), (m, by, bx, by)]
+        return [(ax, ay, ax, m), (ax, m, bx, m), (bx, m, bx, by)]
+
+    def _find_channel(self, shape, v, w):
+        """Find the position of the channel of a route with two bends.
+
+        Positions are tried in the order of the route lengths, starting
+        at the midpoint; the borders of each crossed box are tried next.
+
+        Returns
+        -------
+        m : float
+            Channel position; an x-coordinate for '-|-' routes and
+            a y-coordinate for '|-|' routes.
+        num_hits : int
+            Number of boxes crossed by the route.
+
+        """
+        (ax, ay), (bx, by) = self.centres[v], self.centres[w]
+        if shape == _HVH:
+            lo, hi, axis = min(ax, bx), max(ax, bx), 0
+        else:
+            lo, hi, axis = min(ay, by), max(ay, by), 1
+        mid = (lo + hi)/2
+
+        def detour(m):
+            # Excess length of the route and distance to the midpoint
+            return 2*max(lo - m, m - hi, 0), abs(m - mid)
+
+        heap = [(detour(mid), mid)]
+        seen = {mid}
+        best = None
+        for _ in range(self.max_tries):
+            if not heap:
+                break
+            _, m = heappop(heap)
+            hits = self._crossings(self._segments(shape, v, w, m), v, w)
+            if best is None or len(hits) < best[1]:
+                best = m, len(hits)
+                if not hits:
+                    break
+            for k in hits:
+                box = self.index.boxes[k]
+                for c in (box[axis], box[axis + 2]):
+                    if c not in seen:
+                        seen.add(c)
+                        heappush(heap, (detour(c), c))
+        return best
+
+    def route(self, v, w, h_out, h_in):
+        """Route a connection from node `v` to node `w`.
+
+        Parameters
+        ----------
+        v, w : int
+            Indices of the nodes.
+        h_out, h_in : bool
+            True if the connection should leave `v` and enter `w`
+            horizontally.
+
+        Returns
+        -------
+        shape : str
+            Shape of the route, see the module documentation.
+        m : float or None
+            Channel position of routes with two bends, None otherwise.
+
+        """
+        (ax, ay), (bx, by) = self.centres[v], self.centres[w]
+        order = _SHAPE_ORDERS[2*h_out + h_in]
+        if self._is_buried(v) or self._is_buried(w):
+            # Overlapping blocks cannot be avoided; do not search for
+            # detours, which would be tried in vain
+            if ax == bx or ay == by:
+                return _STRAIGHT, None
+            return next(s for s in order if s in (_HV, _VH)), None
+
+        best = None
+        if ax == bx or ay == by:
+            num_hits = len(self._crossings(
+                self._segments(_STRAIGHT, v, w), v, w))
+            if not num_hits:
+                return _STRAIGHT, None
+            best = _STRAIGHT, None, num_hits
+
+        for shape in order:
+            # Skip shapes which are degenerate, i.e. straight lines
+            if shape in (_HV, _VH):
+                if ax == bx or ay == by:
+                    continue
+                m = None
+                num_hits = len(self._crossings(
+                    self._segments(shape, v, w), v, w))
+            elif (shape == _HVH and ay == by) or (shape == _VHV and ax == bx):
+                continue
+            else:
+                m, num_hits = self._find_channel(shape, v, w)
+            if not num_hits:
+                return shape, m
+            if best is None or num_hits < best[2]:
+                best = shape, m, num_hits
+
+        return best[:2]
+
+
+def route_orthogonal(centres, sizes, edges, horizontal=None,
+                     clearance=0.2, max_tries=16):
+    """Route connections orthogonally around the boxes of the nodes.
+
+    Parameters
+    ----------
+    centres : list of pairs of float
+        (x, y)-coordinates of the centres of the nodes.
+    sizes : list of pairs of float
+        (width, height) of the boxes of the nodes; nodes with zero width
+        or height are points, which are no obstacles.
+    edges : iterable of pairs of int
+        Connections as (from, to)-pairs of node indices.
+    horizontal : list of bool or None, optional
+        True if the connections of a node should leave and enter it
+        horizontally, e.g. at the sides of a block; None means False
+        for all nodes.
+    clearance : float, optional
+        Minimum distance of the routes to the boxes they pass by.
+    max_tries : int, optional
+        Maximum number of channel positions tried for each shape
+        of a route.
+
+    Returns
+    -------
+    list of tuples
+        (shape, m) of each connection: the shape is one of '--', '-|',
+        '|-', '-|-' and '|-|' (see the module documentation); m is the
+        x-position of the vertical channel of '-|-' routes, the y-position
+        of the horizontal channel of '|-|' routes and None otherwise.
+
+    """
+    if len(sizes) != len(centres):
+        raise ValueError("Each node must have a centre and a size!")
+    edges = list(edges)
+    if any(not (0 <= v < len(centres) and 0 <= w < len(centres))
+           for v, w in edges):
+        raise ValueError("Edge refers to a non-existent node!")
+    if horizontal is None:
+        horizontal = [False]*len(centres)
+
+    boxes = [
+        None if not (w > 0 and h > 0) else
+        (x - w/2 - clearance, y - h/2 - clearance,
+         x + w/2 + clearance, y + h/2 + clearance)
+        for (x, y), (w, h) in zip(centres, sizes)
+        ]
+    router = _Router(GridIndex(boxes), centres, max_tries)
+
+    routes = []
+    for v, w in edges:
+        if v == w:
+            routes.append((_STRAIGHT, None))
+        else:
+            routes.append(router.route(v, w, horizontal[v], horizontal[w]))
+    return routes
@@ -0,0 +1,497 @@
+"""Resident conversion server listening on a Unix socket.
+
+The server keeps a warm interpreter and a pool of worker processes,
+so converting a few small files does not pay for the interpreter
+startup and the imports each time. Requests and responses are single
+lines of JSON:
+
+* Request: ``{"paths": [...], "texts": [...], "directory": ...}``;
+  paths must be absolute and may be files or folders, texts are
+  contents of *.bsb files. Relative subsystem paths in the texts are
+  resolved against the absolute directory (e.g. the working directory
+  of the client), never against the one of the server; without a
+  directory, they are rejected.
+  ``{"shutdown": true}`` stops the server.
+* Response: ``{"files": [{"file": ..., "error": ...}, ...],
+  "texts": [{"tex": ..., "error": ...}, ...]}``, where errors are None
+  or ``{"type": ..., "message": ...}``; ``{"error": ...}`` if the whole
+  request has failed, e.g. because of a relative path. Jobs whose
+  results do not arrive in time fail with a TimeoutError.
+
+"""
+
+
+from .boilerplate import (
+    _SubsystemLoader,
+    _call_with_timeout,
+    _collect_bsb_files,
+    _convert_text,
+    _get_cached,
+    _merge_settings,
+    _put_cached,
+    _try_to_convert_single_file,
+    )
+from .cache import ConversionCache
+from ._lazy import LazyModule
+import json
+import math
+import os
+import socket
+import socketserver
+import threading
+import time
+
+
+# The pool is only needed once a server is started
+multiprocessing = LazyModule("multiprocessing")
+
+# Specify exports
+__all__ = ["ConversionServer", "serve", "request_conversion"]
+
+# Unix sockets are not supported on all platforms
+_UnixStreamServer = getattr(socketserver, "ThreadingUnixStreamServer", object)
+
+# Maximum time in seconds to wait for a job if no timeout is given and
+# additional time to wait for a worker, e.g. to start or to time out
+_MAX_JOB_TIME = 600.0
+_RESULT_TIMEOUT_MARGIN = 5.0
+
+# Cache of converted texts and conversion settings of a worker process,
+# set by `_init_worker`
+_worker_cache = None
+_worker_settings = None
+
+
+def _describe_error(e):
+    """Describe an exception in a JSON-serialisable way."""
+    return {"type": type(e).__name__, "message": str(e)}
+
+
+def _get_result(result, deadline):
+    """Get the result of a job, waiting until a deadline at most.
+
+    Parameters
+    ----------
+    result : multiprocessing.pool.AsyncResult
+        Result of the job.
+    deadline : float
+        Deadline as returned by `time.monotonic()`.
+
+    Returns
+    -------
+    object
+        Result of the job.
+
+    Raises
+    ------
+    TimeoutError
+        If the result is not ready until the deadline.
+
+    """
+    try:
+        return result.get(max(deadline - time.monotonic(), 0.0))
+    except multiprocessing.TimeoutError:
+        raise TimeoutError("No result from the worker processes") from None
+
+
+def _init_worker(cache_dir, cache_size, settings):
+    """Initialise a worker process.
+
+    Parameters
+    ----------
+    cache_dir : str or None
+        Directory of a persistent cache of converted files;
+        None means no cache.
+    cache_size : int
+        Maximum size of the cache in bytes.
+    settings : dict
+        Conversion settings, see `boilerplate._convert_text`.
+
+    """
+    global _worker_cache, _worker_settings
+    _worker_settings = settings
+    if cache_dir is not None:
+        _worker_cache = ConversionCache(cache_dir, cache_size, settings)
+
+
+def _convert_file_job(filename, timeout):
+    """Convert a *.bsb file in a worker process.
+
+    Parameters
+    ----------
+    filename : str
+        Path to the file to be converted.
+    timeout : float or None
+        Maximum conversion time in seconds; None means no timeout.
+
+    Returns
+    -------
+    dict or None
+        Description of the error or None if the conversion has succeeded.
+
+    """
+    e = _try_to_convert_single_file(
+        filename, timeout, _worker_cache, _worker_settings)
+    return None if e is None else _describe_error(e)
+
+
+def _convert_text_to_tex(text, directory):
+    """Convert the contents of a *.bsb file into a TikZ text.
+
+    Parameters
+    ----------
+    text : str
+        Contents of a *.bsb file.
+    directory : str or None
+        Absolute directory of relative subsystem paths; None means that
+        relative paths are rejected.
+
+    Returns
+    -------
+    str
+        TikZ text.
+
+    """
+    cache = _worker_cache
+    lines = text.splitlines(keepends=True)
+    externalize = _merge_settings(_worker_settings)["externalize"]
+    if cache is None:
+        bsb = _convert_text(lines, _worker_settings, directory=directory)
+        return bsb.export_to_text(externalize=externalize)
+
+    key = cache.key(text)
+    # Without a directory, all subsystem paths are absolute
+    tex, _ = _get_cached(cache, key, directory or "")
+    if tex is None:
+        loader = _SubsystemLoader()
+        bsb = _convert_text(lines, _worker_settings, directory=directory,
+                            loader=loader)
+        tex = bsb.export_to_text(externalize=externalize)
+        _put_cached(cache, key, directory or "", tex, loader.files)
+    return tex
+
+
+def _convert_text_job(text, directory, timeout):
+    """Convert the contents of a *.bsb file in a worker process.
+
+    Parameters
+    ----------
+    text : str
+        Contents of a *.bsb file.
+    directory : str or None
+        Absolute directory of relative subsystem paths, see
+        `_convert_text_to_tex`.
+    timeout : float or None
+        Maximum conversion time in seconds; None means no timeout.
+
+    Returns
+    -------
+    dict
+        TikZ text ('tex') or None and description of the error ('error')
+        or None.
+
+    """
+    try:
+        tex = _call_with_timeout(timeout, _convert_text_to_tex, text,
+                                 directory)
+    except (ValueError, TypeError, TimeoutError) as e:
+        return {"tex": None, "error": _describe_error(e)}
+    return {"tex": tex, "error": None}
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """Handle the requests of a client connection, one per line."""
+
+    def handle(self):
+        for line in self.rfile:
+            try:
+                message = json.loads(line.decode("utf-8"))
+                if not isinstance(message, dict):
+                    raise ValueError("Requests must be JSON objects")
+                response = self.server.process(message)
+            except (ValueError, TypeError) as e:
+                response = {"error": _describe_error(e)}
+            self.wfile.write(json.dumps(response).encode("utf-8") + b"\n")
+
+            if response.get("shutdown"):
+                # shutdown() waits for serve_forever() to return,
+                # so it must not be called from a handler thread directly
+                threading.Thread(target=self.server.shutdown).start()
+                return
+
+
+class ConversionServer(_UnixStreamServer):
+    """Conversion server listening on a Unix socket.
+
+    Requests are handled in threads; the conversions run in a pool of
+    worker processes, which are replaced after a number of jobs to limit
+    the memory growth.
+
+    """
+
+    daemon_threads = True
+
+    def __init__(self, socket_path, jobs=1, max_jobs_per_worker=100,
+                 timeout=None, cache_dir=None, cache_size=64*2**20,
+                 edge_routing="straight", overlaps="warn",
+                 externalize=False):
+        """Create a server and bind it to a socket.
+
+        Parameters
+        ----------
+        socket_path : str
+            Path to the Unix socket; a stale socket of a server which
+            is not running anymore is replaced.
+        jobs : int, optional
+            Number of worker processes; zero or None means one per CPU.
+        max_jobs_per_worker : int or None, optional
+            Number of jobs after which a worker process is replaced;
+            None means never.
+        timeout : float or None, optional
+            Maximum conversion time per file or text in seconds;
+            None means no timeout.
+        cache_dir : str or None, optional
+            Directory of a persistent cache of converted files;
+            None means no cache.
+        cache_size : int, optional
+            Maximum size of the cache in bytes.
+        edge_routing : str, optional
+            Routing of the connections: 'straight' lines or 'orthogonal'
+            paths around the blocks.
+        overlaps : str, optional
+            Handling of overlapping blocks, see `convert_to_tikz`;
+            warnings are printed by the server.
+        externalize : bool, optional
+            If True, the pictures are named for `\\tikzexternalize`,
+            see `convert_to_tikz`.
+
+        """
+        if _UnixStreamServer is object:
+            raise OSError("Unix sockets are not supported on this platform")
+
+        # The pool is created once the socket is bound; until then,
+        # server_close() must neither stop it nor remove the socket
+        self._pool = None
+        _remove_stale_socket(socket_path)
+        super().__init__(socket_path, _RequestHandler)
+
+        #: str: Path to the Unix socket
+        self.socket_path = socket_path
+        #: float or None: Maximum conversion time in seconds
+        self.job_timeout = timeout
+
+        settings = {"edge_routing": edge_routing, "overlaps": overlaps,
+                    "externalize": externalize}
+        if cache_dir is None:
+            self._cache = None
+        else:
+            self._cache = ConversionCache(cache_dir, cache_size, settings)
+
+        # Replaced workers are started from a warm fork server if possible
+        if "forkserver" in multiprocessing.get_all_start_methods():
+            ctx = multiprocessing.get_context("forkserver")
+            ctx.set_forkserver_preload([__package__])
+        else:
+            ctx = multiprocessing.get_context()
+        self._num_workers = jobs or os.cpu_count() or 1
+        self._pool = ctx.Pool(
+            self._num_workers,
+            initializer=_init_worker,
+            initargs=(cache_dir, cache_size, settings),
+            maxtasksperchild=max_jobs_per_worker,
+            )
+
+    def process(self, message):
+        """Process a request.
+
+        Parameters
+        ----------
+        message : dict
+            Request, see the module documentation.
+
+        Returns
+        -------
+        dict
+            Response.
+
+        Raises
+        ------
+        ValueError
+            If a path or the directory is relative or a path does
+            not exist.
+        TypeError
+            If paths, texts or the directory are not strings.
+
+        """
+        if message.get("shutdown"):
+            return {"shutdown": True}
+
+        paths = message.get("paths", [])
+        texts = message.get("texts", [])
+        directory = message.get("directory")
+        if not all(isinstance(p, str) for p in paths):
+            raise TypeError("Paths must be strings")
+        if not all(isinstance(t, str) for t in texts):
+            raise TypeError("Texts must be strings")
+        if directory is not None and not isinstance(directory, str):
+            raise TypeError("The directory must be a string")
+        # Relative paths would be resolved against the working directory
+        # of the server, not of the client
+        for p in paths + ([] if directory is None else [directory]):
+            if not os.path.isabs(p):
+                raise ValueError("Path '{:s}' is not absolute".format(p))
+        files = _collect_bsb_files(paths)
+
+        # Submit all jobs first, so they run in parallel
+        file_results = [
+            self._pool.apply_async(_convert_file_job, (f, self.job_timeout))
+            for f in files
+            ]
+        text_results = [
+            self._pool.apply_async(_convert_text_job,
+                                   (t, directory, self.job_timeout))
+            for t in texts
+            ]
+
+        # Jobs are not waited for forever, e.g. if a worker hangs; the
+        # deadline allows for the jobs queued in front of each one
+        job_time = self.job_timeout
+        if job_time is None:
+            job_time = _MAX_JOB_TIME
+        num_rounds = math.ceil(
+            (len(file_results) + len(text_results))/self._num_workers)
+        deadline = (time.monotonic() + _RESULT_TIMEOUT_MARGIN
+                    + num_rounds*job_time)
+
+        response = {"files": [], "texts": []}
+        for f, r in zip(files, file_results):
+            try:
+                error = _get_result(r, deadline)
+            except TimeoutError as e:
+                error = _describe_error(e)
+            response["files"].append({"file": f, "error": error})
+        for r in text_results:
+            try:
+                result = _get_result(r, deadline)
+            except TimeoutError as e:
+                result = {"tex": None, "error": _describe_error(e)}
+            response["texts"].append(result)
+
+        if self._cache is not None:
+            self._cache.evict()
+        return response
+
+    def server_close(self):
+        """Stop the workers and remove the socket."""
+        super().server_close()
+        if self._pool is None:
+            return
+        self._pool.terminate()
+        self._pool.join()
+        try:
+            os.remove(self.socket_path)
+        except FileNotFoundError:
+            pass
+
+
+def _remove_stale_socket(socket_path):
+    """Remove a socket file if no server is listening on it anymore.
+
+    Parameters
+    ----------
+    socket_path : str
+        Path to the Unix socket.
+
+    """
+    if not os.path.exists(socket_path):
+        return
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(socket_path)
+        except ConnectionRefusedError:
+            os.remove(socket_path)
+        # Otherwise, a server is running and binding will fail
+
+
+def serve(socket_path, jobs=1, max_jobs_per_worker=100, timeout=None,
+          cache_dir=None, cache_size=64*2**20, edge_routing="straight",
+          overlaps="warn", externalize=False):
+    """Run a conversion server until it is shut down or interrupted.
+
+    Parameters
+    ----------
+    socket_path : str
+        Path to the Unix socket.
+    jobs : int, optional
+        Number of worker processes; zero or None means one per CPU.
+    max_jobs_per_worker : int or None, optional
+        Number of jobs after which a worker process is replaced;
+        None means never.
+    timeout : float or None, optional
+        Maximum conversion time per file or text in seconds;
+        None means no timeout.
+    cache_dir : str or None, optional
+        Directory of a persistent cache of converted files;
+        None means no cache.
+    cache_size : int, optional
+        Maximum size of the cache in bytes.
+    edge_routing : str, optional
+        Routing of the connections: 'straight' lines or 'orthogonal'
+        paths around the blocks.
+    overlaps : str, optional
+        Handling of overlapping blocks, see `convert_to_tikz`;
+        warnings are printed by the server.
+    externalize : bool, optional
+        If True, the pictures are named for `\\tikzexternalize`,
+        see `convert_to_tikz`.
+
+    """
+    with ConversionServer(socket_path, jobs, max_jobs_per_worker, timeout,
+                          cache_dir, cache_size, edge_routing,
+                          overlaps, externalize) as server:
+        print("Listening on {:s}".format(socket_path))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+
+def request_conversion(socket_path, paths=(), texts=(), timeout=None,
+                       directory=""):
+    """Send a conversion request to a server.
+
+    Parameters
+    ----------
+    socket_path : str
+        Path to the Unix socket.
+    paths : list of str, optional
+        Files or folders to be converted; relative paths are relative
+        to the current working directory of the caller.
+    texts : list of str, optional
+        Contents of *.bsb files to be converted.
+    timeout : float or None, optional
+        Maximum time to wait for the response in seconds;
+        None means no limit.
+    directory : str, optional
+        Directory of relative subsystem paths in the texts, relative to
+        the current working directory of the caller; '' means this
+        working directory.
+
+    Returns
+    -------
+    dict
+        Response, see the module documentation.
+
+    """
+    message = {
+        "paths": [os.path.abspath(p) for p in paths],
+        "texts": list(texts),
+        "directory": os.path.abspath(directory),
+        }
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(socket_path)
+        sock.sendall(json.dumps(message).encode("utf-8") + b"\n")
+        with sock.makefile("rb") as f:
+            line = f.readline()
+    return json.loads(line.decode("utf-8"))
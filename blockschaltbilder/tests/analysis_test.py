@@ -0,0 +1,137 @@
+"""Test suit for the structural analysis."""
+
+
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+from ..analysis import (
+    Finding,
+    find_structural_issues,
+    format_finding,
+    strongly_connected_components,
+    )
+from ..boilerplate import check_files
+from ..bsb import Blockschaltbild
+
+
+class TestStronglyConnectedComponents(unittest.TestCase):
+    def test_components(self):
+        """Test cycles, chains and self-loops."""
+        edges = [(0, 1), (1, 2), (2, 0), (2, 3), (3, 4), (4, 3), (5, 5)]
+        components = strongly_connected_components(6, edges)
+        self.assertEqual(sorted(components), [[0, 1, 2], [3, 4], [5]])
+        # Components come after the components they lead into
+        self.assertLess(components.index([3, 4]),
+                        components.index([0, 1, 2]))
+
+    def test_deep_graph(self):
+        """Test if long chains do not hit the recursion limit."""
+        n = 100000
+        edges = [(v, v + 1) for v in range(n - 1)] + [(n - 1, 0)]
+        self.assertEqual(strongly_connected_components(n, edges),
+                         [list(range(n))])
+
+    def test_invalid_edges(self):
+        """Test if edges to non-existent nodes raise an exception."""
+        self.assertRaises(ValueError, strongly_connected_components,
+                          2, [(0, 2)])
+        self.assertEqual(strongly_connected_components(0, []), [])
+
+
+class TestFindStructuralIssues(unittest.TestCase):
+    def test_issues(self):
+        """Test algebraic loops and unconnected blocks."""
+        # 0 -> 1 -> 2 -> 1 is algebraic, 2 -> 3 -> 2 has a dynamic block;
+        # 4 is a self-loop, 5 is isolated, 6 is a terminal
+        edges = [(0, 1), (1, 2), (2, 1), (2, 3), (3, 2), (4, 4), (7, 0)]
+        dynamic = [False, False, False, True, False, False, False, False]
+        terminal = [False]*6 + [True, False]
+        self.assertEqual(
+            find_structural_issues(8, edges, dynamic, terminal),
+            [Finding("algebraic_loop", [1, 2]),
+             Finding("algebraic_loop", [4]),
+             Finding("isolated_block", [5]),
+             Finding("unconnected_input", [7])])
+
+    def test_format_finding(self):
+        """Test the descriptions of findings."""
+        self.assertEqual(
+            format_finding(Finding("algebraic_loop", ["S1", "P1"])),
+            "Algebraic loop: 'S1', 'P1'")
+
+
+class TestCheckStructure(unittest.TestCase):
+    def test_check_structure(self):
+        """Test the findings of a Blockschaltbild."""
+        for backend in ("python", "numpy"):
+            bsb = Blockschaltbild(backend=backend)
+            bsb.add_blocks(
+                ["coordinate", "Summationsstelle", "PGlied", "PGlied",
+                 "IGlied", "coordinate", "DGlied", "coordinate"],
+                ["w", "S1", "P1", "P2", "I1", "y", "D1", "c1"],
+                [(0, 0)]*8)
+            bsb.add_connections(["w", "S1", "P1", "I1", "P1", "P2"],
+                                ["S1", "P1", "I1", "y", "P2", "S1"])
+            self.assertEqual(bsb.check_structure(), [
+                Finding("algebraic_loop", ["S1", "P1", "P2"]),
+                Finding("isolated_block", ["D1"]),
+                ])
+
+            # A dynamic block in the loop breaks it
+            bsb.delete_connection("P2", "S1")
+            bsb.add_connection("I1", "S1")
+            bsb.rename_block("P2", "Pout")
+            self.assertEqual(bsb.check_structure(), [
+                Finding("isolated_block", ["D1"]),
+                Finding("unconnected_output", ["Pout"]),
+                ])
+
+            # A transfer function may have a direct feedthrough
+            bsb.add_block("UeFunk", "U1", (0, 0))
+            bsb.add_connections(["Pout", "U1"], ["U1", "P1"])
+            self.assertIn(Finding("algebraic_loop", ["P1", "Pout", "U1"]),
+                          bsb.check_structure())
+
+
+class TestCheckFiles(unittest.TestCase):
+    def setUp(self):
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self.root = self._tmp_dir.name
+        texts = {
+            "ok.bsb": "Verbindungen:\n  C1 - P1\n  P1 - I1\n  I1 - C2\n",
+            "loop.bsb": "Skizze:\n  S1  P1\n\n"
+                        "Verbindungen:\n  S1 - P1\n  P1 - S1\n",
+            "broken.bsb": "Namen:\n",
+            }
+        self.files = {}
+        for basename, text in texts.items():
+            self.files[basename] = os.path.join(self.root, basename)
+            with open(self.files[basename], "w", encoding="utf-8") as f:
+                f.write(text)
+
+    def tearDown(self):
+        self._tmp_dir.cleanup()
+
+    def test_check_files(self):
+        """Test checking files serially and in parallel."""
+        for jobs in (1, 2):
+            with contextlib.redirect_stdout(io.StringIO()) as out, \
+                    contextlib.redirect_stderr(io.StringIO()) as err:
+                summary = check_files([self.root], jobs=jobs, timeout=60)
+            self.assertEqual(summary.findings, {
+                self.files["ok.bsb"]: [],
+                self.files["loop.bsb"]: [
+                    Finding("algebraic_loop", ["S1", "P1"])],
+                })
+            (filename, e), = summary.failed
+            self.assertEqual(filename, self.files["broken.bsb"])
+            self.assertIsInstance(e, ValueError)
+            self.assertIn("{:s}: Algebraic loop: 'S1', 'P1'".format(
+                self.files["loop.bsb"]), out.getvalue())
+            self.assertIn("ValueError in", err.getvalue())
+
+        # No output files are written
+        self.assertEqual(sorted(os.listdir(self.root)),
+                         ["broken.bsb", "loop.bsb", "ok.bsb"])
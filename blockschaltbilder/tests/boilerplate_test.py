@@ -1,8 +1,14 @@
 """Test suit for the Blockschaltbild boilerplate generator."""
 
 
+import contextlib
+import io
+import os
+import tempfile
 import unittest
-from ..boilerplate import _convert_text
+from unittest import mock
+from ..boilerplate import _convert_text, _iter_file_lines, _parse_text
+from ..boilerplate import convert_stream, convert_to_tikz
 
 
 class TestBoilerplate(unittest.TestCase):
@@ -52,3 +58,115 @@ class TestBoilerplate(unittest.TestCase):
         self.assertTrue(bsb._does_this_block_exist("int 1"))
         self.assertTrue(bsb._does_this_block_exist("p 1"))
         self.assertTrue(bsb._does_this_block_exist("p 2"))
+
+    def test_parse_text(self):
+        """Test tokenization of a text in a single pass."""
+        lines = [
+            "ignored P1 - I1",
+            "Skizze:",
+            "\tP1  I1",
+            "Verbindungen:",
+            "  P1 = I1  ",
+            "  spam",
+            "SKETCH:",
+            " D1",
+            "Namen:",
+            "  P1: p.1 ",
+            ]
+        parsed = _parse_text(lines)
+        self.assertEqual(parsed.sketch.names, ["D1", "P1", "I1"])
+        self.assertEqual(parsed.sketch.block_types,
+                         ["DGlied", "PGlied", "IGlied"])
+        self.assertEqual(parsed.sketch.cols, [2.0, 5.0, 9.0])
+        self.assertEqual(parsed.sketch.rows, [0, 1, 1])
+        self.assertEqual(parsed.connections, [("P1", "I1", True)])
+        self.assertEqual(parsed.renames, [("P1", "p 1")])
+        self.assertIsNone(_parse_text(["Namen:", "P1: spam"]).sketch)
+
+    def test_convert_stream(self):
+        """Test conversion of text streams."""
+        text = "Skizze:\n  C1  P1\nVerbindungen:\n  C1 - P1\n"
+        out = io.StringIO()
+        convert_stream(io.StringIO(text), out)
+        self.assertEqual(out.getvalue(),
+                         _convert_text(text.splitlines()).export_to_text())
+
+    def test_iter_file_lines(self):
+        """Test reading files line by line, with and without mmap."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            filename = os.path.join(tmp_dir, "spam.bsb")
+            with open(filename, "wb") as f:
+                f.write("Skizze:\r\n  C1  P1\rN\u00e4men:\n".encode("utf-8"))
+            expected = ["Skizze:\n", "  C1  P1\n", "N\u00e4men:\n"]
+            self.assertEqual(list(_iter_file_lines(filename)), expected)
+            with mock.patch("blockschaltbilder.boilerplate._MMAP_THRESHOLD",
+                            0):
+                self.assertEqual(
+                    [line.rstrip("\r\n") for line in
+                     _iter_file_lines(filename)],
+                    [line.rstrip("\n") for line in expected],
+                    )
+
+
+class TestConvertToTikz(unittest.TestCase):
+    def setUp(self):
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self.root = self._tmp_dir.name
+        os.mkdir(os.path.join(self.root, "sub"))
+        files = {
+            "good.bsb": "Skizze:\n  C1  P1  C2\nVerbindungen:\n  C1 - P1\n",
+            os.path.join("sub", "good.bsb"): "Skizze:\n  C1  P1\n",
+            os.path.join("sub", "bad.bsb"): "Skizze:\n  C1  C1\n",
+            }
+        for name, text in files.items():
+            with open(os.path.join(self.root, name), "w") as f:
+                f.write(text)
+
+    def tearDown(self):
+        self._tmp_dir.cleanup()
+
+    def _check_summary(self, summary):
+        self.assertEqual(sorted(summary.succeeded), [
+            os.path.join(self.root, "good.bsb"),
+            os.path.join(self.root, "sub", "good.bsb"),
+            ])
+        self.assertEqual(len(summary.failed), 1)
+        self.assertEqual(summary.failed[0][0],
+                         os.path.join(self.root, "sub", "bad.bsb"))
+        self.assertIsInstance(summary.failed[0][1], ValueError)
+        self.assertTrue(os.path.isfile(os.path.join(self.root, "good.tex")))
+        self.assertFalse(
+            os.path.isfile(os.path.join(self.root, "sub", "bad.tex")))
+
+    def test_serial(self):
+        """Test conversion of a folder, reporting errors per file."""
+        with contextlib.redirect_stdout(io.StringIO()) as out, \
+                contextlib.redirect_stderr(io.StringIO()) as err:
+            summary = convert_to_tikz([self.root])
+        self._check_summary(summary)
+        self.assertEqual(out.getvalue(), "")
+        self.assertIn("ValueError in", err.getvalue())
+
+    def test_parallel(self):
+        """Test parallel conversion of a folder."""
+        with contextlib.redirect_stderr(io.StringIO()):
+            summary = convert_to_tikz([self.root], jobs=2, timeout=60)
+        self._check_summary(summary)
+
+    def test_externalize(self):
+        """Test if externalized pictures are cached separately."""
+        cache_dir = os.path.join(self.root, "cache")
+        out_filename = os.path.join(self.root, "good.tex")
+        with contextlib.redirect_stderr(io.StringIO()):
+            for externalize in (False, True):
+                convert_to_tikz([self.root], cache_dir=cache_dir,
+                                externalize=externalize)
+                with open(out_filename, "r", encoding="utf-8") as f:
+                    self.assertEqual(
+                        f.read().startswith(r"\tikzsetnextfilename{bsb-"),
+                        externalize)
+
+    def test_not_found(self):
+        """Test if an exception is raised for non-existent paths."""
+        self.assertRaises(ValueError, convert_to_tikz,
+                          [os.path.join(self.root, "spam")])
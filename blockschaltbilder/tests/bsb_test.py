@@ -1,8 +1,16 @@
 """Test suit for the Blockschaltbild boilerplate generator."""
 
 
+import io
+import os
+import subprocess
+import sys
+import tempfile
 import unittest
+from unittest import mock
+import numpy as np
 from ..bsb import Blockschaltbild, BlockschaltbildCoordinate, Block
+from ..bsb import _format_numbers, _trie_pattern
 
 
 class TestBlock(unittest.TestCase):
@@ -64,6 +72,11 @@ class TestBlockschaltbildBasics(unittest.TestCase):
         self.assertEqual(bsb.num_blocks, 2)
         self.assertEqual(bsb.get_block("block 1").xy, (0, 0))
         self.assertEqual(bsb.get_block("block 2").xy, (1, 0))
+        self.assertRaises(ValueError, bsb.add_block, "spam", "block 3",
+                          (2, 0))
+        self.assertRaises(ValueError, bsb.add_block, "spam", "block 3",
+                          (2, 0), "1cm")
+        self.assertEqual(bsb.num_blocks, 2)
 
     def test_delete_existing_block(self):
         """Test deletion of an existing block."""
@@ -99,6 +112,20 @@ class TestBlockschaltbildBasics(unittest.TestCase):
         self.assertEqual(bsb.num_blocks, 2)
         self.assertEqual(bsb.get_block("block A").xy, (0, 0))
 
+    def test_reuse_block_names(self):
+        """Test if names of renamed and deleted blocks can be reused."""
+        bsb = Blockschaltbild()
+        bsb.add_block("PGlied", "block 1", (0, 0))
+        bsb.add_block("IGlied", "block 2", (1, 0))
+        bsb.rename_block("block 1", "block A")
+        bsb.add_block("DGlied", "block 1", (2, 0))
+        bsb.delete_block("block 2")
+        bsb.add_block("PGlied", "block 2", (3, 0))
+        self.assertEqual(bsb.num_blocks, 3)
+        self.assertEqual(bsb.get_block("block A").block_type, "PGlied")
+        self.assertEqual(bsb.get_block("block 1").block_type, "DGlied")
+        self.assertEqual(bsb.get_block("block 2").xy, (3, 0))
+
     def test_add_connection(self):
         """Test addition of a connection."""
         bsb = Blockschaltbild()
@@ -118,6 +145,21 @@ class TestBlockschaltbildBasics(unittest.TestCase):
         self.assertRaises(ValueError,
                           bsb.delete_connection, "block 1", "block 2")
 
+    def test_delete_connected_block(self):
+        """Test if connections of a deleted block are deleted as well."""
+        bsb = Blockschaltbild()
+        bsb.add_block("PGlied", "block 1", (0, 0))
+        bsb.add_block("IGlied", "block 2", (1, 0))
+        bsb.add_block("IGlied", "block 3", (2, 0))
+        bsb.add_connection("block 1", "block 2")
+        bsb.add_connection("block 2", "block 3")
+        bsb.delete_block("block 2")
+        self.assertEqual(bsb._get_sorted_connections_list(), [])
+        # Indices of the remaining blocks must still be valid
+        bsb.add_connection("block 1", "block 3", is_vector=True)
+        self.assertEqual(bsb._get_sorted_connections_list(),
+                         [("block 1", "block 3", "very thick, -latex")])
+
     def test_add_existing_connection(self):
         """Test addition of an already existing connection -- must raise exception."""
         bsb = Blockschaltbild()
@@ -127,6 +169,112 @@ class TestBlockschaltbildBasics(unittest.TestCase):
         self.assertRaises(ValueError,
                           bsb.add_connection, "block 1", "block 2")
 
+    def test_add_blocks(self):
+        """Test addition of multiple blocks at once."""
+        bsb = Blockschaltbild()
+        bsb.add_blocks(["PGlied", "coordinate"], ["block 1", "block 2"],
+                       [(0, 0), (1, 0)], pars=[["K"], None])
+        self.assertEqual(bsb.num_blocks, 2)
+        self.assertEqual(bsb.get_block("block 1").pars, ["K"])
+        self.assertEqual(bsb.get_block("block 2").xy, (1, 0))
+
+    def test_add_invalid_blocks(self):
+        """Test if an invalid batch of blocks is rejected as a whole."""
+        bsb = Blockschaltbild()
+        bsb.add_block("PGlied", "block 1", (0, 0))
+        self.assertRaises(ValueError, bsb.add_blocks,
+                          ["IGlied", "IGlied"], ["block 2", "block 1"],
+                          [(1, 0), (2, 0)])
+        self.assertRaises(ValueError, bsb.add_blocks,
+                          ["IGlied", "IGlied"], ["block 2", "block 2"],
+                          [(1, 0), (2, 0)])
+        self.assertRaises(ValueError, bsb.add_blocks,
+                          ["IGlied", "Spam"], ["block 2", "block 3"],
+                          [(1, 0), (2, 0)])
+        self.assertRaises(ValueError, bsb.add_blocks,
+                          ["IGlied"], ["block 2", "block 3"], [(1, 0)])
+        self.assertEqual(bsb.num_blocks, 1)
+        self.assertFalse(bsb._does_this_block_exist("block 2"))
+
+    def test_block_views(self):
+        """Test if block handles are views of the stored blocks."""
+        bsb = Blockschaltbild()
+        bsb.add_block("PGlied", "block 1", (0, 0))
+        bsb.add_block("coordinate", "block 2", (1, 0))
+        b = bsb.get_block("block 1")
+        c = bsb.get_block("block 2")
+        self.assertIsInstance(b, Block)
+        self.assertIsInstance(c, BlockschaltbildCoordinate)
+        self.assertEqual(b.size, "1 cm")
+        self.assertEqual(b.pars, [""])
+        self.assertEqual(c.get_tikz_coordinate("g"),
+                         r"\coordinate (block 2) at (1, 0);")
+
+        # Changes through one handle are visible through another one
+        bsb.get_block("block 1").size = "2 cm"
+        self.assertEqual(b.size, "2 cm")
+        with self.assertRaises(AttributeError):
+            b.spam = "eggs"
+
+        # Handles of deleted blocks remain usable
+        bsb.delete_block("block 1")
+        b.name = "block 2"
+        self.assertEqual(b.get_latex_definition(),
+                         r"\PGlied{block 2}{block 2--coord}{2 cm}{}")
+        self.assertEqual(bsb.get_block("block 2").xy, (1, 0))
+
+    def test_translate_and_scale(self):
+        """Test moving and scaling all blocks at once."""
+        bsb = Blockschaltbild()
+        bsb.add_blocks(["PGlied"]*2, ["block 1", "block 2"],
+                       [(0, 0), (1, 2)])
+        bsb.add_connection("block 2", "block 1")
+        bsb.translate(1, -1)
+        self.assertEqual(bsb.get_block("block 2").xy, (2, 1))
+        bsb.scale(-2, 0.5)
+        self.assertEqual(bsb.get_block("block 1").xy, (-2, -0.5))
+        self.assertEqual(bsb.get_block("block 2").xy, (-4, 0.5))
+        # The left-to-right order is updated as well
+        text = bsb.export_to_text()
+        self.assertLess(text.index(r"\PGlied{block 2}"),
+                        text.index(r"\PGlied{block 1}"))
+
+    def test_add_connections(self):
+        """Test addition of multiple connections at once."""
+        bsb = Blockschaltbild()
+        bsb.add_blocks(["PGlied"]*3, ["block 1", "block 2", "block 3"],
+                       [(0, 0), (1, 0), (2, 0)])
+        bsb.add_connection("block 2", "block 3")
+        # The second connection already exists, so none must be added
+        self.assertRaises(ValueError, bsb.add_connections,
+                          ["block 1", "block 2"], ["block 2", "block 3"])
+        self.assertEqual(len(bsb._get_sorted_connections_list()), 1)
+        bsb.add_connections(["block 1", "block 3"], ["block 2", "block 1"],
+                            [True, False])
+        self.assertEqual(bsb._get_sorted_connections_list(), [
+            ("block 1", "block 2", "very thick, -latex"),
+            ("block 2", "block 3", "thick, -latex"),
+            ("block 3", "block 1", "thick, -latex"),
+            ])
+
+    def test_from_arrays(self):
+        """Test creation of a Blockschaltbild from arrays."""
+        bsb = Blockschaltbild.from_arrays(
+            ["PGlied", "IGlied", "IGlied"],
+            ["block 1", "block 2", "block 3"],
+            [(0, 0), (1, 0), (1, 1)],
+            edges=[(0, 1), (0, 2)],
+            is_vector=[False, True],
+            scalar_style="thin",
+            )
+        self.assertEqual(bsb.num_blocks, 3)
+        self.assertEqual(bsb._get_sorted_connections_list(), [
+            ("block 1", "block 2", "thin, -latex"),
+            ("block 1", "block 3", "very thick, -latex"),
+            ])
+        self.assertRaises(ValueError, Blockschaltbild.from_arrays,
+                          ["PGlied"], ["block 1"], [(0, 0)], edges=[(0, 1)])
+
     def test_auto_joints(self):
         """Test auto joints placement."""
         bsb = Blockschaltbild()
@@ -139,6 +287,27 @@ class TestBlockschaltbildBasics(unittest.TestCase):
         self.assertEqual(bsb.num_blocks, 4)
         self.assertEqual(bsb.get_block("ajnt1").block_type, "Verzweigung")
 
+    def test_auto_joints_multiple(self):
+        """Test if multiple auto joints are numbered in the order of blocks."""
+        bsb = Blockschaltbild()
+        bsb.add_block("PGlied", "block 1", (2, 0))
+        bsb.add_block("PGlied", "block 2", (1, 1))
+        bsb.add_block("IGlied", "block 3", (3, 0))
+        bsb.add_block("IGlied", "block 4", (3, 1))
+        bsb.add_connections(["block 1", "block 1", "block 2", "block 2"],
+                            ["block 3", "block 4", "block 3", "block 4"])
+        bsb.add_auto_joints()
+        self.assertEqual(bsb.num_blocks, 6)
+        self.assertEqual(bsb.get_block("ajnt1").xy, (2.4, 0))
+        self.assertEqual(bsb.get_block("ajnt2").xy, (1.2, 1))
+        self.assertIn(("block 1", "ajnt1", "thick"),
+                      bsb._get_sorted_connections_list())
+        self.assertIn(("ajnt2", "block 4", "thick, -latex"),
+                      bsb._get_sorted_connections_list())
+        # A second call must not add any joints
+        bsb.add_auto_joints()
+        self.assertEqual(bsb.num_blocks, 6)
+
     def test_auto_joints_vector_no_auto_joint(self):
         """Auto joints placement should not be triggered by a single vector connection."""
         bsb = Blockschaltbild()
@@ -187,6 +356,29 @@ class TestBlockschaltbildBasics(unittest.TestCase):
         self.assertEqual(bsb.get_block("PTZ1").block_type, "PTZweiGlied")
         self.assertEqual(bsb.get_block("D31415").block_type, "DGlied")
 
+    def test_import_sketch_positions(self):
+        """Test block positions and that the sketch is not modified."""
+        bsb = Blockschaltbild(x_scale=1.0, y_scale=2.0)
+        sketch = ["", "  P1   ", "", "I1 pte2", " ", ""]
+        sketch_copy = list(sketch)
+        bsb.import_sketch(sketch)
+        self.assertEqual(sketch, sketch_copy)
+        self.assertEqual(bsb.get_block("P1").xy, (3.0, 4.0))
+        self.assertEqual(bsb.get_block("I1").xy, (1.0, 0.0))
+        self.assertEqual(bsb.get_block("pte2").xy, (5.0, 0.0))
+
+    def test_trie_pattern(self):
+        """Test the trie-ordered alternation of words."""
+        self.assertEqual(_trie_pattern(["p", "pte", "ptz", "s", "sat"]),
+                         "p(?:t(?:e|z))?|s(?:at)?")
+
+    def test_format_numbers(self):
+        """Test bulk formatting of numbers."""
+        values = [[0.5, -0.0], [0.0, 0.5], [1e20, 0.5]]
+        self.assertEqual(_format_numbers(np.array(values), "g"),
+                         ["0.5", "-0", "0", "0.5", "1e+20", "0.5"])
+        self.assertEqual(_format_numbers(np.empty((0, 2)), "g"), [])
+
     def test_import_invalid_sketch_duplications(self):
         """Test import of a sketch with duplicates -- must raise exception."""
         bsb = Blockschaltbild()
@@ -343,3 +535,293 @@ class TestBlockschaltbildBasics(unittest.TestCase):
             ])
 
         self.assertEqual(bsb.export_to_text(), expected_result)
+
+    def test_export_to_stream(self):
+        """Test export to a stream, also for empty sections."""
+        bsb = Blockschaltbild()
+        bsb.add_block("coordinate", "spam", (1, 2))
+        f = io.StringIO()
+        bsb.export_to_stream(f)
+        self.assertEqual(f.getvalue(), bsb.export_to_text())
+        self.assertEqual(f.getvalue(), "\n".join([
+            r"\begin{tikzpicture}",
+            r"",
+            r"",
+            r"% <coordinates>",
+            r"\coordinate (spam) at (1, 2);",
+            r"% </coordinates>",
+            r"",
+            r"",
+            r"% <blocks>",
+            r"",
+            r"% </blocks>",
+            r"",
+            r"",
+            r"% <connections>",
+            r"",
+            r"% </connections>",
+            r"",
+            r"",
+            r"\end{tikzpicture}",
+            r"",
+            ]))
+
+    def test_export_in_chunks(self):
+        """Test if lines exported in chunks are joined correctly."""
+        for backend in ("python", "numpy"):
+            bsb = Blockschaltbild(backend=backend)
+            bsb.import_sketch(["  P1  I1  c1  D1", "  S1  P2  c2"])
+            bsb.import_connections(["P1 - I1", "I1 = c1", "S1 - P2",
+                                    "P2 - c2", "c2 - D1"])
+            text = bsb.export_to_text(".1f", externalize=True)
+            for lines_per_chunk in (1, 2, 3):
+                with mock.patch("blockschaltbilder.bsb._LINES_PER_CHUNK",
+                                lines_per_chunk):
+                    self.assertEqual(
+                        bsb.export_to_text(".1f", externalize=True), text)
+
+    def test_save_and_load(self):
+        """Test saving and loading in the binary format."""
+        bsb = Blockschaltbild(x_scale=0.7, arrow_style="-stealth")
+        bsb.import_sketch(["  P1  I1  c1", "  D1 \u00c4 S1"])
+        bsb.import_connections(["P1 = I1", "P1 - S1", "I1 - c1"])
+        bsb.import_names(["P1: \u00e4rger", "S1: sum"])
+        bsb.get_block("I1").pars = ("T",)
+        bsb.delete_block("D1")
+        bsb.add_auto_joints()
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "spam.bsbb")
+            bsb.save(path)
+            for mmap in (True, False):
+                loaded = Blockschaltbild.load(path, mmap=mmap)
+                self.assertEqual(loaded.export_to_text(), bsb.export_to_text())
+                self.assertEqual(loaded.num_auto_joints, 1)
+                self.assertEqual(loaded.get_block("I1").pars, ["T"])
+                self.assertRaises(ValueError, loaded.get_block, "D1")
+                # Loaded diagrams can be modified
+                loaded.get_block("c1").xy = (0, 0)
+                loaded.add_block("PGlied", "D1", (1, 1))
+                loaded.add_connection("D1", "sum")
+                self.assertIn(r"\draw[thick, -stealth] (D1) -- (sum);",
+                              loaded.export_to_text())
+            # Release the memory map before the file is overwritten
+            del loaded
+            # Changes are never written back to the file
+            self.assertEqual(Blockschaltbild.load(path).export_to_text(),
+                             bsb.export_to_text())
+
+            with open(path, "wb") as f:
+                f.write(b"Skizze:\n  P1\n")
+            self.assertRaises(ValueError, Blockschaltbild.load, path)
+
+    def test_get_changes(self):
+        """Test the journal of changes since the last export."""
+        bsb = Blockschaltbild()
+        bsb.add_blocks(["PGlied"]*3, ["block 1", "block 2", "block 3"],
+                       [(0, 0), (1, 0), (2, 0)])
+        bsb.add_connection("block 1", "block 2")
+        changes = bsb.get_changes()
+        self.assertEqual(changes.added_blocks,
+                         ["block 1", "block 2", "block 3"])
+        self.assertEqual(changes.added_connections, [("block 1", "block 2")])
+
+        # Changes are not tracked unless requested
+        bsb.export_to_text()
+        self.assertEqual(bsb.get_changes(), changes)
+        self.assertIsNone(bsb._journal)
+        self.assertIsNone(bsb._exported)
+
+        bsb.track_changes()
+        bsb.export_to_text()
+        self.assertEqual(bsb.get_changes(), ([], [], [], [], [], []))
+
+        bsb.add_block("IGlied", "block 4", (3, 0))
+        bsb.rename_block("block 4", "block D")
+        bsb.get_block("block 2").xy = (1, 1)
+        bsb.delete_block("block 1")
+        bsb.add_connection("block 2", "block 3")
+        bsb.delete_connection("block 2", "block 3")
+        changes = bsb.get_changes()
+        self.assertEqual(changes.added_blocks, ["block D"])
+        self.assertEqual(changes.removed_blocks, ["block 1"])
+        self.assertEqual(changes.changed_blocks, ["block 2"])
+        self.assertEqual(changes.added_connections, [])
+        self.assertEqual(changes.removed_connections,
+                         [("block 1", "block 2")])
+
+    def test_export_to_file_patch(self):
+        """Test patching a previously exported file."""
+        for backend in ("python", "numpy"):
+            with self.subTest(backend=backend):
+                self._check_export_to_file_patch(backend)
+
+    def _check_export_to_file_patch(self, backend):
+        bsb = Blockschaltbild(backend=backend)
+        bsb.import_sketch(["  P1  I1  c1", "  D1  S1  P2"])
+        bsb.import_connections(["P1 - I1", "I1 = c1", "D1 - S1", "S1 - P1"])
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "spam.tex")
+            # A missing file is exported completely
+            bsb.export_to_file(path, patch=True)
+            with open(path, "r", encoding="utf-8") as f:
+                text = f.read()
+            self.assertEqual(text, bsb.export_to_text())
+
+            # Text outside of the sections is kept
+            with open(path, "w", encoding="utf-8") as f:
+                f.write("% Edited by hand\n" + text)
+            bsb.rename_block("I1", "integrator")
+            bsb.get_block("P1").xy = (10, 0)
+            bsb.get_block("D1").pars = ["T"]
+            bsb.add_connection("P2", "c1")
+            bsb.delete_block("S1")
+            bsb.vector_style = "ultra thick"
+            bsb.export_to_file(path, patch=True)
+            with open(path, "r", encoding="utf-8") as f:
+                patched = f.read()
+            self.assertEqual(patched,
+                             "% Edited by hand\n" + bsb.export_to_text())
+
+            # The file is not rewritten if nothing has changed
+            os.utime(path, ns=(0, 0))
+            bsb.export_to_file(path, patch=True)
+            self.assertEqual(os.stat(path).st_mtime_ns, 0)
+
+            # Sections not written by the last export are exported again
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(text)
+            bsb.export_to_file(path, ".2f", patch=True)
+            with open(path, "r", encoding="utf-8") as f:
+                self.assertEqual(f.read(), bsb.export_to_text(".2f"))
+
+        # Patching does not switch the backend
+        self.assertEqual(bsb._numpy, backend == "numpy")
+
+    def test_export_externalized(self):
+        """Test naming exported pictures after their contents."""
+        def create(backend, connections):
+            bsb = Blockschaltbild(backend=backend)
+            bsb.import_sketch(["  C1  P1  I1  C2", "      D1  PT1"])
+            bsb.import_connections(connections)
+            bsb.add_auto_joints()
+            return bsb
+
+        connections = ["C1 - P1", "P1 - I1", "P1 - D1", "I1 - C2", "I1 - PT1"]
+        bsb = create("python", connections)
+        text = bsb.export_to_text(externalize=True)
+        first_line, rest = text.split("\n", 1)
+        self.assertRegex(first_line,
+                         r"^\\tikzsetnextfilename\{bsb-[0-9a-f]{32}\}$")
+        self.assertEqual(rest, bsb.export_to_text())
+
+        # Equal diagrams get equal names, regardless of the backend
+        # and the order of the connections
+        for backend in ("python", "numpy"):
+            other = create(backend, connections[::-1])
+            self.assertEqual(other.export_to_text(externalize=True), text)
+        bsb.get_block("D1").pars = ["T"]
+        self.assertNotEqual(
+            bsb.export_to_text(externalize=True).split("\n", 1)[0],
+            first_line)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "spam.tex")
+            bsb.export_to_file(path, patch=True)
+            # The name is added, changed and removed by patching
+            for x, externalize in [(5, True), (6, True), (7, False)]:
+                bsb.get_block("C2").xy = (x, 0)
+                bsb.export_to_file(path, patch=True, externalize=externalize)
+                with open(path, "r", encoding="utf-8") as f:
+                    patched = f.read()
+                self.assertEqual(patched,
+                                 bsb.export_to_text(externalize=externalize))
+
+    def test_export_cache_invalidation(self):
+        """Test if modifications are reflected in repeated exports."""
+        bsb = Blockschaltbild()
+        bsb.add_block("PGlied", "block 1", (0, 0))
+        bsb.add_block("IGlied", "block 2", (1, 0))
+        bsb.add_connection("block 1", "block 2")
+        text = bsb.export_to_text()
+        self.assertIn(r"\draw[thick, -latex] (block 1) -- (block 2);", text)
+        self.assertIn(r"\coordinate (block 1--coord) at (0.0, 0.0);",
+                      bsb.export_to_text(".1f"))
+        self.assertEqual(bsb.export_to_text(), text)
+
+        bsb.scalar_style = "thin"
+        self.assertIn(r"\draw[thin, -latex] (block 1) -- (block 2);",
+                      bsb.export_to_text())
+
+        b = bsb.get_block("block 1")
+        b.xy = (2, 0)
+        b.pars = ["K"]
+        text = bsb.export_to_text()
+        self.assertLess(
+            text.index(r"\IGlied{block 2}{block 2--coord}{1 cm}{}"),
+            text.index(r"\PGlied{block 1}{block 1--coord}{1 cm}{K}"),
+            )
+
+        b.name = "block A"
+        self.assertEqual(bsb.get_block("block A").xy, (2, 0))
+        self.assertRaises(ValueError, bsb.get_block, "block 1")
+        self.assertIn(r"\draw[thin, -latex] (block A) -- (block 2);",
+                      bsb.export_to_text())
+        with self.assertRaises(ValueError):
+            b.name = "block 2"
+
+    def test_backends(self):
+        """Test if the list and array backends give the same results."""
+        def build(backend):
+            bsb = Blockschaltbild(backend=backend)
+            bsb.track_changes()
+            bsb.add_blocks(["PGlied", "coordinate", "IGlied", "Verzweigung"],
+                           ["P", "c", "I", "v"],
+                           [(2, 1), (-0.0, 0), (1.25, -1), (1.25, 0)])
+            bsb.add_connection("P", "I", is_vector=True)
+            bsb.add_connection("P", "c")
+            bsb.add_connection("c", "v")
+            bsb.get_block("I").pars = ["K"]
+            bsb.translate(0.5, 0)
+            bsb.scale(2, 1)
+            bsb.add_auto_joints()
+            text = bsb.export_to_text(".2f")
+            bsb.delete_block("c")
+            bsb.get_block("I").xy = (9, 9)
+            return (text, bsb.export_to_text(), bsb.get_changes(),
+                    bsb.get_block("ajnt1").xy)
+
+        self.assertFalse(Blockschaltbild(backend="python")._numpy)
+        self.assertTrue(Blockschaltbild(backend="numpy")._numpy)
+        self.assertEqual(build("python"), build("numpy"))
+        self.assertRaises(ValueError, Blockschaltbild, backend="spam")
+
+    def test_auto_backend(self):
+        """Test if the automatic backend switches to arrays."""
+        with mock.patch("blockschaltbilder.bsb._NUMPY_MIN_BLOCKS", 3):
+            bsb = Blockschaltbild()
+            bsb.add_block("PGlied", "P", (1, 0))
+            bsb.add_block("IGlied", "I", (0, 0))
+            bsb.add_connection("P", "I")
+            text = bsb.export_to_text()
+            self.assertFalse(bsb._numpy)
+            bsb.add_block("DGlied", "D", (2, 0))
+            self.assertTrue(bsb._numpy)
+            self.assertEqual(bsb.export_to_text().replace(
+                "\\DGlied{D}{D--coord}{1 cm}{}\n", "").replace(
+                "\\coordinate (D--coord) at (2, 0);\n", ""), text)
+
+    def test_no_numpy_import(self):
+        """Test if small conversions work without importing NumPy."""
+        code = (
+            "import sys\n"
+            "import blockschaltbilder as bsb\n"
+            "bsb.convert_stream(['Skizze:\\n', '  P1  I1\\n'], sys.stdout)\n"
+            "sys.exit('numpy' in sys.modules)\n"
+            )
+        root = os.path.join(os.path.dirname(__file__), os.pardir, os.pardir)
+        result = subprocess.run([sys.executable, "-c", code], cwd=root,
+                                stdout=subprocess.PIPE)
+        self.assertEqual(result.returncode, 0)
+        self.assertIn(b"\\PGlied{P1}", result.stdout)
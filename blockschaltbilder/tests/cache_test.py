@@ -0,0 +1,83 @@
+"""Test suit for the persistent conversion cache."""
+
+
+import os
+import tempfile
+import unittest
+from unittest import mock
+from ..boilerplate import _convert_single_file
+from ..cache import ConversionCache
+
+
+class TestConversionCache(unittest.TestCase):
+    def setUp(self):
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self.root = self._tmp_dir.name
+        self.cache_dir = os.path.join(self.root, "cache")
+
+    def tearDown(self):
+        self._tmp_dir.cleanup()
+
+    def test_get_put(self):
+        """Test storing and retrieving entries."""
+        cache = ConversionCache(self.cache_dir)
+        key = cache.key("spam")
+        self.assertIsNone(cache.get(key))
+        cache.put(key, "eggs\n")
+        self.assertEqual(cache.get(key), "eggs\n")
+        # Another handle must see the same entry
+        self.assertEqual(ConversionCache(self.cache_dir).get(key), "eggs\n")
+
+    def test_file_key(self):
+        """Test if file keys are equal to keys of the file contents."""
+        cache = ConversionCache(self.cache_dir)
+        filename = os.path.join(self.root, "spam.bsb")
+        with open(filename, "wb") as f:
+            f.write("Skizze:\n  C1 \u00e4\n".encode("utf-8"))
+        self.assertEqual(cache.file_key(filename),
+                         cache.key("Skizze:\n  C1 \u00e4\n"))
+
+    def test_settings(self):
+        """Test if keys depend on the input and on the settings."""
+        cache = ConversionCache(self.cache_dir)
+        other = ConversionCache(self.cache_dir, settings={"num_fmt": ".2f"})
+        self.assertEqual(cache.key("spam"), cache.key("spam"))
+        self.assertNotEqual(cache.key("spam"), cache.key("eggs"))
+        self.assertNotEqual(cache.key("spam"), other.key("spam"))
+
+    def test_evict(self):
+        """Test eviction of the least recently used entries."""
+        cache = ConversionCache(self.cache_dir, max_size=25)
+        for i, text in enumerate(["a"*10, "b"*10, "c"*10]):
+            cache.put(str(i), text)
+            path = os.path.join(self.cache_dir, str(i) + ".tex")
+            os.utime(path, (i, i))
+        cache.evict()
+        self.assertIsNone(cache.get("0"))
+        self.assertEqual(cache.get("1"), "b"*10)
+        self.assertEqual(cache.get("2"), "c"*10)
+
+    def test_skip_unchanged_files(self):
+        """Test if unchanged files are not converted again."""
+        cache = ConversionCache(self.cache_dir)
+        bsb_file = os.path.join(self.root, "spam.bsb")
+        tex_file = os.path.join(self.root, "spam.tex")
+        with open(bsb_file, "w") as f:
+            f.write("Skizze:\n  C1  P1\nVerbindungen:\n  C1 - P1\n")
+
+        _convert_single_file(bsb_file, cache)
+        with open(tex_file) as f:
+            expected = f.read()
+        self.assertIn(r"\draw[thick, -latex] (C1) -- (P1);", expected)
+
+        # Neither the conversion nor writing must happen now
+        with mock.patch("blockschaltbilder.boilerplate._convert_text") as c:
+            os.utime(tex_file, (0, 0))
+            _convert_single_file(bsb_file, cache)
+            self.assertEqual(os.stat(tex_file).st_mtime, 0)
+            # A deleted output file is restored from the cache
+            os.remove(tex_file)
+            _convert_single_file(bsb_file, cache)
+            c.assert_not_called()
+        with open(tex_file) as f:
+            self.assertEqual(f.read(), expected)
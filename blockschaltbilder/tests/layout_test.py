@@ -0,0 +1,102 @@
+"""Test suit for the automatic layout."""
+
+
+import itertools
+import unittest
+from ..boilerplate import _convert_text
+from ..bsb import Blockschaltbild
+from ..layout import layered_layout
+
+
+def _count_crossings(grid, edges):
+    """Count the crossings of edges between neighbouring layers."""
+    edges = [(grid[v], grid[w]) for v, w in edges
+             if grid[w][0] - grid[v][0] == 1]
+    return sum(
+        1 for (a, b), (c, d) in itertools.combinations(edges, 2)
+        if a[0] == c[0] and (a[1] - c[1])*(b[1] - d[1]) < 0
+        )
+
+
+class TestLayeredLayout(unittest.TestCase):
+    def test_chain(self):
+        """Test if a chain is placed in a single row."""
+        grid = layered_layout(4, [(2, 3), (0, 1), (1, 2)])
+        self.assertEqual(grid, [(0, 0), (1, 0), (2, 0), (3, 0)])
+
+    def test_feedback_loop(self):
+        """Test if feedback loops do not change the signal flow."""
+        # Input, summation, controller, plant, output;
+        # the plant is fed back to the summation
+        grid = layered_layout(
+            5, [(0, 1), (1, 2), (2, 3), (3, 4), (3, 1)])
+        self.assertEqual([x for x, _ in grid], [0, 1, 2, 3, 4])
+        self.assertEqual(len({y for _, y in grid}), 1)
+
+    def test_inputs(self):
+        """Test if inputs are placed right before their successors."""
+        grid = layered_layout(4, [(0, 1), (1, 2), (3, 2)])
+        self.assertEqual([x for x, _ in grid], [0, 1, 2, 1])
+
+    def test_components(self):
+        """Test if unconnected parts are stacked from top to bottom."""
+        grid = layered_layout(5, [(0, 1), (2, 3), (2, 4)])
+        self.assertEqual(grid[0], (0, 0))
+        self.assertEqual(grid[1], (1, 0))
+        self.assertEqual(grid[2], (0, -1.5))
+        self.assertEqual(sorted([grid[3], grid[4]]), [(1, -2), (1, -1)])
+
+    def test_crossings(self):
+        """Test if the sweeps remove crossings."""
+        edges = [(0, 6), (1, 5), (2, 5), (2, 6), (3, 4)]
+        grid = layered_layout(7, edges, sweeps=0)
+        self.assertEqual(_count_crossings(grid, edges), 2)
+        grid = layered_layout(7, edges)
+        self.assertEqual(_count_crossings(grid, edges), 0)
+
+    def test_invalid_edges(self):
+        """Test if edges to non-existent nodes raise an exception."""
+        self.assertRaises(ValueError, layered_layout, 2, [(0, 2)])
+        self.assertEqual(layered_layout(0, []), [])
+
+
+class TestAutoLayout(unittest.TestCase):
+    def test_auto_layout(self):
+        """Test the layout of a Blockschaltbild."""
+        for backend in ("python", "numpy"):
+            bsb = Blockschaltbild(x_scale=1, y_scale=2, backend=backend)
+            bsb.add_blocks(["PGlied", "IGlied", "coordinate"],
+                           ["P", "I", "out"], [(5, 5)]*3)
+            bsb.add_connection("P", "I")
+            bsb.add_connection("I", "out")
+            bsb.delete_block("I")
+            bsb.add_block("DGlied", "D", (7, 7))
+            bsb.add_connection("out", "D")
+            bsb.auto_layout()
+            self.assertEqual(bsb.get_block("P").xy, (0, 0))
+            self.assertEqual(bsb.get_block("out").xy, (0, -2))
+            self.assertEqual(bsb.get_block("D").xy, (6, -2))
+            bsb.auto_layout(x_spacing=1, y_spacing=1)
+            self.assertEqual(bsb.get_block("D").xy, (1, -1))
+
+    def test_text_without_sketch(self):
+        """Test the conversion of a text without a sketch."""
+        lines = [
+            "Verbindungen:",
+            "    C1 - S1",
+            "    S1 - P1",
+            "    P1 = PTE1",
+            "    PTE1 - S1",
+            "",
+            "Namen:",
+            "    C1: eingang",
+            "    C2: unbenutzt",
+            ]
+        bsb = _convert_text(lines)
+        self.assertEqual(bsb.get_block("eingang").xy, (0, 0))
+        self.assertEqual(bsb.get_block("S1").block_type, "Summationsstelle")
+        self.assertEqual(bsb.get_block("S1").xy, (3, 0))
+        self.assertEqual(bsb.get_block("PTE1").xy, (9, 0))
+        self.assertEqual(bsb.get_block("PTE1").block_type, "PTEinsGlied")
+        # Blocks only mentioned in the names section are placed below
+        self.assertEqual(bsb.get_block("unbenutzt").xy, (0, -1.5))
@@ -0,0 +1,83 @@
+"""Test suit for the per-phase run metrics."""
+
+
+import os
+import tempfile
+import unittest
+from ..boilerplate import convert_to_tikz
+from ..metrics import collect_metrics, format_metrics_table, phase
+
+
+_BSB_TEXT = """Skizze:
+  P1  I1
+  D1
+
+Verbindungen:
+  P1 - I1
+  P1 - D1
+"""
+
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self.root = self._tmp_dir.name
+        self.filename = os.path.join(self.root, "spam.bsb")
+        with open(self.filename, "w", encoding="utf-8") as f:
+            f.write(_BSB_TEXT)
+
+    def tearDown(self):
+        self._tmp_dir.cleanup()
+
+    def test_disabled(self):
+        """Test if phases are no-ops without collectors."""
+        with phase("spam") as ph:
+            ph.set_diagram(None)
+        self.assertIs(phase("spam"), phase("eggs"))
+
+    def test_phases(self):
+        """Test the metrics of a single-file conversion."""
+        seen = []
+        with collect_metrics(callback=seen.append) as records:
+            convert_to_tikz([self.filename])
+        self.assertEqual(seen, records)
+        self.assertEqual(
+            [r.phase for r in records],
+            ["parse", "sketch", "connections", "names", "auto_joints",
+             "overlaps", "export", "file", "run"])
+
+        by_phase = {r.phase: r for r in records}
+        self.assertEqual(by_phase["parse"].file, self.filename)
+        self.assertIsNone(by_phase["run"].file)
+        self.assertIsNone(by_phase["parse"].num_blocks)
+        self.assertEqual(by_phase["sketch"].num_blocks, 3)
+        self.assertEqual(by_phase["sketch"].num_connections, 0)
+        self.assertEqual(by_phase["connections"].num_connections, 2)
+        self.assertEqual(by_phase["auto_joints"].num_blocks, 4)
+        self.assertEqual(by_phase["auto_joints"].num_auto_joints, 1)
+        self.assertEqual(by_phase["file"].num_connections, 3)
+        for r in records:
+            self.assertGreaterEqual(r.wall_time, 0)
+            self.assertGreaterEqual(r.peak_memory, 0)
+        # Outer phases include the peaks of inner phases
+        self.assertGreaterEqual(by_phase["run"].peak_memory,
+                                by_phase["file"].peak_memory)
+
+        table = format_metrics_table(records)
+        self.assertEqual(len(table.splitlines()), 10)
+
+    def test_without_memory(self):
+        """Test if memory is not reported when it is not traced."""
+        with collect_metrics(trace_memory=False) as records:
+            convert_to_tikz([self.filename])
+        self.assertTrue(all(r.peak_memory is None for r in records))
+
+    def test_parallel(self):
+        """Test if metrics of worker processes are passed on."""
+        other = os.path.join(self.root, "eggs.bsb")
+        with open(other, "w", encoding="utf-8") as f:
+            f.write(_BSB_TEXT)
+        with collect_metrics(trace_memory=False) as records:
+            convert_to_tikz([self.root], jobs=2)
+        files = {r.file for r in records if r.phase == "file"}
+        self.assertEqual(files, {self.filename, other})
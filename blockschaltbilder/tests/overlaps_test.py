@@ -0,0 +1,118 @@
+"""Test suit for the detection of overlapping blocks."""
+
+
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+from .._grid import GridIndex
+from ..boilerplate import convert_to_tikz
+from ..bsb import Blockschaltbild
+from ..overlaps import find_overlaps
+
+
+class TestFindOverlaps(unittest.TestCase):
+    def test_grid_index(self):
+        """Test the queries of the grid index."""
+        index = GridIndex([(0, 0, 1, 1), None, (2, 2, 3, 3), (0.5, 0.5, 5, 1)])
+        self.assertEqual(index.query(0.75, -1, 0.75, 5), {0, 3})
+        self.assertEqual(index.query(-5, 2.5, 10, 2.5), {2})
+        # Touching the border is no overlap
+        self.assertEqual(index.query(1, 1, 1, 3), set())
+        self.assertEqual(index.overlapping_pairs(), [(0, 3)])
+
+    def test_boxes(self):
+        """Test overlapping and touching boxes."""
+        centres = [(0, 0), (1, 0), (0.5, 0.5), (10, 10), (10.5, 10.5)]
+        sizes = [(1, 1), (1, 1), (1, 1), (2, 2), (0.5, 0.5)]
+        self.assertEqual(find_overlaps(centres, sizes),
+                         [(0, 2), (1, 2), (3, 4)])
+
+    def test_points(self):
+        """Test points on top of boxes and other points."""
+        centres = [(0, 0), (0, 0), (0, 0), (0.5, 0), (3, 3), (3, 3)]
+        sizes = [(1, 1), (0, 0), (0, 0), (0, 0), (0, 0), (0, 0)]
+        self.assertEqual(find_overlaps(centres, sizes),
+                         [(0, 1), (0, 2), (1, 2), (4, 5)])
+        self.assertEqual(find_overlaps([], []), [])
+        self.assertRaises(ValueError, find_overlaps, [(0, 0)], [])
+
+
+class TestBlockschaltbildOverlaps(unittest.TestCase):
+    def test_find_overlaps(self):
+        """Test overlapping blocks, auto joints and coordinates."""
+        for backend in ("python", "numpy"):
+            bsb = Blockschaltbild(backend=backend)
+            bsb.add_blocks(
+                ["PGlied", "IGlied", "PGlied", "coordinate", "coordinate"],
+                ["P1", "I1", "P2", "c1", "c2"],
+                [(0, 0), (3, 0), (0, -2), (6, 1), (6, 1)])
+            bsb.add_connection("P1", "I1")
+            bsb.add_connection("P1", "P2")
+            bsb.add_block("PGlied", "P3", (1, -2))
+            bsb.add_block("PGlied", "P4", (3, 0))
+            bsb.delete_block("P3")
+            bsb.delete_block("P4")
+            self.assertEqual(bsb.find_overlaps(), [("c1", "c2")])
+
+            # The auto joint of a block at x = 0 lies on top of it,
+            # which is not reported, but it may overlap other blocks
+            bsb.add_auto_joints()
+            self.assertEqual(bsb.get_block("ajnt1").xy, (0, 0))
+            self.assertEqual(bsb.find_overlaps(), [("c1", "c2")])
+            bsb.get_block("ajnt1").xy = (3, 0)
+            self.assertEqual(bsb.find_overlaps(),
+                             [("I1", "ajnt1"), ("c1", "c2")])
+
+            # Touching blocks do not overlap
+            bsb.get_block("P2").xy = (2, 0)
+            self.assertEqual(len(bsb.find_overlaps()), 2)
+            bsb.get_block("P2").xy = (2.1, 0)
+            self.assertIn(("I1", "P2"), bsb.find_overlaps())
+
+
+class TestOverlapModes(unittest.TestCase):
+    def setUp(self):
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self._tmp_dir.name, "spam.bsb")
+        # The auto joint of P1 is not reported, but the subsystem is
+        with open(self.filename, "w", encoding="utf-8") as f:
+            f.write("Skizze:\n  P1  I1\n  D1\n\n"
+                    "Verbindungen:\n  P1 - I1\n  P1 - D1\n\n"
+                    "Subsysteme:\n  R1: sub.bsb at 0.5, 0\n")
+        with open(os.path.join(self._tmp_dir.name, "sub.bsb"), "w",
+                  encoding="utf-8") as f:
+            f.write("Skizze:\n  P1\n")
+
+    def tearDown(self):
+        self._tmp_dir.cleanup()
+
+    def _convert(self, overlaps):
+        """Convert the file and return the summary and the output."""
+        stdout, stderr = io.StringIO(), io.StringIO()
+        with contextlib.redirect_stdout(stdout), \
+                contextlib.redirect_stderr(stderr):
+            summary = convert_to_tikz([self.filename], overlaps=overlaps)
+        return summary, stdout.getvalue(), stderr.getvalue()
+
+    def test_modes(self):
+        """Test ignoring, warning about and failing on overlaps."""
+        summary, _, stderr = self._convert("ignore")
+        self.assertEqual(summary.succeeded, [self.filename])
+        self.assertEqual(stderr, "")
+
+        summary, _, stderr = self._convert("warn")
+        self.assertEqual(summary.succeeded, [self.filename])
+        self.assertEqual(
+            stderr, "Warning in {:s}: Overlapping blocks: 'D1' and 'R1_P1'\n"
+            .format(self.filename))
+
+        summary, _, stderr = self._convert("fail")
+        self.assertEqual(summary.succeeded, [])
+        (filename, e), = summary.failed
+        self.assertIsInstance(e, ValueError)
+        self.assertIn("'D1' and 'R1_P1'", stderr)
+
+        summary, _, _ = self._convert("spam")
+        self.assertIsInstance(summary.failed[0][1], ValueError)
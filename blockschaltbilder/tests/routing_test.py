@@ -0,0 +1,116 @@
+"""Test suit for the orthogonal routing of connections."""
+
+
+import io
+import os
+import tempfile
+import unittest
+from ..boilerplate import convert_stream
+from ..bsb import Blockschaltbild
+from ..routing import route_orthogonal
+
+
+class TestRouteOrthogonal(unittest.TestCase):
+    def test_straight(self):
+        """Test if aligned nodes are connected by straight lines."""
+        routes = route_orthogonal([(0, 0), (4, 0)], [(1, 1), (1, 1)],
+                                  [(0, 1), (1, 0), (0, 0)])
+        self.assertEqual(routes, [("--", None)]*3)
+
+    def test_detour(self):
+        """Test if blocks in the way are bypassed."""
+        centres = [(0, 0), (4, 0), (2, 0)]
+        sizes = [(1, 1), (1, 1), (1, 1)]
+        (shape, m), = route_orthogonal(centres, sizes, [(0, 1)])
+        self.assertEqual(shape, "|-|")
+        self.assertAlmostEqual(m, -0.7)
+        (shape, m), = route_orthogonal(centres, sizes, [(0, 1)],
+                                       clearance=0.5)
+        self.assertAlmostEqual(m, -1.0)
+
+    def test_shape_preference(self):
+        """Test if blocks are left and entered horizontally."""
+        centres = [(0, 0), (4, 2)]
+        sizes = [(1, 1), (1, 1)]
+        for horizontal, route in [
+                ([True, True], ("-|-", 2.0)),
+                ([True, False], ("-|", None)),
+                ([False, True], ("|-", None)),
+                ([False, False], ("-|", None)),
+                ]:
+            self.assertEqual(
+                route_orthogonal(centres, sizes, [(0, 1)], horizontal),
+                [route])
+
+    def test_overlapping_blocks(self):
+        """Test if blocks on top of other blocks are not bypassed."""
+        centres = [(0, 0), (4, 0), (0, 0), (2, 0)]
+        sizes = [(1, 1)]*4
+        routes = route_orthogonal(centres, sizes, [(0, 1), (2, 1)])
+        self.assertEqual(routes, [("--", None)]*2)
+
+    def test_invalid_input(self):
+        """Test if invalid nodes raise an exception."""
+        self.assertRaises(ValueError, route_orthogonal,
+                          [(0, 0)], [(1, 1)], [(0, 1)])
+        self.assertRaises(ValueError, route_orthogonal,
+                          [(0, 0)], [], [])
+
+
+class TestEdgeRouting(unittest.TestCase):
+    def test_edge_routing(self):
+        """Test the export of orthogonally routed connections."""
+        for backend in ("python", "numpy"):
+            bsb = Blockschaltbild(backend=backend, edge_routing="orthogonal")
+            bsb.add_blocks(["PGlied", "IGlied", "PGlied", "Summationsstelle"],
+                           ["P1", "I1", "P2", "S1"],
+                           [(0, 0), (4, 0), (2, 0), (4, 2)])
+            bsb.add_connection("P1", "I1")
+            bsb.add_connection("P2", "S1")
+            text = bsb.export_to_text()
+            self.assertIn(r"\draw[thick, -latex] (P1) -- (0, -0.7) -| (I1);",
+                          text)
+            self.assertIn(r"\draw[thick, -latex] (P2) -- (3, 0) |- (S1);",
+                          text)
+
+            # Blocks of unknown size are no obstacles
+            bsb.get_block("P2").size = r"\blocksize"
+            self.assertIn(r"\draw[thick, -latex] (P1) -- (I1);",
+                          bsb.export_to_text())
+
+            bsb.edge_routing = "straight"
+            self.assertIn(r"\draw[thick, -latex] (P2) -- (S1);",
+                          bsb.export_to_text())
+            with self.assertRaises(ValueError):
+                bsb.edge_routing = "diagonal"
+
+        self.assertRaises(ValueError, Blockschaltbild, edge_routing="curved")
+
+    def test_patch_and_save(self):
+        """Test patching exported files and saving the routing."""
+        bsb = Blockschaltbild(edge_routing="orthogonal")
+        bsb.import_sketch(["  P1  I1  D1", "  S1  P2  c1"])
+        bsb.import_connections(["P1 - D1", "S1 - c1", "P2 - I1"])
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "spam.tex")
+            bsb.export_to_file(path, patch=True)
+            bsb.get_block("I1").xy = (2, 3)
+            bsb.add_block("PGlied", "P3", (1.5, 1.5))
+            bsb.export_to_file(path, patch=True)
+            with open(path, "r", encoding="utf-8") as f:
+                patched = f.read()
+            self.assertEqual(patched, bsb.export_to_text())
+
+            path = os.path.join(tmp_dir, "spam.bsbbin")
+            bsb.save(path)
+            loaded = Blockschaltbild.load(path)
+            self.assertEqual(loaded.edge_routing, "orthogonal")
+            self.assertEqual(loaded.export_to_text(), bsb.export_to_text())
+
+    def test_convert_stream(self):
+        """Test the conversion of a text with orthogonal routing."""
+        text = "Skizze:\n  P1  P2  I1\n\nVerbindungen:\n  P1 - I1\n"
+        with io.StringIO() as f:
+            convert_stream(io.StringIO(text), f, edge_routing="orthogonal")
+            self.assertIn(" -| (I1);", f.getvalue())
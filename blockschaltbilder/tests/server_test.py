@@ -0,0 +1,103 @@
+"""Test suit for the conversion server."""
+
+
+import os
+import socket
+import tempfile
+import threading
+import unittest
+from unittest import mock
+from ..boilerplate import _convert_text
+from ..server import ConversionServer, request_conversion
+
+
+@unittest.skipUnless(hasattr(socket, "AF_UNIX"), "no Unix sockets")
+class TestConversionServer(unittest.TestCase):
+    def setUp(self):
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self.root = self._tmp_dir.name
+        self.socket_path = os.path.join(self.root, "bsb.sock")
+        self.server = ConversionServer(
+            self.socket_path, jobs=1, max_jobs_per_worker=2)
+        self._thread = threading.Thread(target=self.server.serve_forever)
+        self._thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self._thread.join()
+        self.server.server_close()
+        self._tmp_dir.cleanup()
+
+    def _write(self, filename, text):
+        with open(filename, "w") as f:
+            f.write(text)
+
+    def test_paths(self):
+        """Test the conversion of files, folders and broken files."""
+        spam = os.path.join(self.root, "spam.bsb")
+        eggs = os.path.join(self.root, "eggs.bsb")
+        self._write(spam, "Skizze:\n  I1  P1\n\nVerbindungen:\n  I1 - P1\n")
+        self._write(eggs, "Skizze:\n  I1  I1\n")
+
+        # More jobs than a worker may run before it is replaced
+        for _ in range(3):
+            response = request_conversion(self.socket_path, [self.root])
+            errors = {r["file"]: r["error"] for r in response["files"]}
+            self.assertEqual(sorted(errors), sorted([spam, eggs]))
+            self.assertIsNone(errors[spam])
+            self.assertEqual(errors[eggs]["type"], "ValueError")
+            self.assertTrue(os.path.exists(spam[:-3] + "tex"))
+
+        response = request_conversion(
+            self.socket_path, [os.path.join(self.root, "ham.bsb")])
+        self.assertEqual(response["error"]["type"], "ValueError")
+
+    def test_invalid_requests(self):
+        """Test if invalid requests are rejected."""
+        self.assertRaises(TypeError, self.server.process, {"paths": [1]})
+        self.assertRaises(TypeError, self.server.process, {"texts": [1]})
+        # Relative paths are not resolved by the server
+        self.assertRaises(ValueError, self.server.process,
+                          {"paths": ["spam.bsb"]})
+
+    def test_text_subsystems(self):
+        """Test the directory of relative subsystem paths in texts."""
+        self._write(os.path.join(self.root, "regler.bsb"), "Skizze:\n  P1\n")
+        text = "Skizze:\n  C1\n\nSubsysteme:\n  R1: regler.bsb at 5, 0\n"
+        response = request_conversion(self.socket_path, texts=[text],
+                                      directory=self.root)
+        self.assertIn(r"\PGlied{R1_P1}", response["texts"][0]["tex"])
+
+        # Without a directory, relative paths are rejected
+        error = self.server.process({"texts": [text]})["texts"][0]["error"]
+        self.assertEqual(error["type"], "ValueError")
+        self.assertIn("absolute", error["message"])
+        self.assertRaises(ValueError, self.server.process,
+                          {"texts": [text], "directory": "spam"})
+
+    def test_result_timeout(self):
+        """Test if hanging jobs are reported as timed out."""
+        with mock.patch("blockschaltbilder.server._get_result",
+                        side_effect=TimeoutError("No result")):
+            response = request_conversion(
+                self.socket_path, texts=["Skizze:\n  I1\n"])
+        self.assertEqual(response["texts"][0]["error"]["type"],
+                         "TimeoutError")
+
+    def test_texts(self):
+        """Test the conversion of in-memory texts."""
+        text = "Skizze:\n  I1  P1\n\nVerbindungen:\n  I1 - P1\n"
+        response = request_conversion(
+            self.socket_path, texts=[text, "Skizze:\n  I1  I1\n"])
+        self.assertEqual(response["files"], [])
+        good, bad = response["texts"]
+        self.assertEqual(
+            good,
+            {"tex": _convert_text(text.splitlines(keepends=True))
+             .export_to_text(), "error": None})
+        self.assertIsNone(bad["tex"])
+        self.assertEqual(bad["error"]["type"], "ValueError")
+
+    def test_stale_socket(self):
+        """Test that a running server is not replaced."""
+        self.assertRaises(OSError, ConversionServer, self.socket_path)
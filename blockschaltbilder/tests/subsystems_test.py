@@ -0,0 +1,186 @@
+"""Test suit for subsystems."""
+
+
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+from unittest import mock
+from .. import boilerplate
+from ..boilerplate import _convert_single_file, _convert_text
+from ..boilerplate import convert_to_tikz
+from ..bsb import (
+    Blockschaltbild,
+    _parse_connection,
+    _parse_rename,
+    _parse_subsystem,
+    )
+from ..cache import ConversionCache
+
+
+class TestParseSubsystems(unittest.TestCase):
+    def test_parse(self):
+        """Test subsystem specifications and prefixed block names."""
+        self.assertEqual(_parse_subsystem("  R1: regler.bsb at 6, 3 "),
+                         ("R1", "regler.bsb", (6.0, 3.0)))
+        self.assertEqual(_parse_subsystem("R2 : a b/c.bsb at (-1.5, 2e1)"),
+                         ("R2", "a b/c.bsb", (-1.5, 20.0)))
+        self.assertEqual(_parse_subsystem("R3: regler.bsb"),
+                         ("R3", "regler.bsb", (0.0, 0.0)))
+        self.assertIsNone(_parse_subsystem("R_1: regler.bsb"))
+        self.assertIsNone(_parse_subsystem("R1: regler.tex"))
+
+        self.assertEqual(_parse_connection("R1_S1 = R1_F_PTE2"),
+                         ("R1_S1", "R1_F_PTE2", True))
+        self.assertEqual(_parse_rename("R1_C1: eingang"),
+                         ("R1_C1", "eingang"))
+
+
+class TestAddSubsystem(unittest.TestCase):
+    def test_add_subsystem(self):
+        """Test adding a subsystem twice."""
+        for backend in ("python", "numpy"):
+            sub = Blockschaltbild(backend=backend)
+            sub.add_blocks(["coordinate", "PGlied", "IGlied"],
+                           ["u", "P1", "I1"], [(0, 0), (1, 0), (2, 1)],
+                           pars=[None, ["K"], None])
+            sub.add_connection("u", "P1")
+            sub.add_connection("P1", "I1", is_vector=True)
+            sub.delete_block("u")
+
+            bsb = Blockschaltbild(backend=backend)
+            bsb.add_block("PGlied", "P1", (0, 0))
+            bsb.add_subsystem(sub, "R1", (5, 0))
+            bsb.add_subsystem(sub, "R2", (5, -3))
+            bsb.add_connection("P1", "R2_P1")
+            self.assertEqual(bsb.num_blocks, 5)
+            self.assertEqual(bsb.get_block("R2_I1").xy, (7, -2))
+            self.assertEqual(bsb.get_block("R1_P1").pars, ["K"])
+            text = bsb.export_to_text()
+            self.assertIn(r"\draw[very thick, -latex] (R1_P1) -- (R1_I1);",
+                          text)
+            self.assertIn(r"\draw[thick, -latex] (P1) -- (R2_P1);", text)
+            # The subsystem is unchanged
+            self.assertEqual(sub.num_blocks, 2)
+
+            self.assertRaises(ValueError, bsb.add_subsystem, sub, "R1")
+            self.assertRaises(ValueError, bsb.add_subsystem, sub, "R_3")
+
+
+class TestConvertSubsystems(unittest.TestCase):
+    def setUp(self):
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self.root = self._tmp_dir.name
+        os.mkdir(os.path.join(self.root, "sub"))
+        self._write("sub/regler.bsb",
+                    "Skizze:\n  C1  S1  P1  C2\n\n"
+                    "Verbindungen:\n  C1 - S1\n  S1 - P1\n  P1 - C2\n"
+                    "  F_C2 - S1\n\n"
+                    "Subsysteme:\n  F: filter.bsb at 0, -2\n\n"
+                    "Namen:\n  C1: ein\n")
+        self._write("sub/filter.bsb",
+                    "Verbindungen:\n  C1 - PTE1\n  PTE1 - C2\n")
+        self.filename = self._write(
+            "anlage.bsb",
+            "Skizze:\n  C1\n\n"
+            "Verbindungen:\n  C1 - R1_C1\n  R1_C2 - R2_C1\n\n"
+            "Subsysteme:\n  R1: sub/regler.bsb at 5, 0\n"
+            "  R2: sub/regler.bsb at (15, 0)\n\n"
+            "Namen:\n  R2_C2: ausgang\n")
+        boilerplate._subsystem_cache.clear()
+
+    def tearDown(self):
+        boilerplate._subsystem_cache.clear()
+        self._tmp_dir.cleanup()
+
+    def _write(self, path, text):
+        """Write a file in the temporary directory."""
+        path = os.path.join(self.root, path)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        return path
+
+    def _convert(self):
+        """Convert the including file."""
+        with open(self.filename, "r", encoding="utf-8") as f:
+            return _convert_text(f, directory=self.root)
+
+    def test_convert(self):
+        """Test the conversion of nested subsystems."""
+        with mock.patch("blockschaltbilder.boilerplate._parse_text",
+                        wraps=boilerplate._parse_text) as parse:
+            bsb = self._convert()
+            # Both subsystems are parsed only once
+            self.assertEqual(parse.call_count, 3)
+            self._convert()
+            self.assertEqual(parse.call_count, 4)
+
+        self.assertEqual(bsb.get_block("R1_ein").xy, (6.5, 0))
+        self.assertEqual(bsb.get_block("R2_F_PTE1").block_type,
+                         "PTEinsGlied")
+        self.assertEqual(bsb.get_block("R2_F_PTE1").xy[1], -2)
+        text = bsb.export_to_text()
+        for connection in ["(C1) -- (R1_ein)", "(R1_C2) -- (R2_ein)",
+                           "(R2_F_C2) -- (R2_S1)", "(R2_P1) -- (ausgang)"]:
+            self.assertIn(connection, text)
+
+        # Changed subsystems are parsed again
+        self._write("sub/filter.bsb",
+                    "Verbindungen:\n  C1 - PTZ1\n  PTZ1 - C2\n")
+        self.assertEqual(self._convert().get_block("R1_F_PTZ1").block_type,
+                         "PTZweiGlied")
+
+    def test_errors(self):
+        """Test recursive and missing subsystems."""
+        self._write("sub/filter.bsb", "Subsysteme:\n  X: regler.bsb\n")
+        with self.assertRaisesRegex(ValueError, "includes itself"):
+            self._convert()
+        os.remove(os.path.join(self.root, "sub", "filter.bsb"))
+        with self.assertRaisesRegex(ValueError, "not found"):
+            self._convert()
+
+    def test_cache_directories(self):
+        """Test if equal files in different folders are cached apart."""
+        cache_dir = os.path.join(self.root, "cache")
+        filenames = []
+        for folder, block in [("a", "P1"), ("b", "I1")]:
+            os.mkdir(os.path.join(self.root, folder))
+            self._write(os.path.join(folder, "regler.bsb"),
+                        "Verbindungen:\n  C1 - {:s}\n".format(block))
+            filenames.append(self._write(
+                os.path.join(folder, "main.bsb"),
+                "Skizze:\n  C1\n\nVerbindungen:\n  C1 - R1_C1\n\n"
+                "Subsysteme:\n  R1: regler.bsb at 5, 0\n"))
+        with contextlib.redirect_stdout(io.StringIO()):
+            summary = convert_to_tikz(filenames, cache_dir=cache_dir)
+        self.assertEqual(summary.succeeded, filenames)
+        for filename, block in zip(filenames, [r"\PGlied{R1_P1}",
+                                               r"\IGlied{R1_I1}"]):
+            with open(filename[:-3] + "tex", "r", encoding="utf-8") as f:
+                self.assertIn(block, f.read())
+
+    def test_dependencies(self):
+        """Test if conversions report the files of the subsystems."""
+        expected = [os.path.join(self.root, "sub", "regler.bsb"),
+                    os.path.join(self.root, "sub", "filter.bsb")]
+        self.assertEqual(_convert_single_file(self.filename), expected)
+        cache = ConversionCache(os.path.join(self.root, "cache"))
+        # Converted and cached outputs
+        for _ in range(2):
+            self.assertEqual(_convert_single_file(self.filename, cache),
+                             expected)
+
+    def test_cache(self):
+        """Test if cached outputs depend on the subsystems."""
+        cache_dir = os.path.join(self.root, "cache")
+        out_filename = os.path.join(self.root, "anlage.tex")
+        with contextlib.redirect_stdout(io.StringIO()):
+            convert_to_tikz([self.filename], cache_dir=cache_dir)
+            self._write("sub/filter.bsb",
+                        "Verbindungen:\n  C1 - PTZ1\n  PTZ1 - C2\n")
+            os.remove(out_filename)
+            summary = convert_to_tikz([self.filename], cache_dir=cache_dir)
+        self.assertEqual(summary.succeeded, [self.filename])
+        with open(out_filename, "r", encoding="utf-8") as f:
+            self.assertIn(r"\PTZweiGlied{R1_F_PTZ1}", f.read())
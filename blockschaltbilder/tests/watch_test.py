@@ -0,0 +1,110 @@
+"""Test suit for the watch mode."""
+
+
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+from ..watch import Watcher, _convert_watched, _remove_output
+
+
+class TestWatcher(unittest.TestCase):
+    def setUp(self):
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self.root = self._tmp_dir.name
+        self.spam = os.path.join(self.root, "spam.bsb")
+        self._write(self.spam, "Skizze:\n  C1\n")
+
+    def tearDown(self):
+        self._tmp_dir.cleanup()
+
+    def _write(self, filename, text, mtime=None):
+        with open(filename, "w") as f:
+            f.write(text)
+        if mtime is not None:
+            os.utime(filename, ns=(mtime, mtime))
+
+    def test_initial_files(self):
+        """Test the initial walk through the folders."""
+        os.mkdir(os.path.join(self.root, "sub"))
+        eggs = os.path.join(self.root, "sub", "eggs.bsb")
+        self._write(eggs, "Skizze:\n  C1\n")
+        self._write(os.path.join(self.root, "ham.tex"), "")
+        watcher = Watcher([self.root])
+        self.assertEqual(sorted(watcher.files), sorted([self.spam, eggs]))
+        self.assertEqual(watcher.poll(0.0), ([], []))
+        self.assertRaises(ValueError, Watcher,
+                          [os.path.join(self.root, "ham")])
+
+    def test_changed_files(self):
+        """Test debounced detection of changed files."""
+        watcher = Watcher([self.root], debounce=0.05)
+        self._write(self.spam, "Skizze:\n  C1  C2\n", mtime=10**9)
+        self.assertEqual(watcher.poll(1.0), ([], []))
+        self.assertEqual(watcher.poll(1.06), ([self.spam], []))
+        self.assertEqual(watcher.poll(1.12), ([], []))
+
+    def test_added_and_deleted_files(self):
+        """Test detection of added and deleted files and folders."""
+        watcher = Watcher([self.root], debounce=0.0)
+        sub = os.path.join(self.root, "sub")
+        os.mkdir(sub)
+        eggs = os.path.join(sub, "eggs.bsb")
+        self._write(eggs, "Skizze:\n  C1\n")
+        # Force a change of the folder's modification time
+        os.utime(self.root, ns=(1, 1))
+        self.assertEqual(watcher.poll(1.0), ([eggs], []))
+        os.remove(self.spam)
+        self.assertEqual(watcher.poll(2.0), ([], [self.spam]))
+        self.assertEqual(watcher.files, [eggs])
+
+    def test_dependencies(self):
+        """Test if files are reported as changed with their dependencies."""
+        watcher = Watcher([self.spam], debounce=0.0)
+        regler = os.path.join(self.root, "regler.bsb")
+        watcher.set_dependencies(self.spam, [regler])
+        self._write(regler, "Skizze:\n  P1\n", mtime=10**9)
+        self.assertEqual(watcher.poll(1.0), ([self.spam], []))
+        self.assertEqual(watcher.poll(2.0), ([], []))
+        os.remove(regler)
+        self.assertEqual(watcher.poll(3.0), ([self.spam], []))
+
+        # Dependencies are replaced and forgotten with the file
+        watcher.set_dependencies(self.spam, [])
+        self._write(regler, "Skizze:\n  P1\n")
+        self.assertEqual(watcher.poll(4.0), ([], []))
+        watcher.set_dependencies(self.spam, [regler])
+        os.remove(self.spam)
+        self.assertEqual(watcher.poll(5.0), ([], [self.spam]))
+        self.assertEqual(watcher._dep_stats, {})
+
+    def test_broken_subsystem(self):
+        """Test if fixing a broken subsystem reconverts the file."""
+        regler = os.path.join(self.root, "regler.bsb")
+        tex = os.path.join(self.root, "spam.tex")
+        self._write(self.spam, "Skizze:\n  C1\n\n"
+                    "Subsysteme:\n  R1: regler.bsb at 5, 0\n")
+        self._write(regler, "Skizze:\n  P1  P1\n")
+        watcher = Watcher([self.spam], debounce=0.0)
+        with contextlib.redirect_stderr(io.StringIO()) as err:
+            _convert_watched(watcher, watcher.files, None, None, None)
+        self.assertIn("ValueError in {:s}".format(self.spam), err.getvalue())
+        self.assertFalse(os.path.exists(tex))
+
+        self._write(regler, "Skizze:\n  P1\n", mtime=10**9)
+        changed, _ = watcher.poll(1.0)
+        self.assertEqual(changed, [self.spam])
+        with contextlib.redirect_stdout(io.StringIO()):
+            _convert_watched(watcher, changed, None, None, None)
+        with open(tex, "r", encoding="utf-8") as f:
+            self.assertIn(r"\PGlied{R1_P1}", f.read())
+
+    def test_remove_output(self):
+        """Test removal of the .tex file of a deleted file."""
+        tex = os.path.join(self.root, "spam.tex")
+        self._write(tex, "")
+        os.remove(self.spam)
+        self.assertEqual(_remove_output(self.spam), tex)
+        self.assertFalse(os.path.exists(tex))
+        self.assertIsNone(_remove_output(self.spam))
@@ -0,0 +1,304 @@
+"""Watch mode: reconvert *.bsb files as soon as they change."""
+
+
+from .boilerplate import _SubsystemLoader, _convert_single_file_with_timeout
+from .cache import ConversionCache
+import fnmatch
+import os
+import re
+import sys
+import time
+
+
+# Specify exports
+__all__ = ["watch_and_convert"]
+
+
+def _stat_or_none(path):
+    """Get (mtime, size) of a file or directory, None if it does not exist."""
+    try:
+        st = os.stat(path)
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def _remove_output(filename):
+    """Remove the .tex file generated from a deleted .bsb file.
+
+    Parameters
+    ----------
+    filename : str
+        Name of the deleted .bsb file.
+
+    Returns
+    -------
+    str or None
+        Name of the removed .tex file, None if there was none.
+
+    """
+    out_filename = re.sub(r"\.bsb$", ".tex", filename)
+    try:
+        os.remove(out_filename)
+    except FileNotFoundError:
+        return None
+    return out_filename
+
+
+class Watcher:
+    """Poll a set of *.bsb files and folders for changes.
+
+    The folders are walked only once. Afterwards, only the modification
+    times of the known folders and files are polled; a folder is listed
+    again only if its modification time has changed, i.e. if files or
+    subfolders have been added or deleted. Files depending on other
+    files, e.g. on subsystems, are reported as changed if those change,
+    see `set_dependencies`.
+
+    """
+
+    def __init__(self, paths, debounce=0.05):
+        """Create a new watcher.
+
+        Parameters
+        ----------
+        paths : list of str
+            Files or folders to watch; folders are watched recursively.
+        debounce : float, optional
+            A changed file is reported only if it has not changed
+            for this time (in seconds).
+
+        """
+        #: float: Debounce time in seconds
+        self.debounce = debounce
+
+        # Dicts mapping known files and folders onto their (mtime, size)
+        self._files = {}
+        self._dirs = {}
+        # Dict mapping changed files onto the time of the last change
+        self._pending = {}
+        # Dicts mapping files onto the files they depend on, these onto
+        # the files depending on them and onto their (mtime, size)
+        self._dependencies = {}
+        self._dependents = {}
+        self._dep_stats = {}
+
+        for p in paths:
+            if os.path.isdir(p):
+                self._scan_dir(p, None)
+            elif os.path.isfile(p):
+                self._files[p] = _stat_or_none(p)
+            else:
+                raise ValueError("File or folder '{:s}' not found.".format(p))
+
+    @property
+    def files(self):
+        """list of str: Currently known *.bsb files."""
+        return list(self._files)
+
+    def set_dependencies(self, filename, dependencies):
+        """Set the files a watched file depends on.
+
+        Parameters
+        ----------
+        filename : str
+            Watched file.
+        dependencies : list of str
+            Files the watched file depends on; they replace the ones set
+            before. They need not be watched themselves.
+
+        """
+        for dep in self._dependencies.pop(filename, []):
+            dependents = self._dependents[dep]
+            dependents.discard(filename)
+            if not dependents:
+                del self._dependents[dep]
+                del self._dep_stats[dep]
+        if dependencies:
+            self._dependencies[filename] = list(dependencies)
+        for dep in dependencies:
+            if dep not in self._dependents:
+                self._dependents[dep] = set()
+                self._dep_stats[dep] = _stat_or_none(dep)
+            self._dependents[dep].add(filename)
+
+    def _scan_dir(self, root_directory, now):
+        """Walk through a folder and register new files and subfolders.
+
+        Parameters
+        ----------
+        root_directory : str
+            Folder to scan.
+        now : float or None
+            Current time; new files are marked as changed at this time.
+            None means that new files are not marked.
+
+        """
+        for root, subdirs, files in os.walk(root_directory):
+            # Known subfolders are polled on their own
+            subdirs[:] = [s for s in subdirs
+                          if os.path.join(root, s) not in self._dirs]
+            self._dirs[root] = _stat_or_none(root)
+            for basename in fnmatch.filter(files, "*.bsb"):
+                filename = os.path.join(root, basename)
+                if filename not in self._files:
+                    self._files[filename] = _stat_or_none(filename)
+                    if now is not None:
+                        self._pending[filename] = now
+
+    def poll(self, now=None):
+        """Check the watched files and folders for changes.
+
+        Parameters
+        ----------
+        now : float or None, optional
+            Current time as returned by `time.monotonic()`.
+
+        Returns
+        -------
+        changed : list of str
+            Changed or added files which are stable for the debounce time.
+        deleted : list of str
+            Deleted files.
+
+        """
+        if now is None:
+            now = time.monotonic()
+
+        # Rescan folders whose contents have changed; forget deleted ones
+        for d, old_stat in list(self._dirs.items()):
+            new_stat = _stat_or_none(d)
+            if new_stat is None:
+                del self._dirs[d]
+            elif new_stat[0] != old_stat[0]:
+                self._scan_dir(d, now)
+
+        deleted = []
+        for f, old_stat in list(self._files.items()):
+            new_stat = _stat_or_none(f)
+            if new_stat is None:
+                del self._files[f]
+                self._pending.pop(f, None)
+                self.set_dependencies(f, [])
+                deleted.append(f)
+            elif new_stat != old_stat:
+                self._files[f] = new_stat
+                self._pending[f] = now
+
+        # Files depending on changed or deleted files have changed, too
+        for dep, old_stat in list(self._dep_stats.items()):
+            new_stat = _stat_or_none(dep)
+            if new_stat != old_stat:
+                self._dep_stats[dep] = new_stat
+                for f in self._dependents[dep]:
+                    self._pending[f] = now
+
+        changed = [f for f, t in self._pending.items()
+                   if now - t >= self.debounce]
+        for f in changed:
+            del self._pending[f]
+
+        return changed, deleted
+
+
+def _convert_watched(watcher, files, timeout, cache, settings):
+    """Convert watched files and watch the subsystems they depend on.
+
+    Parameters
+    ----------
+    watcher : Watcher
+        Watcher of the files.
+    files : list of str
+        Files to be converted.
+    timeout : float or None
+        Maximum conversion time per file in seconds;
+        None means no timeout.
+    cache : ConversionCache or None
+        Cache of converted texts.
+    settings : dict
+        Conversion settings, see `boilerplate._convert_text`.
+
+    """
+    for file in files:
+        loader = _SubsystemLoader()
+        try:
+            dependencies = _convert_single_file_with_timeout(
+                file, timeout, cache, settings, loader)
+        except (ValueError, TypeError, TimeoutError) as e:
+            # Missing or broken subsystems are watched as well, so fixing
+            # one of them reconverts the file
+            watcher.set_dependencies(file, list(dict.fromkeys(loader.tried)))
+            print("{:s} in {:s}:".format(type(e).__name__, file), e,
+                  file=sys.stderr)
+        else:
+            watcher.set_dependencies(file, dependencies)
+            print("Converted {:s}".format(file))
+
+
+def watch_and_convert(paths, interval=0.02, debounce=0.05, timeout=None,
+                      cache_dir=None, cache_size=64*2**20,
+                      edge_routing="straight", overlaps="warn",
+                      externalize=False):
+    """Convert *.bsb file(s) and reconvert them whenever they change.
+
+    All files are converted once at the start. Afterwards, changed and
+    added files and files whose subsystems have changed are reconverted
+    until the process is interrupted (e.g. with Ctrl+C). If a file is
+    deleted, the .tex file generated from it is removed as well.
+
+    Parameters
+    ----------
+    paths : list of str
+        Files or folders to watch; folders are watched recursively.
+    interval : float, optional
+        Polling interval in seconds.
+    debounce : float, optional
+        A changed file is reconverted only if it has not changed
+        for this time (in seconds).
+    timeout : float or None, optional
+        Maximum conversion time per file in seconds;
+        None means no timeout.
+    cache_dir : str or None, optional
+        Directory of a persistent cache of converted files;
+        None means no cache.
+    cache_size : int, optional
+        Maximum size of the cache in bytes.
+    edge_routing : str, optional
+        Routing of the connections: 'straight' lines or 'orthogonal'
+        paths around the blocks.
+    overlaps : str, optional
+        Handling of overlapping blocks, see `convert_to_tikz`.
+    externalize : bool, optional
+        If True, the pictures are named for `\\tikzexternalize`,
+        see `convert_to_tikz`.
+
+    """
+    watcher = Watcher(paths, debounce)
+
+    settings = {"edge_routing": edge_routing, "overlaps": overlaps,
+                "externalize": externalize}
+    if cache_dir is None:
+        cache = None
+    else:
+        cache = ConversionCache(cache_dir, cache_size, settings)
+
+    _convert_watched(watcher, watcher.files, timeout, cache, settings)
+    print("Watching {:d} file(s) for changes...".format(len(watcher.files)))
+
+    try:
+        while True:
+            time.sleep(interval)
+            changed, deleted = watcher.poll()
+            for file in deleted:
+                out_filename = _remove_output(file)
+                if out_filename is None:
+                    print("Deleted {:s}".format(file))
+                else:
+                    print("Deleted {:s}, removed {:s}".format(
+                        file, out_filename))
+            _convert_watched(watcher, changed, timeout, cache, settings)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if cache is not None:
+            cache.evict()
@@ -0,0 +1,85 @@
+"""Client of the conversion server (see `generate_boilerplate.py --serve`).
+
+Only the standard library is used and the package is not imported, so
+the client starts quickly; the conversion runs in the warm server.
+
+"""
+
+import argparse
+import json
+import os
+import socket
+import sys
+
+
+def _request(socket_path, message):
+    """Send a request to the server and return its response."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(socket_path)
+        sock.sendall(json.dumps(message).encode("utf-8") + b"\n")
+        with sock.makefile("rb") as f:
+            line = f.readline()
+    if not line:
+        raise ConnectionError("The server has closed the connection")
+    return json.loads(line.decode("utf-8"))
+
+
+def _print_error(error, source):
+    """Print an error of the server to stderr, like the command line tool."""
+    print("{:s} in {:s}:".format(error["type"], source), error["message"],
+          file=sys.stderr)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Convert *.bsb file(s) with a running conversion server.",
+        )
+    parser.add_argument(
+        "socket", type=str,
+        help="Unix socket of the server",
+        )
+    parser.add_argument(
+        "paths", metavar="p", type=str, nargs='*', default=["."],
+        help="""specifies the location of files or folders to be converted
+        (default: convert all in the current folder and it subfolders);
+        '-' converts the standard input to the standard output""",
+        )
+    parser.add_argument(
+        "--shutdown", action="store_true",
+        help="stop the server",
+        )
+    args = parser.parse_args()
+
+    if args.shutdown:
+        _request(args.socket, {"shutdown": True})
+        sys.exit(0)
+
+    if "-" in args.paths:
+        if len(args.paths) > 1:
+            parser.error("'-' cannot be combined with other paths")
+        text = sys.stdin.buffer.read().decode("utf-8")
+        # Relative subsystem paths are relative to the working directory
+        response = _request(
+            args.socket, {"texts": [text], "directory": os.getcwd()})
+        if "error" in response:
+            _print_error(response["error"], "<stdin>")
+            sys.exit(1)
+        result = response["texts"][0]
+        if result["error"] is not None:
+            _print_error(result["error"], "<stdin>")
+            sys.exit(1)
+        sys.stdout.buffer.write(result["tex"].encode("utf-8"))
+        sys.exit(0)
+
+    # The server may run in another working directory
+    response = _request(
+        args.socket, {"paths": [os.path.abspath(p) for p in args.paths]})
+    if "error" in response:
+        _print_error(response["error"], "request")
+        sys.exit(1)
+    failed = False
+    for result in response["files"]:
+        if result["error"] is not None:
+            _print_error(result["error"], result["file"])
+            failed = True
+    sys.exit(1 if failed else 0)
@@ -1,5 +1,8 @@
 import argparse
-from blockschaltbilder import convert_to_tikz
+import contextlib
+import io
+import json
+import sys
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(
@@ -8,7 +11,152 @@ if __name__ == '__main__':
     parser.add_argument(
         "paths", metavar="p", type=str, nargs='*', default=".",
         help="""specifies the location of files or folders to be converted
-        (default: convert all in the current folder and it subfolders)""",
+        (default: convert all in the current folder and it subfolders);
+        '-' converts the standard input to the standard output""",
+        )
+    parser.add_argument(
+        "-j", "--jobs", type=int, default=1,
+        help="""number of files to be converted in parallel
+        (default: 1; 0 means one per CPU)""",
+        )
+    parser.add_argument(
+        "--timeout", type=float, default=None,
+        help="maximum conversion time per file in seconds",
+        )
+    parser.add_argument(
+        "--cache-dir", type=str, default=None,
+        help="""directory of a persistent cache; unchanged files
+        are skipped (default: no cache)""",
+        )
+    parser.add_argument(
+        "--cache-size", type=float, default=64,
+        help="maximum size of the cache in MiB (default: 64)",
+        )
+    parser.add_argument(
+        "--watch", action="store_true",
+        help="""stay resident and reconvert files as soon as they
+        change (stop with Ctrl+C)""",
+        )
+    parser.add_argument(
+        "--serve", metavar="SOCKET", type=str, default=None,
+        help="""stay resident and convert the files and texts sent
+        to the Unix socket SOCKET by bsb_client.py (stop with Ctrl+C)""",
+        )
+    parser.add_argument(
+        "--max-jobs-per-worker", type=int, default=100,
+        help="""number of conversions after which a worker process
+        of the server is replaced (default: 100)""",
+        )
+    parser.add_argument(
+        "--routing", choices=["straight", "orthogonal"], default="straight",
+        help="""routing of the connections: straight lines or orthogonal
+        paths around the blocks (default: straight)""",
+        )
+    parser.add_argument(
+        "--overlaps", choices=["ignore", "warn", "fail"], default="warn",
+        help="""what to do if blocks overlap: ignore them, print a warning
+        (default) or let the conversion fail""",
+        )
+    parser.add_argument(
+        "--externalize", action="store_true",
+        help="""name each picture for \\tikzexternalize after a hash of
+        its contents, so it is only compiled again if it changes""",
+        )
+    parser.add_argument(
+        "--check", action="store_true",
+        help="""check the files for algebraic loops and unconnected blocks
+        instead of converting them; no output files are written""",
+        )
+    parser.add_argument(
+        "--profile", action="store_true",
+        help="print the time and memory used by each conversion phase",
+        )
+    parser.add_argument(
+        "--metrics-out", type=str, default=None,
+        help="write the metrics of each conversion phase to a JSON file",
         )
     args = parser.parse_args()
-    convert_to_tikz(args.paths)
+
+    # Import the package only now, so '--help' and errors in the
+    # arguments are reported without delay
+    from blockschaltbilder import check_files, collect_metrics, \
+        convert_stream, convert_to_tikz, format_metrics_table, serve, \
+        watch_and_convert
+
+    if args.check and ("-" in args.paths or args.watch
+                       or args.serve is not None):
+        parser.error("--check cannot be combined with '-', --watch "
+                     "or --serve")
+    if "-" in args.paths:
+        if len(args.paths) > 1 or args.watch:
+            parser.error("'-' cannot be combined with other paths or --watch")
+        stdout = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8")
+        try:
+            convert_stream(
+                io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8"),
+                stdout,
+                edge_routing=args.routing,
+                overlaps=args.overlaps,
+                externalize=args.externalize,
+                )
+            stdout.flush()
+        except (ValueError, TypeError) as e:
+            print("{:s} in <stdin>:".format(type(e).__name__), e,
+                  file=sys.stderr)
+            sys.exit(1)
+        sys.exit(0)
+    if args.serve is not None:
+        if args.watch:
+            parser.error("--serve cannot be combined with --watch")
+        serve(
+            args.serve,
+            jobs=args.jobs,
+            max_jobs_per_worker=args.max_jobs_per_worker,
+            timeout=args.timeout,
+            cache_dir=args.cache_dir,
+            cache_size=int(args.cache_size*2**20),
+            edge_routing=args.routing,
+            overlaps=args.overlaps,
+            externalize=args.externalize,
+            )
+        sys.exit(0)
+    if args.watch:
+        watch_and_convert(
+            args.paths,
+            timeout=args.timeout,
+            cache_dir=args.cache_dir,
+            cache_size=int(args.cache_size*2**20),
+            edge_routing=args.routing,
+            overlaps=args.overlaps,
+            externalize=args.externalize,
+            )
+        sys.exit(0)
+    with contextlib.ExitStack() as stack:
+        records = None
+        if args.profile or args.metrics_out is not None:
+            records = stack.enter_context(collect_metrics())
+        if args.check:
+            summary = check_files(
+                args.paths,
+                jobs=args.jobs,
+                timeout=args.timeout,
+                )
+            failed = summary.failed or any(summary.findings.values())
+        else:
+            summary = convert_to_tikz(
+                args.paths,
+                jobs=args.jobs,
+                timeout=args.timeout,
+                cache_dir=args.cache_dir,
+                cache_size=int(args.cache_size*2**20),
+                edge_routing=args.routing,
+                overlaps=args.overlaps,
+                externalize=args.externalize,
+                )
+            failed = summary.failed
+    if args.profile:
+        print(format_metrics_table(records), file=sys.stderr)
+    if args.metrics_out is not None:
+        with open(args.metrics_out, "w", encoding="utf-8") as f:
+            json.dump([r._asdict() for r in records], f, indent=2)
+    sys.exit(1 if failed else 0)
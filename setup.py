@@ -9,6 +9,7 @@ setup(
     author_email="mikhail.pak@tum.de",
     url="https://github.com/mp4096/blockschaltbilder",
     packages=["blockschaltbilder"],
+    python_requires=">=3.7",
     install_requires=["numpy"],
     license="MIT",
     test_suite="blockschaltbilder.tests",